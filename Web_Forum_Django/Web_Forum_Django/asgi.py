@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Web_Forum_Django.settings')
+# Serve the board, topic and post lists with their async views.
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,176 @@
+import gzip
+import logging
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+'''
+Static assets pipeline, enabled with STATIC_PIPELINE=1 (see settings.py):
+
+- `python manage.py collectstatic` copies static/ into STATIC_ROOT with CompressedManifestStaticFilesStorage:
+  every file gets a content-hashed name (css/app.3b1a0c7f2a1e.css), the STATIC_BUNDLES are concatenated
+  first, and the text files get a gzip variant (and a brotli one when the `brotli` package is installed).
+- PrecompressedStaticMiddleware serves STATIC_ROOT with the best variant the browser accepts.
+  The hashed files never change, so they are cached for a year as immutable: a repeat visit doesn't
+  even revalidate them.
+- `python manage.py vendor_assets` downloads the CDN assets (VENDOR_ASSETS) into static/vendor/.
+'''
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ttf', '.eot', '.ico'}
+
+# Content-Encoding, file suffix
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# The source maps of the bundled files don't match the bundle.
+SOURCE_MAP_COMMENT = re.compile(rb'^\s*(//# sourceMappingURL=\S+|/\*# sourceMappingURL=\S+ \*/)\s*$', re.MULTILINE)
+
+
+def gzip_compress(content):
+    # mtime=0 so the same file always gives the same .gz
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def brotli_compress(content):
+    return brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self.write_bundles(paths)
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for name in sorted({*self.hashed_files, *self.hashed_files.values()}):
+                self.compress(name)
+
+    def write_bundles(self, paths):
+        '''
+        Concatenate the files of every bundle into a new static file, hashed like the others.
+        A bundle lives in the same directory as its files, so the relative url() of the CSS still work.
+        '''
+        for bundle, names in settings.STATIC_BUNDLES.items():
+            separator = b'\n;\n' if bundle.endswith('.js') else b'\n'
+            parts = []
+            for name in names:
+                with self.open(name) as part:
+                    parts.append(SOURCE_MAP_COMMENT.sub(b'', part.read()).rstrip())
+            if self.exists(bundle):
+                self.delete(bundle)
+            self._save(bundle, ContentFile(separator.join(parts) + b'\n'))
+            paths[bundle] = (self, bundle)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS or not self.exists(name):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        compressors = [('.gz', gzip_compress)]
+        if brotli is not None:
+            compressors.append(('.br', brotli_compress))
+        for suffix, compress in compressors:
+            compressed = compress(content)
+            # Not worth it for the tiny or already compressed files.
+            if len(compressed) < len(content) * 0.95:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def tolerant_converter(matchobj):
+            # A missing image referenced by a CSS file shouldn't abort collectstatic: keep its URL as is.
+            try:
+                return converter(matchobj)
+            except ValueError as error:
+                logger.warning('%s: %s', name, error)
+                return matchobj.group(0)
+        return tolerant_converter
+
+
+def accepted_encodings(request):
+    accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encodings = set()
+    for part in accept.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+class PrecompressedStaticMiddleware(MiddlewareMixin):
+    '''
+    Serve the files of STATIC_ROOT before the rest of the middleware (sessions, authentication...) runs,
+    with their precompressed variant and far-future cache headers for the hashed ones.
+    '''
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.static_url = settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT)
+
+    def process_request(self, request):
+        if not request.path.startswith(self.static_url) or request.method not in ('GET', 'HEAD'):
+            return None
+        name = request.path[len(self.static_url):]
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return self.serve(request, name, path)
+
+    def serve(self, request, name, path):
+        content_type, _ = mimetypes.guess_type(name)
+        accepted = accepted_encodings(request)
+        encoding = None
+        for coding, suffix in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                encoding, path = coding, path + suffix
+                break
+        stat = os.stat(path)
+        etag = '"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                open(path, 'rb'), content_type=content_type or 'application/octet-stream', filename=os.path.basename(name)
+            )
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        response.headers['Vary'] = 'Accept-Encoding'
+        if self.is_hashed(name):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers['Cache-Control'] = 'public, max-age={}'.format(settings.STATIC_UNHASHED_MAX_AGE)
+        return response
+
+    def is_hashed(self, name):
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+        return bool(hashed_files) and name in self._hashed_names(hashed_files)
+
+    def _hashed_names(self, hashed_files):
+        # The manifest is loaded once, compute the set of its hashed names once too.
+        if getattr(self, '_hashed_files', None) is not hashed_files:
+            self._hashed_files = hashed_files
+            self._hashed = set(hashed_files.values())
+        return self._hashed
@@ -0,0 +1,211 @@
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_inspector import record_queries
+
+'''
+Profile a single request in production, e.g. a slow page of topic_posts.
+
+RequestProfilerMiddleware (REQUEST_PROFILING_ENABLED) profiles the requests carrying a signed
+token in the REQUEST_PROFILING_HEADER header (`python manage.py profile_token` prints one),
+or the `?profile=1` query string for a staff user. Any other request goes through untouched.
+For a profiled request it writes in REQUEST_PROFILING_DIR, named after the URL name:
+
+- <url_name>-<time>.pstats: the cProfile statistics (REQUEST_PROFILER = 'cprofile' only), for
+  `python -m pstats` or snakeviz;
+- <url_name>-<time>.collapsed: the stacks sampled every REQUEST_PROFILING_INTERVAL seconds,
+  one "frame;frame;frame count" line per stack, for flamegraph.pl or speedscope;
+- <url_name>-<time>.txt: where the time went, from the samples: SQL, Markdown, each template
+  (topic_posts.html, includes/pagination.html...) and the rest of the Python code.
+
+With REQUEST_PROFILER = 'sampling' only the sampler runs: a thread looking at the stack of the
+request now and then, which costs far less than cProfile's hook on every call.
+The stack of the thread handling the request is sampled, so only the sync requests are profiled:
+under ASGI every request goes through untouched, on its async path. Profile the async views
+(ASYNC_VIEWS) with their sync version.
+'''
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'Web_Forum_Django.profiling'
+TOKEN_VALUE = 'profile'
+
+_profiling = threading.Lock()
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def check_token(token):
+    try:
+        value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.REQUEST_PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+def _template_name(frame):
+    # Template.render(), not Node.render(): only templates have a name (like query_inspector._query_location).
+    code = frame.f_code
+    if code.co_name == 'render' and code.co_filename.endswith(os.path.join('django', 'template', 'base.py')):
+        return getattr(frame.f_locals.get('self'), 'name', None)
+    return None
+
+
+def frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    template_name = _template_name(frame)
+    if template_name:
+        return '{}:{} [{}]'.format(module, code.co_name, template_name)
+    return '{}:{}'.format(module, code.co_name)
+
+
+def categorize(frames):
+    '''
+    What a sampled stack (innermost frame first) was doing: 'SQL', 'Markdown', the innermost template,
+    or 'Python'. A query or a Markdown rendering run from a template counts as such, not as the template.
+    '''
+    template = None
+    for frame in frames:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('django.db.backends') or module.startswith('sqlite3'):
+            return 'SQL'
+        if module == 'markdown' or module.startswith('markdown.') or module == 'boards.rendering':
+            return 'Markdown'
+        if template is None:
+            template = _template_name(frame)
+    if template is not None:
+        return 'template {}'.format(template)
+    return 'Python'
+
+
+class StackSampler:
+    '''
+    Samples the stack of the thread `thread_id` every `interval` seconds, from another thread.
+    The sampling thread needs the GIL: the actual interval is at least sys.getswitchinterval().
+    '''
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            self.categories[categorize(frames)] += 1
+            self.stacks[';'.join(frame_label(frame) for frame in reversed(frames))] += 1
+
+    @property
+    def count(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        return ''.join('{} {}\n'.format(stack, count) for stack, count in self.stacks.most_common())
+
+
+def format_report(request, url_name, elapsed, sampler, queries):
+    lines = [
+        '{} {} ({}): {:.1f} ms, {} samples'.format(request.method, request.get_full_path(), url_name, elapsed * 1000, sampler.count),
+        '{} queries, {:.1f} ms measured'.format(len(queries), sum(query['time'] for query in queries.queries) * 1000),
+        '',
+    ]
+    total = sampler.count or 1
+    for category, count in sampler.categories.most_common():
+        lines.append('{:>6.1f}%  {:>8.1f} ms  {}'.format(100 * count / total, elapsed * 1000 * count / total, category))
+    return '\n'.join(lines) + '\n'
+
+
+class RequestProfilerMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+        # One profiled request at a time in the process, the others aren't slowed down.
+        if not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            _profiling.release()
+
+    async def __acall__(self, request):
+        # Not adapted to sync for the profiled requests either: the async views and the event
+        # stream would run differently from the requests that aren't profiled.
+        return await self.get_response(request)
+
+    def should_profile(self, request):
+        token = request.headers.get(settings.REQUEST_PROFILING_HEADER)
+        if token:
+            return check_token(token)
+        user = getattr(request, 'user', None)
+        return request.GET.get('profile') == '1' and user is not None and user.is_staff
+
+    def profile(self, request):
+        profiler = cProfile.Profile() if settings.REQUEST_PROFILER == 'cprofile' else None
+        start = time.perf_counter()
+        with record_queries() as queries, StackSampler(threading.get_ident(), settings.REQUEST_PROFILING_INTERVAL) as sampler:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        url_name = url_name or 'unknown'
+        os.makedirs(settings.REQUEST_PROFILING_DIR, exist_ok=True)
+        now = time.time()
+        base = os.path.join(settings.REQUEST_PROFILING_DIR, '{}-{}.{:03d}-{}'.format(
+            url_name, time.strftime('%Y%m%d-%H%M%S', time.localtime(now)), int(now * 1000) % 1000, os.getpid(),
+        ))
+        if profiler is not None:
+            profiler.dump_stats(base + '.pstats')
+        with open(base + '.collapsed', 'w') as f:
+            f.write(sampler.collapsed())
+        with open(base + '.txt', 'w') as f:
+            f.write(format_report(request, url_name, elapsed, sampler, queries))
+        logger.info('Profiled %s (%s) in %.1f ms: %s.txt', request.path, url_name, elapsed * 1000, base)
+        response['X-Profile'] = os.path.basename(base)
+        return response
@@ -0,0 +1,198 @@
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+'''
+Record the SQL executed while handling a request and detect N+1 patterns:
+the same query shape repeated over and over, typically a related field accessed
+inside a `{% for %}` loop (e.g. `post.created_by.posts.count` in topic_posts.html).
+
+- QueryInspectorMiddleware logs the N+1 patterns and the requests over their budget
+  (QUERY_BUDGETS, by URL name). It is enabled by QUERY_INSPECTOR_ENABLED, or by DEBUG when it is None.
+- QueryBudgetMixin gives the test cases `assertQueryBudget(url_name)` so a regression
+  fails the test suite instead of reaching production.
+'''
+
+logger = logging.getLogger(__name__)
+
+IN_CLAUSE = re.compile(r'\bIN \((?:%s, )*%s\)')
+# Transaction control statements depend on how the code is wrapped in transactions (e.g. by TestCase),
+# they are not counted as queries.
+TRANSACTION_CONTROL = re.compile(r'^\s*(BEGIN|SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    '''
+    The SQL with its parameters left out. The placeholders are already there,
+    only the lists of IN (...) are collapsed so their length doesn't matter.
+    '''
+    return WHITESPACE.sub(' ', IN_CLAUSE.sub('IN (...)', sql)).strip()
+
+
+def _query_location():
+    '''
+    Where a query comes from: the name of the template being rendered when it was executed,
+    or else the innermost frame of the project code.
+    '''
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'render' and code.co_filename.endswith('django/template/base.py'):
+            # Template.render(), not Node.render(): only templates have a name.
+            template_name = getattr(frame.f_locals.get('self'), 'name', None)
+            if template_name:
+                return template_name
+        if code.co_filename.startswith(base_dir) and code.co_filename != __file__:
+            return '{}:{}'.format(code.co_filename[len(base_dir) + 1:], frame.f_lineno)
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryRecorder:
+    '''
+    A database execute wrapper recording every query, see `record_queries()`.
+    '''
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if TRANSACTION_CONTROL.match(sql):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'shape': query_shape(sql),
+                'time': time.perf_counter() - start,
+                'location': _query_location(),
+            })
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated_shapes(self, threshold=None):
+        '''
+        The query shapes executed at least `threshold` times, with the places they come from.
+        '''
+        if threshold is None:
+            threshold = settings.QUERY_INSPECTOR_REPEAT_THRESHOLD
+        counts = Counter(query['shape'] for query in self.queries)
+        repeated = []
+        for shape, count in counts.most_common():
+            if count < threshold:
+                break
+            locations = sorted({query['location'] for query in self.queries if query['shape'] == shape})
+            repeated.append({'shape': shape, 'count': count, 'locations': locations})
+        return repeated
+
+    def report(self):
+        lines = ['{} queries in {:.1f} ms'.format(len(self), sum(query['time'] for query in self.queries) * 1000)]
+        for query in self.queries:
+            lines.append('  [{}] {}'.format(query['location'], query['sql']))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using=None):
+    '''
+    Record the queries executed on the given database aliases (all of them by default).
+    '''
+    recorder = QueryRecorder()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+def get_query_budget(url_name):
+    return settings.QUERY_BUDGETS.get(url_name)
+
+
+class QueryInspectorMiddleware:
+    '''
+    Sync and async: under ASGI the async views (ASYNC_VIEWS) stay on the event loop.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        enabled = settings.QUERY_INSPECTOR_ENABLED
+        if enabled is None:
+            enabled = settings.DEBUG
+        if not enabled:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        return self.process_response(request, response, recorder)
+
+    async def __acall__(self, request):
+        # The async ORM runs the queries in the thread of sync_to_async(), with the connections of
+        # that thread: the recorder is installed on them from there.
+        recording = record_queries()
+        recorder = await sync_to_async(recording.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.__exit__)(None, None, None)
+        return self.process_response(request, response, recorder)
+
+    def process_response(self, request, response, recorder):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        for repeated in recorder.repeated_shapes():
+            logger.warning(
+                'Possible N+1 on %s (%s): %d x %s from %s',
+                request.path, url_name, repeated['count'], repeated['shape'], ', '.join(repeated['locations'])
+            )
+        budget = get_query_budget(url_name)
+        if budget is not None and len(recorder) > budget:
+            logger.warning('%s (%s) ran %d queries, over its budget of %d', request.path, url_name, len(recorder), budget)
+        response['X-Query-Count'] = str(len(recorder))
+        return response
+
+
+class QueryBudgetMixin:
+    '''
+    TestCase mixin:
+
+        with self.assertQueryBudget('topic_posts'):
+            self.client.get(url)
+
+    fails if the block runs more queries than QUERY_BUDGETS['topic_posts'],
+    or runs the same query shape QUERY_INSPECTOR_REPEAT_THRESHOLD times or more.
+    '''
+    @contextmanager
+    def assertQueryBudget(self, url_name, budget=None):
+        if budget is None:
+            budget = get_query_budget(url_name)
+            if budget is None:
+                self.fail('No query budget for the URL name {!r}, add it to QUERY_BUDGETS.'.format(url_name))
+        with record_queries() as recorder:
+            yield recorder
+        if len(recorder) > budget:
+            self.fail('{} ran {} queries, over its budget of {}:\n{}'.format(url_name, len(recorder), budget, recorder.report()))
+        repeated = recorder.repeated_shapes()
+        if repeated:
+            self.fail('{} repeats the same queries (N+1):\n{}'.format(url_name, '\n'.join(
+                '  {} x {} from {}'.format(item['count'], item['shape'], ', '.join(item['locations']))
+                for item in repeated
+            )))
@@ -0,0 +1,166 @@
+import os
+import random
+import time
+from pathlib import Path
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+'''
+Read replicas: the reads go to one of the DATABASE_REPLICAS aliases, the writes to `default`.
+
+The task worker copies the primary into the replicas every REPLICA_SYNC_INTERVAL seconds
+(the sync_replicas job of TASKS_SCHEDULE, or `python manage.py sync_replicas`), and leaves a
+"<replica>.synced" file next to each copy. A replica lags behind the primary:
+
+- a replica not synced for more than REPLICA_MAX_LAG seconds (the worker is stopped, the copy
+  fails...) isn't used anymore, its reads go to the primary until it is synced again;
+- the apps of REPLICA_PRIMARY_APPS always read from the primary: a session, an account or
+  a task created after the last sync must be found right away;
+- a user who just wrote something (a new topic, a reply, an edited post...) would not always
+  see it on the next page. So ReplicaPinningMiddleware sends all the reads of the unsafe
+  requests (POST...) to the primary, and sets a cookie on their responses: the requests
+  carrying it read from the primary too for the next REPLICA_PIN_SECONDS seconds, longer
+  than the lag of the replicas in use.
+
+In the tests the replicas are mirrors of the test database (TEST['MIRROR']) and every query
+goes to the primary, see PrimaryTestRunner.
+
+The small writes of the GET requests (e.g. the topic views counter) don't pin the request,
+the rest of topic_posts still reads from a replica.
+'''
+
+PRIMARY = 'default'
+
+_state = Local()
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def unpin():
+    _state.pinned = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def sync_marker(alias):
+    return '{}.synced'.format(connections[alias].settings_dict['NAME'])
+
+
+def mark_synced(alias):
+    Path(sync_marker(alias)).touch()
+
+
+def replica_lag(alias):
+    '''
+    Seconds since the replica `alias` was last synced, None if it never was.
+    '''
+    try:
+        return time.time() - os.path.getmtime(sync_marker(alias))
+    except OSError:
+        return None
+
+
+def fresh_replicas():
+    replicas = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            replicas.append(alias)
+    return replicas
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or is_pinned() or model._meta.app_label in settings.REPLICA_PRIMARY_APPS:
+            return PRIMARY
+        replicas = fresh_replicas()
+        if not replicas:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary.
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replicas are copied from the primary, they are never migrated on their own.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinningMiddleware:
+    '''
+    Keep the reads of a user on the primary for a while after they wrote something.
+    It supports the async views too, so it doesn't force them back into a thread under ASGI.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        unsafe = self.process_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin()
+        return self.process_response(request, response, unsafe)
+
+    async def __acall__(self, request):
+        unsafe = self.process_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            unpin()
+        return self.process_response(request, response, unsafe)
+
+    def process_request(self, request):
+        unsafe = request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        if unsafe or settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            pin_to_primary()
+        else:
+            unpin()
+        return unsafe
+
+    def process_response(self, request, response, unsafe):
+        if unsafe and response.status_code < 400 and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class PrimaryTestRunner(DiscoverRunner):
+    '''
+    The test cases only get a transaction on `default`: reading the data they create
+    through a replica alias would be refused (or not see it), so the tests run without replicas.
+    '''
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._replicas = settings.DATABASE_REPLICAS
+        settings.DATABASE_REPLICAS = []
+
+    def teardown_test_environment(self, **kwargs):
+        settings.DATABASE_REPLICAS = self._replicas
+        super().teardown_test_environment(**kwargs)
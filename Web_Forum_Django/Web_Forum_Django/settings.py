@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'widget_tweaks',
     'accounts', 
     'boards',
+    'tasks',
 ]
 
 MIDDLEWARE = [
@@ -52,8 +53,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Web_Forum_Django.query_inspector.QueryInspectorMiddleware',
+    'Web_Forum_Django.profiling.RequestProfilerMiddleware',
 ]
 
+if os.environ.get('DATABASE_REPLICAS'):
+    # Before any middleware reading the database (sessions, authentication...).
+    MIDDLEWARE.insert(1, 'Web_Forum_Django.routers.ReplicaPinningMiddleware')
+
 ROOT_URLCONF = 'Web_Forum_Django.urls'
 
 TEMPLATES = [
@@ -85,6 +92,72 @@ DATABASES = {
     }
 }
 
+# DATABASE_PROFILE=production tunes SQLite (WAL, busy timeout, BEGIN IMMEDIATE, see Web_Forum_Django/sqlite)
+# and keeps the connections open between requests.
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'development')
+
+# Applied to every new connection of the production profile (its init_command).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# The OPTIONS of the database in the production profile.
+SQLITE_PRODUCTION_OPTIONS = {
+    'timeout': 20,
+    # A writer takes the write lock when its transaction starts, instead of failing with
+    # "database is locked" when a read transaction is upgraded.
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': ';'.join('PRAGMA {} = {}'.format(name, value) for name, value in SQLITE_PRAGMAS.items()),
+}
+
+if DATABASE_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+    })
+
+# DATABASE_REPLICAS=2 adds the read-only copies replica1 and replica2 of the primary database,
+# refreshed by the task worker (or `python manage.py sync_replicas`). The router sends them the reads
+# (Web_Forum_Django/routers.py).
+DATABASE_REPLICAS = []
+
+for number in range(1, int(os.environ.get('DATABASE_REPLICAS') or 0) + 1):
+    alias = 'replica{}'.format(number)
+    DATABASES[alias] = dict(DATABASES['default'], NAME=BASE_DIR / 'db.{}.sqlite3'.format(alias))
+    # The tests use the primary for the replicas too.
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['Web_Forum_Django.routers.PrimaryReplicaRouter']
+
+TEST_RUNNER = 'Web_Forum_Django.routers.PrimaryTestRunner'
+
+# The task worker copies the primary into the replicas this often (seconds).
+REPLICA_SYNC_INTERVAL = 5
+
+# A replica not synced for longer is left out, its reads go to the primary.
+REPLICA_MAX_LAG = 3 * REPLICA_SYNC_INTERVAL
+
+# After a write, the reads of the user stay on the primary database for this many seconds:
+# longer than the lag of any replica in use, plus the time to copy the database.
+REPLICA_PIN_SECONDS = REPLICA_MAX_LAG + 5
+
+# Read from the primary only: the sessions and users created since the last sync must be found.
+REPLICA_PRIMARY_APPS = {'sessions', 'auth', 'contenttypes', 'admin', 'tasks'}
+
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+# Retries of a write failing with "database is locked", the first one after SQLITE_WRITE_BACKOFF seconds.
+SQLITE_WRITE_RETRIES = 5
+
+SQLITE_WRITE_BACKOFF = 0.05
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -126,6 +199,39 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# `python manage.py collectstatic` copies the static files here.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# STATIC_PIPELINE=1 (after `python manage.py collectstatic`) serves content-hashed, precompressed
+# static files with far-future cache headers, see Web_Forum_Django/assets.py.
+STATIC_PIPELINE = os.environ.get('STATIC_PIPELINE') == '1'
+
+if STATIC_PIPELINE:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'Web_Forum_Django.assets.CompressedManifestStaticFilesStorage'},
+    }
+    MIDDLEWARE.insert(1, 'Web_Forum_Django.assets.PrecompressedStaticMiddleware')
+
+# Files concatenated by collectstatic, used by the {% bundle %} tag when STATIC_BUNDLES_ENABLED.
+STATIC_BUNDLES = {
+    'css/forum.css': ['css/bootstrap.min.css', 'css/app.css'],
+    'js/forum.js': ['js/jquery-3.2.1.min.js', 'js/popper.min.js', 'js/bootstrap.min.js'],
+}
+
+STATIC_BUNDLES_ENABLED = STATIC_PIPELINE
+
+# Cache lifetime of the static files without a hash in their name (the hashed ones are cached for a year).
+STATIC_UNHASHED_MAX_AGE = 60 * 60
+
+# Third-party assets: downloaded into static/ by `python manage.py vendor_assets`,
+# loaded from these CDN URLs by the {% vendor_static %} tag until then.
+VENDOR_ASSETS = {
+    'vendor/fonts/tangerine.css': 'https://fonts.googleapis.com/css?family=Tangerine',
+    'vendor/simplemde/simplemde.min.css': 'https://cdn.jsdelivr.net/npm/simplemde@1.11.2/dist/simplemde.min.css',
+    'vendor/simplemde/simplemde.min.js': 'https://cdn.jsdelivr.net/npm/simplemde@1.11.2/dist/simplemde.min.js',
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -137,4 +243,167 @@ LOGOUT_REDIRECT_URL = 'home'
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
-LOGIN_URL = 'login'
\ No newline at end of file
+LOGIN_URL = 'login'
+
+# Use the async versions of the board, topic and post list views (boards/views.py).
+# asgi.py turns them on, there is no point in them under WSGI.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
+# Number of rendered messages kept in memory by boards.rendering, by hash of their Markdown.
+MARKDOWN_CACHE_SIZE = 2000
+
+# Conditional GET of the board, topic and post lists (boards/conditional.py): the ETag changes
+# at least this often (seconds), so the view counts and relative dates it doesn't track stay fresh.
+CONDITIONAL_GET_MAX_AGE = 60
+
+# The rendered topic rows and post cards are kept in the 'fragments' cache ({% cache %} in topics.html
+# and topic_posts.html), keyed by the id and the fragment_version of the topic or post.
+# The local memory backend evicts the least recently used fragments beyond FRAGMENT_CACHE_MAX_ENTRIES;
+# with a shared backend (FRAGMENT_CACHE_BACKEND, FRAGMENT_CACHE_LOCATION) such as Redis,
+# configure its own memory limit and LRU eviction policy (maxmemory, allkeys-lru).
+FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES') or 20000)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': FRAGMENT_CACHE_BACKEND,
+        'LOCATION': os.environ.get('FRAGMENT_CACHE_LOCATION', 'fragments'),
+        # A new version makes a new key: the outdated fragments are never read again and get evicted.
+        'TIMEOUT': None,
+    },
+}
+
+if FRAGMENT_CACHE_BACKEND.endswith('LocMemCache'):
+    # Evict a tenth of the entries, the least recently used, when it is full.
+    CACHES['fragments']['OPTIONS'] = {'MAX_ENTRIES': FRAGMENT_CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': 10}
+
+# Rows per page of the JSON API (boards/api.py), and the largest `?limit=` it accepts.
+API_PAGE_SIZE = 20
+
+API_MAX_PAGE_SIZE = 100
+
+# Live replies on the last page of a topic, a Server-Sent Events stream (boards/live.py).
+# It needs ASGI, like the async views: the stream URL answers 404 when it is off.
+LIVE_UPDATES = ASYNC_VIEWS
+
+# boards.live.LocalBackend for a single ASGI process, boards.live.PollingBackend
+# to also get the posts created by the other processes.
+LIVE_BACKEND = os.environ.get('LIVE_BACKEND', 'boards.live.PollingBackend')
+
+LIVE_POLL_INTERVAL = 2
+
+LIVE_HEARTBEAT_INTERVAL = 15
+
+# Events waiting for a slow client before it has to catch up from the database.
+LIVE_QUEUE_SIZE = 100
+
+# Posts sent at once when a stream resumes from its Last-Event-ID.
+LIVE_BACKLOG_SIZE = 100
+
+# Delay before the browser reconnects a dropped stream (milliseconds).
+LIVE_RETRY_MS = 3000
+
+# Background tasks (tasks/queue.py), run by `python manage.py run_tasks`.
+TASKS_WORKERS = 2
+
+# Seconds between two looks for due tasks when the worker is idle.
+TASKS_POLL_INTERVAL = 1
+
+TASKS_MAX_ATTEMPTS = 3
+
+# Delay before the first retry of a failed task (seconds), doubled at every attempt.
+TASKS_RETRY_DELAY = 30
+
+# A task running for longer is considered lost with its worker, and queued again.
+TASKS_LOCK_TIMEOUT = 15 * 60
+
+# How often the worker requeues the lost tasks and deletes the old ones. The scheduled jobs are
+# queued as often as the most frequent of them needs, up to this interval.
+TASKS_MAINTENANCE_INTERVAL = 60
+
+TASKS_DONE_RETENTION = 24 * 60 * 60
+# The failed tasks are kept longer, to be looked at and retried from the admin.
+TASKS_FAILED_RETENTION = 7 * 24 * 60 * 60
+
+# Jobs queued every `every` seconds.
+TASKS_SCHEDULE = {
+    'rerender_posts': {'task': 'boards.tasks.rerender_posts', 'every': 60 * 60},
+}
+
+if DATABASE_REPLICAS:
+    TASKS_SCHEDULE['sync_replicas'] = {'task': 'boards.tasks.sync_replicas', 'every': REPLICA_SYNC_INTERVAL}
+
+# Topic views counter: 'exact' writes every view right away,
+# 'buffered' collects them in memory and writes them every TOPIC_VIEWS_FLUSH_INTERVAL seconds.
+TOPIC_VIEWS_MODE = os.environ.get('TOPIC_VIEWS_MODE', 'exact')
+
+TOPIC_VIEWS_FLUSH_INTERVAL = 5
+
+# The topics already counted for a session (boards.counters.ViewedTopics): Bloom filters of
+# VIEWED_TOPICS_BITS bits, 1 KB, with a false positive rate around 1% at VIEWED_TOPICS_CAPACITY topics.
+# They double in size, up to VIEWED_TOPICS_MAX_BITS, for the sessions viewing more topics.
+# A topic is counted again after VIEWED_TOPICS_TTL / 2 to VIEWED_TOPICS_TTL seconds.
+VIEWED_TOPICS_BITS = 8192
+
+VIEWED_TOPICS_MAX_BITS = 65536
+
+VIEWED_TOPICS_HASHES = 6
+
+VIEWED_TOPICS_CAPACITY = 800
+
+VIEWED_TOPICS_TTL = 7 * 24 * 60 * 60
+
+
+# Number of posts deleted per transaction when purging the hidden boards and topics (boards/purge.py).
+PURGE_CHUNK_SIZE = 500
+
+# Maximum number of full-text matches used by a search of the boards admin (boards/admin.py).
+ADMIN_SEARCH_LIMIT = 1000
+
+
+# Query inspector (Web_Forum_Django/query_inspector.py): logs the N+1 patterns
+# and the requests running more queries than their budget. None means "when DEBUG is on".
+QUERY_INSPECTOR_ENABLED = None
+
+# A query shape executed this many times in one request is reported as an N+1.
+QUERY_INSPECTOR_REPEAT_THRESHOLD = 3
+
+# Maximum number of queries per URL name, also asserted by the test suite.
+QUERY_BUDGETS = {
+    'home': 3,
+    'board_topics': 4,
+    'search': 6,
+    'new_topic': 11,
+    'topic_posts': 8,
+    'api_boards': 4,
+    'api_board_topics': 4,
+    'api_topic_posts': 4,
+    'reply_topic': 11,
+    'post_permalink': 2,
+    'edit_post': 6,
+    'signup': 8,
+    'login': 6,
+    'password_reset': 6,
+    'password_change': 8,
+    'my_account': 6,
+}
+
+# Request profiler (Web_Forum_Django/profiling.py): profiles the requests carrying a signed token
+# (`python manage.py profile_token`) in the REQUEST_PROFILING_HEADER header, or `?profile=1` for a staff user.
+REQUEST_PROFILING_ENABLED = os.environ.get('REQUEST_PROFILING') == '1'
+
+# 'cprofile' (pstats and sampled stacks) or 'sampling' (sampled stacks only, much lighter).
+REQUEST_PROFILER = os.environ.get('REQUEST_PROFILER', 'cprofile')
+
+REQUEST_PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
+REQUEST_PROFILING_HEADER = 'X-Profile-Token'
+
+REQUEST_PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+# Seconds between two samples of the stack of the profiled request.
+REQUEST_PROFILING_INTERVAL = 0.005
@@ -0,0 +1,101 @@
+import functools
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+'''
+SQLite production profile (enabled with DATABASE_PROFILE=production, see settings.py).
+
+- The options of Django's sqlite3 backend apply SQLITE_PRAGMAS (WAL journal, busy_timeout,
+  synchronous=NORMAL, mmap_size, cache_size...) to every new connection (`init_command`) and start
+  the transactions with BEGIN IMMEDIATE (`transaction_mode`), so a writer takes the write lock up front
+  and waits for it with busy_timeout instead of failing with "database is locked" when it upgrades
+  a read transaction. configure_connection() applies the same pragmas to a plain sqlite3 connection.
+- `serialized_write` / `write_view` run the writes of this process one at a time in a transaction
+  and retry it with an exponential backoff when SQLite still reports that the database is locked.
+'''
+
+_write_lock = threading.RLock()
+
+
+def configure_connection(conn, pragmas=None):
+    '''
+    Apply the PRAGMA statements to a DB-API sqlite3 connection.
+    '''
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    for name, value in pragmas.items():
+        conn.execute('PRAGMA {} = {}'.format(name, value))
+    return conn
+
+
+def copy_database(source, target, pages=1024):
+    '''
+    Copy the SQLite database file `source` into `target` with the online backup API:
+    the copy is consistent even while `source` is written to, and the connections
+    reading `target` see either the old or the new content.
+    '''
+    source_conn = sqlite3.connect(str(source))
+    target_conn = sqlite3.connect(str(target))
+    try:
+        source_conn.backup(target_conn, pages=pages)
+    finally:
+        target_conn.close()
+        source_conn.close()
+
+
+def is_locked_error(error):
+    message = str(error)
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_locked(func, retries=None, backoff=None):
+    '''
+    Call `func()` and call it again when it fails because the database is locked,
+    waiting longer every time (with some jitter so the workers don't retry in lockstep).
+    '''
+    if retries is None:
+        retries = settings.SQLITE_WRITE_RETRIES
+    if backoff is None:
+        backoff = settings.SQLITE_WRITE_BACKOFF
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except (OperationalError, sqlite3.OperationalError) as error:
+            # Inside an outer transaction the failed statement can't be replayed on its own.
+            if not is_locked_error(error) or attempt == retries or connection.in_atomic_block:
+                raise
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def serialized_write(func):
+    '''
+    Decorator running `func` in a transaction, one writer at a time in this process,
+    retried when the database is locked by another process.
+    '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        def attempt():
+            with _write_lock, transaction.atomic():
+                return func(*args, **kwargs)
+        return retry_on_locked(attempt)
+    return wrapper
+
+
+def write_view(view):
+    '''
+    View decorator sending the unsafe requests (POST...) through `serialized_write`.
+    The GET requests are not serialized, the readers never block each other in WAL mode.
+    '''
+    serialized_view = serialized_write(view)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return view(request, *args, **kwargs)
+        return serialized_view(request, *args, **kwargs)
+    return wrapper
@@ -13,23 +13,34 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path,include, re_path
 # Notice how we are importing the views module from the accounts app in a different way
 # We are giving an alias because otherwise, it would clash with the boards’ views
 from accounts import views as accounts_views
+from accounts import forms as accounts_forms
 # We renamed it to auth_views to avoid clashing with the boards.views
 from django.contrib.auth import views as auth_views
 from boards import views #*******************************
+from boards import api, live
+
+# Under ASGI the list views are the async ones (ASYNC_VIEWS, see settings.py)
+if settings.ASYNC_VIEWS:
+    BoardListView, TopicListView, PostListView = views.AsyncBoardListView, views.AsyncTopicListView, views.AsyncPostListView
+else:
+    BoardListView, TopicListView, PostListView = views.BoardListView, views.TopicListView, views.PostListView
 
 urlpatterns = [
-    re_path(r'^$', views.BoardListView.as_view(), name='home'),
+    re_path(r'^$', BoardListView.as_view(), name='home'),
     # re_path(r'^$', views.home, name='home'),
     re_path(r'^signup/$', accounts_views.signup, name='signup'),
     re_path(r'^login/$', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     re_path(r'^logout/$', auth_views.LogoutView.as_view(), name='logout'),\
     re_path(r'^reset/$',
         auth_views.PasswordResetView.as_view(
+            # The email is sent by the task worker, see accounts/forms.py
+            form_class=accounts_forms.QueuedPasswordResetForm,
             template_name='password_reset.html',
             email_template_name='password_reset_email.html',
             subject_template_name='password_reset_subject.txt'
@@ -49,13 +60,20 @@ urlpatterns = [
         name='password_change'),
     re_path(r'^settings/password/done/$', auth_views.PasswordChangeDoneView.as_view(template_name='password_change_done.html'),
         name='password_change_done'),
-    re_path(r'^boards/(?P<pk>\d+)/$', views.TopicListView.as_view(), name='board_topics'),
+    re_path(r'^boards/(?P<pk>\d+)/$', TopicListView.as_view(), name='board_topics'),
+    re_path(r'^search/$', views.search, name='search'),
     re_path(r'^boards/(?P<pk>\d+)/new/$', views.new_topic, name='new_topic'),
-    re_path(r'^boards/(?P<pk>\d+)/topics/(?P<topic_pk>\d+)/$', views.PostListView.as_view(), name='topic_posts'),
+    re_path(r'^boards/(?P<pk>\d+)/topics/(?P<topic_pk>\d+)/$', PostListView.as_view(), name='topic_posts'),
     re_path(r'^boards/(?P<pk>\d+)/topics/(?P<topic_pk>\d+)/reply/$', views.reply_topic, name='reply_topic'),
+    re_path(r'^boards/(?P<pk>\d+)/topics/(?P<topic_pk>\d+)/stream/$', live.topic_stream, name='topic_stream'),
+    re_path(r'^posts/(?P<post_pk>\d+)/$', views.post_permalink, name='post_permalink'),
     re_path(r'^boards/(?P<pk>\d+)/topics/(?P<topic_pk>\d+)/posts/(?P<post_pk>\d+)/edit/$',
         views.PostUpdateView.as_view(), name='edit_post'),
     re_path(r'^admin/', admin.site.urls),
+    # Read-only JSON versions of the home, board_topics and topic_posts pages (boards/api.py)
+    re_path(r'^api/boards/$', api.BoardListApiView.as_view(), name='api_boards'),
+    re_path(r'^api/boards/(?P<pk>\d+)/topics/$', api.TopicListApiView.as_view(), name='api_board_topics'),
+    re_path(r'^api/boards/(?P<pk>\d+)/topics/(?P<topic_pk>\d+)/posts/$', api.PostListApiView.as_view(), name='api_topic_posts'),
 ]
 
 
@@ -1,3 +1,28 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
 
-# Register your models here.
+from .models import Profile
+from .stats import rebuild_posts_counts
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'posts_count')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('posts_count',)
+    search_help_text = 'The exact username.'
+    search_fields = ('user__username',)
+    actions = ('rebuild_posts_count',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # An exact match, through the unique index of the usernames.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(user__username=search_term), False
+
+    @admin.action(description='Rebuild the posts count of the selected profiles')
+    def rebuild_posts_count(self, request, queryset):
+        updated = rebuild_posts_counts(User.objects.filter(profile__in=queryset))
+        self.message_user(request, 'Rebuilt the posts count of {} user(s).'.format(updated), messages.SUCCESS)
@@ -1,9 +1,28 @@
 from django import forms
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth.models import User
 
+from .tasks import send_password_reset_email
+
 class SignUpForm(UserCreationForm):
     email = forms.CharField(max_length=254, required=True, widget=forms.EmailInput())
     class Meta:
         model = User
-        fields = ('username', 'email', 'password1', 'password2')
\ No newline at end of file
+        fields = ('username', 'email', 'password1', 'password2')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    '''
+    The task worker renders and sends the email (tasks/queue.py), so a slow SMTP server
+    doesn't slow the page down. Only the id of the user is queued, the task makes the reset link:
+    the queued tasks can be read in the admin.
+    '''
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email, html_email_template_name=None):
+        send_password_reset_email.enqueue(
+            context['user'].pk,
+            {key: context[key] for key in ('domain', 'site_name', 'protocol')},
+            subject_template_name,
+            email_template_name,
+            from_email=from_email,
+            html_email_template_name=html_email_template_name,
+        )
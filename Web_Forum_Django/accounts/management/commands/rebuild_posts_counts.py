@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from accounts.stats import rebuild_posts_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the posts_count of the user profiles (and create the missing profiles).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('users', nargs='*', help='Usernames of the users to rebuild (default: all).')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+        updated = rebuild_posts_counts(users)
+        self.stdout.write(self.style.SUCCESS('Rebuilt the posts count of {} user(s).'.format(updated)))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def create_profiles(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Profile = apps.get_model('accounts', 'Profile')
+    Post = apps.get_model('boards', 'Post')
+    posts = Post.objects.filter(created_by=OuterRef('pk')).order_by()
+    users = User.objects.annotate(total=Coalesce(Subquery(
+        posts.values('created_by').annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()), Value(0)))
+    Profile.objects.bulk_create(
+        (Profile(user_id=pk, posts_count=total) for pk, total in users.values_list('pk', 'total').iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('boards', '0009_fragment_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(create_profiles, migrations.RunPython.noop),
+    ]
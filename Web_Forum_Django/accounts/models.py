@@ -1,3 +1,13 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class Profile(models.Model):
+    user = models.OneToOneField(User, related_name='profile', on_delete=models.CASCADE)
+    # Number of posts of the user, shown next to each of its posts in topic_posts.html
+    # instead of a COUNT per post. It is maintained by the signal handlers in accounts/signals.py
+    # and can be rebuilt with `python manage.py rebuild_posts_counts`.
+    posts_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.user.username
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from boards.models import Post
+
+from .models import Profile
+
+'''
+Every user has a Profile, created with it, whose posts_count follows the creation and the
+deletion of its posts. Like the board counters (boards/signals.py), each handler is a single
+UPDATE with an F() expression.
+'''
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        if not Profile.objects.filter(user_id=instance.created_by_id).update(posts_count=F('posts_count') + 1):
+            # A user created without its profile (e.g. before the profiles existed): counted from scratch.
+            Profile.objects.get_or_create(user_id=instance.created_by_id, defaults={
+                'posts_count': Post.objects.filter(created_by_id=instance.created_by_id).count(),
+            })
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    Profile.objects.filter(user_id=instance.created_by_id, posts_count__gt=0).update(posts_count=F('posts_count') - 1)
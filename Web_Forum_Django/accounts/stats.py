@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from boards.models import Post
+
+from .models import Profile
+
+
+def posts_count_subquery(user_ref='user'):
+    # The number of posts of a user, correlated so it can be used inside an UPDATE or an INSERT ... SELECT.
+    counts = Post.objects.filter(created_by=OuterRef(user_ref)).order_by().values('created_by').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def rebuild_posts_counts(users=None):
+    '''
+    Create the missing profiles, then recompute Profile.posts_count of the given users
+    (all of them by default) with a single UPDATE. Return the number of profiles updated.
+    '''
+    if users is None:
+        users = User.objects.all()
+    missing = users.filter(profile__isnull=True).values_list('pk', flat=True)
+    Profile.objects.bulk_create([Profile(user_id=pk) for pk in missing.iterator()], batch_size=500, ignore_conflicts=True)
+    return Profile.objects.filter(user__in=users.values('pk')).update(posts_count=posts_count_subquery())
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from tasks.queue import task
+
+
+@task(max_attempts=5, retry_delay=60)
+def send_email(subject, body, from_email, recipients, html=None):
+    # Retried when the SMTP server is unavailable.
+    message = EmailMultiAlternatives(subject, body, from_email, recipients)
+    if html is not None:
+        message.attach_alternative(html, 'text/html')
+    message.send()
+
+
+@task(max_attempts=5, retry_delay=60)
+def send_password_reset_email(user_pk, context, subject_template_name, email_template_name,
+                              from_email=None, html_email_template_name=None):
+    '''
+    The reset link is only made here, from the id of the user: the stored task holds nothing
+    that could be used to take over the account (`context` is the domain, the site name, the protocol).
+    '''
+    User = get_user_model()
+    user = User._default_manager.filter(pk=user_pk, is_active=True).first()
+    if user is None:
+        return
+    email = getattr(user, User.get_email_field_name())
+    context = dict(
+        context,
+        email=email,
+        user=user,
+        uid=urlsafe_base64_encode(force_bytes(user.pk)),
+        token=default_token_generator.make_token(user),
+    )
+    # Email subject *must not* contain newlines
+    subject = ''.join(render_to_string(subject_template_name, context).splitlines())
+    body = render_to_string(email_template_name, context)
+    html = render_to_string(html_email_template_name, context) if html_email_template_name else None
+    send_email(subject, body, from_email, [email], html=html)
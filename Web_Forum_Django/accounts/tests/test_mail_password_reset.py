@@ -1,26 +1,32 @@
+import re
+
+from django.contrib.auth.tokens import default_token_generator
 from django.core import mail
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.test import TestCase
+from tasks.queue import run_due_tasks
 
 class PasswordResetMailTests(TestCase):
     def setUp(self):
         User.objects.create_user(username='john', email='john@doe.com', password='123')
         self.response = self.client.post(reverse('password_reset'), { 'email': 'john@doe.com' })
+        # The email is sent by the task worker.
+        run_due_tasks()
         self.email = mail.outbox[0]
 
     def test_email_subject(self):
         self.assertEqual('[Django Boards] Please reset your password', self.email.subject)
 
     def test_email_body(self):
-        context = self.response.context
-        token = context.get('token')
-        uid = context.get('uid')
-        password_reset_token_url = reverse('password_reset_confirm', kwargs={
-            'uidb64': uid,
-            'token': token
-        })
-        self.assertIn(password_reset_token_url, self.email.body)
+        # The token is made by the task, when the email is sent.
+        user = User.objects.get(username='john')
+        match = re.search(r'/password_reset/(?P<uidb64>[^/]+)/(?P<token>[^/]+)/', self.email.body)
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group('uidb64'), urlsafe_base64_encode(force_bytes(user.pk)))
+        self.assertTrue(default_token_generator.check_token(user, match.group('token')))
         self.assertIn('john', self.email.body)
         self.assertIn('john@doe.com', self.email.body)
 
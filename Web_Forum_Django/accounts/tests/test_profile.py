@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from boards.models import Board, Post, Topic
+
+from ..models import Profile
+
+
+class ProfileTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.post = Post.objects.create(message='Lorem ipsum dolor sit amet', topic=self.topic, created_by=self.user)
+
+    def posts_count(self, user):
+        return Profile.objects.get(user=user).posts_count
+
+
+class PostsCountTests(ProfileTestCase):
+    def test_profile_created_with_the_user(self):
+        user = User.objects.create_user(username='jane', password='123')
+        self.assertEquals(self.posts_count(user), 0)
+
+    def test_counter_after_creation_and_deletion(self):
+        self.assertEquals(self.posts_count(self.user), 1)
+        Post.objects.create(message='Second post', topic=self.topic, created_by=self.user)
+        self.assertEquals(self.posts_count(self.user), 2)
+        self.post.delete()
+        self.assertEquals(self.posts_count(self.user), 1)
+
+    def test_delete_topic(self):
+        self.topic.delete()
+        self.assertEquals(self.posts_count(self.user), 0)
+
+    def test_missing_profile(self):
+        Profile.objects.filter(user=self.user).delete()
+        Post.objects.create(message='Second post', topic=self.topic, created_by=self.user)
+        self.assertEquals(self.posts_count(self.user), 2)
+
+
+class RebuildPostsCountsCommandTests(ProfileTestCase):
+    def test_rebuild(self):
+        Profile.objects.update(posts_count=42)
+        call_command('rebuild_posts_counts', stdout=StringIO())
+        self.assertEquals(self.posts_count(self.user), 1)
+
+    def test_rebuild_creates_missing_profiles(self):
+        Profile.objects.all().delete()
+        call_command('rebuild_posts_counts', 'john', stdout=StringIO())
+        self.assertEquals(self.posts_count(self.user), 1)
+
+
+class TopicPostsAuthorTests(ProfileTestCase):
+    def test_query_count_does_not_depend_on_the_number_of_authors(self):
+        url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        # The first visit creates the session and counts the view.
+        self.client.get(url)
+        # The conditional GET validators, the session, the topic and the posts with their authors and profiles.
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertContains(response, 'Posts: 1')
+        for i in range(10):
+            user = User.objects.create_user(username='user{}'.format(i), password='123')
+            Post.objects.create(message='Lorem ipsum', topic=self.topic, created_by=user)
+        with self.assertNumQueries(4):
+            self.client.get(url)
@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth import views as auth_views
 from django.urls import resolve,reverse
 from django.test import TestCase
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
 
 
 class PasswordChangeTests(TestCase):
@@ -108,4 +109,17 @@ class InvalidPasswordChangeTests(PasswordChangeTestCase):
         sure we have the latest data.
         '''
         self.user.refresh_from_db()
-        self.assertTrue(self.user.check_password('old_password'))
\ No newline at end of file
+        self.assertTrue(self.user.check_password('old_password'))
+
+
+class PasswordChangeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def test_query_budget(self):
+        User.objects.create_user(username='john', email='john@doe.com', password='old_password')
+        self.client.login(username='john', password='old_password')
+        data = {
+            'old_password': 'old_password',
+            'new_password1': 'new_password',
+            'new_password2': 'new_password',
+        }
+        with self.assertQueryBudget('password_change'):
+            self.client.post(reverse('password_change'), data)
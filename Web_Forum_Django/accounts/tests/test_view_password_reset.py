@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -7,6 +9,8 @@ from django.contrib.auth.models import User
 from django.core import mail
 from django.urls import resolve,reverse
 from django.test import TestCase
+from tasks.models import Task
+from tasks.queue import run_due_tasks
 
 
 class PasswordResetTests(TestCase):
@@ -51,8 +55,23 @@ class SuccessfulPasswordResetTests(TestCase):
         self.assertRedirects(self.response, url)
 
     def test_send_password_reset_email(self):
+        # Queued during the request, sent by the task worker.
+        self.assertEqual(0, len(mail.outbox))
+        self.assertEqual(1, Task.objects.filter(name='accounts.tasks.send_password_reset_email').count())
+        run_due_tasks()
         self.assertEqual(1, len(mail.outbox))
 
+    def test_reset_link_is_not_stored(self):
+        '''
+        The queued task only knows the id of the user, the link is made when the email is sent.
+        '''
+        task = Task.objects.get(name='accounts.tasks.send_password_reset_email')
+        stored = json.dumps([task.args, task.kwargs])
+        run_due_tasks()
+        self.assertIn('/password_reset/', mail.outbox[0].body)
+        self.assertNotIn('/password_reset/', stored)
+        self.assertNotIn('token', stored)
+
 
 class InvalidPasswordResetTests(TestCase):
     def setUp(self):
@@ -68,6 +87,7 @@ class InvalidPasswordResetTests(TestCase):
         self.assertRedirects(self.response, url)
 
     def test_no_reset_email_sent(self):
+        run_due_tasks()
         self.assertEqual(0, len(mail.outbox))
 
 
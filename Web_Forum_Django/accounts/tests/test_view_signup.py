@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from django.urls import resolve, reverse
 from django.test import TestCase
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
 
 from ..views import signup
 from ..forms import SignUpForm
@@ -82,4 +83,16 @@ class InvalidSignUpTests(TestCase):
         self.assertTrue(form.errors)
 
     def test_dont_create_user(self):
-        self.assertFalse(User.objects.exists())
\ No newline at end of file
+        self.assertFalse(User.objects.exists())
+
+
+class SignUpQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def test_query_budget(self):
+        data = {
+            'username': 'john',
+            'email': 'john@doe.com',
+            'password1': 'abcdef123456',
+            'password2': 'abcdef123456'
+        }
+        with self.assertQueryBudget('signup'):
+            self.client.post(reverse('signup'), data)
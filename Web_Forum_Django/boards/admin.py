@@ -1,4 +1,179 @@
-from django.contrib import admin
-from .models import Board
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import IS_FACETS_VAR, IS_POPUP_VAR, ORDER_VAR, PAGE_VAR, TO_FIELD_VAR
+from django.core.paginator import Paginator
+from django.db.models import Sum
 
-admin.site.register(Board)
\ No newline at end of file
+from .models import Board, Post, Topic
+from .purge import hide_boards, hide_topics
+from .search import matching_post_ids, matching_topic_ids
+from .stats import rebuild_board_stats, rebuild_topic_stats
+from .tasks import rerender_posts
+
+'''
+The admin of the boards, topics and posts, usable with millions of posts:
+
+- no exact COUNT(*) of the changelists: the number of topics and posts comes from the Board counters
+  (all of them, or the board filtered on), and the "N total" of a filtered list isn't shown;
+- the related rows shown in the lists are joined (list_select_related) and the users, topics and
+  posts are picked by id (raw_id_fields) instead of <select>s listing all of them;
+- the search goes through the full-text index (boards/search.py) and the unique index of the usernames,
+  the lists are only sortable by indexed columns;
+- the actions are single UPDATEs over the selected rows. The boards and topics aren't deleted
+  by Django's collector, which would load all their posts: they are hidden, then deleted in the
+  background by small batches (boards/purge.py). The hidden ones aren't listed anymore.
+'''
+
+
+class EstimatedCountPaginator(Paginator):
+    '''
+    A Paginator whose number of rows can be given (e.g. from a counter) instead of counted.
+    '''
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+# The query string parameters that don't change which rows are listed.
+DISPLAY_VARS = {PAGE_VAR, ORDER_VAR, IS_POPUP_VAR, TO_FIELD_VAR, IS_FACETS_VAR}
+
+
+class ForumAdmin(admin.ModelAdmin):
+    # Whether the rows are deleted by Django (the "Delete selected" action and the Delete button),
+    # or hidden then purged, with `hide`.
+    bulk_delete = False
+    hide = None
+
+    def has_delete_permission(self, request, obj=None):
+        return self.bulk_delete and super().has_delete_permission(request, obj)
+
+    def has_hide_permission(self, request):
+        return super().has_delete_permission(request)
+
+    @admin.action(permissions=['hide'], description='Delete the selected %(verbose_name_plural)s (in the background)')
+    def hide_selected(self, request, queryset):
+        hidden = self.hide(queryset)
+        self.message_user(request, '{} {} hidden, they will be deleted in the background.'.format(
+            hidden, self.model._meta.verbose_name_plural), messages.SUCCESS)
+
+
+class CounterAdmin(ForumAdmin):
+    '''
+    A changelist paginated with `estimated_count(request)` when it returns a number.
+    '''
+    show_full_result_count = False
+    # The Board counter of the listed rows.
+    count_field = None
+    # The lookups leaving out the hidden rows, which the counters don't count either.
+    visible = {}
+    # The board filter of the changelist, answered by that board's counters.
+    board_filter = None
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(**self.visible)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return EstimatedCountPaginator(
+            queryset, per_page, count=self.estimated_count(request),
+            orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+        )
+
+    def estimated_count(self, request):
+        filters = {name: value for name, value in request.GET.items() if name not in DISPLAY_VARS}
+        boards = Board.objects.filter(is_hidden=False)
+        if self.board_filter and set(filters) == {self.board_filter} and filters[self.board_filter].isdigit():
+            boards = boards.filter(pk=filters[self.board_filter])
+        elif filters:
+            # Searched or filtered otherwise: counted.
+            return None
+        return boards.aggregate(total=Sum(self.count_field))['total'] or 0
+
+
+@admin.register(Board)
+class BoardAdmin(ForumAdmin):
+    list_display = ('name', 'description', 'topics_count', 'posts_count', 'last_post')
+    list_select_related = ('last_post',)
+    search_fields = ('name',)
+    readonly_fields = ('topics_count', 'posts_count', 'last_post')
+    actions = ('hide_selected', 'rebuild_stats')
+    hide = staticmethod(hide_boards)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(is_hidden=False)
+
+    @admin.action(description='Rebuild the statistics of the selected boards')
+    def rebuild_stats(self, request, queryset):
+        rebuild_topic_stats(Topic.objects.filter(board__in=queryset))
+        updated = rebuild_board_stats(queryset)
+        self.message_user(request, 'Rebuilt the statistics of {} board(s).'.format(updated), messages.SUCCESS)
+
+
+@admin.register(Topic)
+class TopicAdmin(CounterAdmin):
+    list_display = ('subject', 'board', 'starter', 'posts_count', 'views', 'last_updated')
+    list_select_related = ('board', 'starter')
+    list_filter = ('board',)
+    board_filter = 'board__id__exact'
+    # Listed by primary key: no index sorts the topics of all the boards by another column.
+    sortable_by = ()
+    ordering = ('-pk',)
+    raw_id_fields = ('starter',)
+    readonly_fields = ('posts_count', 'views')
+    search_help_text = 'Words of the subject, or the exact username of the starter.'
+    search_fields = ('subject',)
+    actions = ('hide_selected', 'rebuild_posts_count')
+    hide = staticmethod(hide_topics)
+    visible = {'is_hidden': False, 'board__is_hidden': False}
+    count_field = 'topics_count'
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        topics = matching_topic_ids(search_term, settings.ADMIN_SEARCH_LIMIT)
+        starters = queryset.filter(starter__username=search_term).values('pk')[:settings.ADMIN_SEARCH_LIMIT]
+        return queryset.filter(pk__in=topics) | queryset.filter(pk__in=starters), False
+
+    @admin.action(description='Rebuild the posts count of the selected topics and their boards')
+    def rebuild_posts_count(self, request, queryset):
+        updated = rebuild_topic_stats(queryset)
+        # The counters of their boards are likely off as well.
+        rebuild_board_stats(Board.objects.filter(pk__in=queryset.values('board_id')))
+        self.message_user(request, 'Rebuilt the posts count of {} topic(s).'.format(updated), messages.SUCCESS)
+
+
+@admin.register(Post)
+class PostAdmin(CounterAdmin):
+    list_display = ('__str__', 'topic', 'created_by', 'created_at')
+    list_select_related = ('topic', 'created_by')
+    list_filter = ('topic__board',)
+    board_filter = 'topic__board__id__exact'
+    # post_created_at_idx
+    sortable_by = ('created_at',)
+    ordering = ('-pk',)
+    raw_id_fields = ('topic', 'created_by', 'updated_by')
+    # Rendered again when the message is saved.
+    exclude = ('message_html', 'message_html_version')
+    search_help_text = 'Words of the message, or the exact username of the author.'
+    search_fields = ('message',)
+    actions = ('rerender',)
+    # A page of posts deleted one by one, the signal handlers keep the counters right.
+    bulk_delete = True
+    visible = {'topic__is_hidden': False, 'topic__board__is_hidden': False}
+    count_field = 'posts_count'
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        posts = matching_post_ids(search_term, settings.ADMIN_SEARCH_LIMIT)
+        authors = queryset.filter(created_by__username=search_term).values('pk')[:settings.ADMIN_SEARCH_LIMIT]
+        return queryset.filter(pk__in=posts) | queryset.filter(pk__in=authors), False
+
+    @admin.action(description='Render the selected messages again')
+    def rerender(self, request, queryset):
+        # Marked as outdated: shown rendered on the fly until the background task has rendered them.
+        updated = queryset.exclude(message_html_version=0).update(message_html_version=0)
+        rerender_posts.enqueue(dedupe_key='rerender_posts')
+        self.message_user(request, '{} post(s) will be rendered again by the background tasks.'.format(updated), messages.SUCCESS)
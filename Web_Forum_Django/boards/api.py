@@ -0,0 +1,220 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db.models import F, IntegerField
+from django.db.models.functions import Greatest
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from .conditional import board_topics_state, conditional_page, home_state, topic_posts_state
+from .models import Board, Post, Topic
+from .pagination import KeysetPaginator
+from .rendering import MARKDOWN_RENDERER_VERSION, render_many
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+'''
+Read-only JSON API mirroring the home, board_topics and topic_posts pages:
+
+    /api/boards/
+    /api/boards/<pk>/topics/
+    /api/boards/<pk>/topics/<topic_pk>/posts/
+
+The rows are fetched with .values(), no model instance is created, and serialized with orjson
+(the json module when it isn't installed). `?fields=id,subject` selects the fields, `?limit=`
+the page size (up to API_MAX_PAGE_SIZE) and the pages are linked by keyset cursors, `next`
+and `previous` in the response. The ETag and the 304 answers come from boards/conditional.py,
+like the HTML pages. The API doesn't count the topic views.
+'''
+
+
+def _default(value):
+    # The datetimes as orjson writes them: ISO 8601 with the UTC offset.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class JsonListView(View):
+    '''
+    A list of rows as JSON. `fields` maps every public field to what selects it in .values():
+    a lookup (e.g. 'starter__username') or an expression. `ordering` is the keyset pagination order,
+    without `paginate` all the rows are returned.
+    '''
+    fields = {}
+    ordering = ()
+    paginate = True
+    # Lookups also needed to compute a field in prepare_rows().
+    dependencies = {}
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = self.get_fields()
+            rows, page = self.get_rows(fields)
+        except ApiError as error:
+            return json_response({'detail': str(error)}, status=error.status)
+        self.prepare_rows(rows, fields)
+        data = {'results': [{name: row[name] for name in fields} for row in rows]}
+        if self.paginate:
+            data['next'] = self.page_url(page.next_cursor)
+            data['previous'] = self.page_url(page.previous_cursor)
+        return json_response(data)
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def exists(self):
+        '''
+        Whether the parent object (board, topic) exists, only asked when there is no row.
+        '''
+        return True
+
+    def get_fields(self):
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return list(self.fields)
+        fields = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in self.fields]
+        if unknown:
+            raise ApiError('Unknown field(s): {}. Available: {}.'.format(', '.join(unknown), ', '.join(self.fields)))
+        return fields
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit', settings.API_PAGE_SIZE))
+        except ValueError:
+            raise ApiError('limit is not an integer.')
+        if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+            raise ApiError('limit must be between 1 and {}.'.format(settings.API_MAX_PAGE_SIZE))
+        return limit
+
+    def get_rows(self, fields):
+        lookups, expressions = {}, {}
+        for name in fields:
+            selector = self.fields[name]
+            if isinstance(selector, str):
+                lookups[selector] = name
+            else:
+                expressions[name] = selector
+            for dependency in self.dependencies.get(name, ()):
+                lookups.setdefault(dependency, dependency)
+        # The pagination reads the ordering columns of the first and last rows.
+        for ordering in self.ordering:
+            lookups.setdefault(ordering.lstrip('-'), ordering.lstrip('-'))
+        queryset = self.get_queryset().values(*lookups, **expressions)
+        page = None
+        if self.paginate:
+            paginator = KeysetPaginator(queryset, self.get_limit(), self.ordering)
+            cursor = self.request.GET.get('cursor')
+            try:
+                page = paginator.page_from_cursor(cursor) if cursor else paginator.first_page()
+            except InvalidPage as e:
+                raise ApiError(str(e))
+            rows = page.object_list
+        else:
+            rows = list(queryset.order_by(*self.ordering))
+        if not rows and not self.exists():
+            raise ApiError('Not found.', status=404)
+        for row in rows:
+            for lookup, name in lookups.items():
+                if lookup != name:
+                    row[name] = row.pop(lookup)
+        return rows, page
+
+    def prepare_rows(self, rows, fields):
+        pass
+
+    def page_url(self, cursor):
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query['cursor'] = cursor
+        return '{}?{}'.format(self.request.path, query.urlencode())
+
+
+@method_decorator(conditional_page(home_state), name='get')
+class BoardListApiView(JsonListView):
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'topics_count': 'topics_count',
+        'posts_count': 'posts_count',
+        'last_post_at': 'last_post__created_at',
+        'last_post_by': 'last_post__created_by__username',
+    }
+    ordering = ('id',)
+    # Like the home page, all the boards.
+    paginate = False
+
+    def get_queryset(self):
+        return Board.objects.filter(is_hidden=False)
+
+
+@method_decorator(conditional_page(board_topics_state), name='get')
+class TopicListApiView(JsonListView):
+    fields = {
+        'id': 'id',
+        'subject': 'subject',
+        'starter': 'starter__username',
+        'replies': Greatest(F('posts_count') - 1, 0, output_field=IntegerField()),
+        'views': 'views',
+        'last_updated': 'last_updated',
+    }
+    ordering = ('-last_updated', '-id')
+
+    def get_queryset(self):
+        return Topic.objects.filter(board_id=self.kwargs['pk'], is_hidden=False, board__is_hidden=False)
+
+    def exists(self):
+        return Board.objects.filter(pk=self.kwargs['pk'], is_hidden=False).exists()
+
+
+@method_decorator(conditional_page(topic_posts_state), name='get')
+class PostListApiView(JsonListView):
+    fields = {
+        'id': 'id',
+        'message': 'message',
+        'message_html': 'message_html',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'created_by': 'created_by__username',
+    }
+    ordering = ('created_at', 'id')
+    dependencies = {'message_html': ['message', 'message_html_version']}
+
+    def get_queryset(self):
+        return Post.objects.filter(
+            topic_id=self.kwargs['topic_pk'], topic__board_id=self.kwargs['pk'], topic__is_hidden=False, topic__board__is_hidden=False,
+        )
+
+    def exists(self):
+        return Topic.objects.filter(board_id=self.kwargs['pk'], pk=self.kwargs['topic_pk'], is_hidden=False, board__is_hidden=False).exists()
+
+    def prepare_rows(self, rows, fields):
+        # The messages rendered by an older version of the renderer, like Post.render_outdated().
+        if 'message_html' in fields:
+            outdated = [row for row in rows if row['message_html_version'] != MARKDOWN_RENDERER_VERSION]
+            for row, html in zip(outdated, render_many([row['message'] for row in outdated])):
+                row['message_html'] = html
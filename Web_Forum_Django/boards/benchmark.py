@@ -0,0 +1,273 @@
+import json
+import math
+import statistics
+import time
+from contextlib import contextmanager
+from importlib import import_module, reload
+
+from django.conf import settings
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+
+from Web_Forum_Django.query_inspector import record_queries
+
+'''
+Helpers of the benchmark management commands: time a view many times,
+summarize the latencies as percentiles and compare the results with a baseline run.
+'''
+
+
+def percentile(values, percent):
+    # Nearest-rank percentile of a non-empty list.
+    ordered = sorted(values)
+    rank = max(int(math.ceil(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[rank]
+
+
+def summarize(latencies, query_counts):
+    return {
+        'iterations': len(latencies),
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'queries': max(query_counts),
+    }
+
+
+class _Rollback(Exception):
+    pass
+
+
+def benchmark_request(client, method, url, data=None, iterations=100, warmup=5, rollback=False):
+    '''
+    Send the same request `iterations` times and return the latency percentiles and the number of queries.
+    With `rollback`, every request runs in a transaction rolled back afterwards,
+    so benchmarking a write view leaves the database unchanged.
+    '''
+    latencies = []
+    query_counts = []
+    for i in range(warmup + iterations):
+        try:
+            with transaction.atomic():
+                with record_queries() as recorder:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(url, data)
+                    elapsed = time.perf_counter() - start
+                if rollback:
+                    raise _Rollback
+        except _Rollback:
+            pass
+        if response.status_code >= 400:
+            raise RuntimeError('{} {} returned {}'.format(method.upper(), url, response.status_code))
+        if i >= warmup:
+            latencies.append(elapsed)
+            query_counts.append(len(recorder))
+    return summarize(latencies, query_counts)
+
+
+def make_client(user=None):
+    client = Client(HTTP_HOST='localhost')
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def save_results(path, results):
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True, default=str)
+
+
+def load_results(path):
+    with open(path) as results:
+        return json.load(results)
+
+
+def compare(results, baseline, metric='p95_ms'):
+    '''
+    (name, baseline value, new value, ratio) for every case present in both runs.
+    '''
+    rows = []
+    for name, stats in results['cases'].items():
+        before = baseline['cases'].get(name)
+        if before is None:
+            continue
+        ratio = stats[metric] / before[metric] if before[metric] else float('inf')
+        rows.append((name, before[metric], stats[metric], ratio))
+    return rows
+
+
+def sqlite_write_workload(path, threads=8, writes=200, tuned=True):
+    '''
+    Concurrent writers on an SQLite file, each write reading then inserting in a transaction
+    like reply_topic does. `tuned` uses the production profile of Web_Forum_Django/sqlite
+    (pragmas, BEGIN IMMEDIATE and retries), otherwise the defaults of Django's sqlite3 backend.
+    Return the number of successful writes per second and the number of "database is locked" errors.
+    '''
+    import sqlite3
+    import threading
+
+    from Web_Forum_Django.sqlite import configure_connection, retry_on_locked
+
+    setup = sqlite3.connect(path)
+    setup.execute('CREATE TABLE IF NOT EXISTS post (id INTEGER PRIMARY KEY, topic INTEGER, message TEXT)')
+    setup.commit()
+    setup.close()
+    errors = []
+    done = []
+
+    def writer(number):
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        if tuned:
+            configure_connection(conn)
+
+        def write(i):
+            conn.execute('BEGIN IMMEDIATE' if tuned else 'BEGIN')
+            try:
+                conn.execute('SELECT COUNT(*) FROM post WHERE topic = ?', (number,)).fetchone()
+                conn.execute('INSERT INTO post (topic, message) VALUES (?, ?)', (number, 'Reply {}'.format(i)))
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+
+        for i in range(writes):
+            try:
+                if tuned:
+                    retry_on_locked(lambda: write(i), retries=10)
+                else:
+                    write(i)
+                done.append(1)
+            except sqlite3.OperationalError as error:
+                errors.append(str(error))
+        conn.close()
+
+    workers = [threading.Thread(target=writer, args=(number,)) for number in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return {'writes_per_second': len(done) / elapsed, 'writes': len(done), 'errors': len(errors)}
+
+
+@contextmanager
+def list_views(asynchronous):
+    '''
+    Serve the board, topic and post lists with their async views (or the sync ones)
+    by reloading the URLconf with ASYNC_VIEWS set accordingly.
+    '''
+    urlconf = import_module(settings.ROOT_URLCONF)
+    try:
+        with override_settings(ASYNC_VIEWS=asynchronous):
+            clear_url_caches()
+            reload(urlconf)
+            yield
+    finally:
+        clear_url_caches()
+        reload(urlconf)
+
+
+def throughput(urls, requests=500, concurrency=50, asynchronous=False):
+    '''
+    Requests per second with `concurrency` requests in flight, cycling through `urls`.
+    Synchronous: the sync views through the WSGI handler, one thread per concurrent request.
+    Asynchronous: the async views through the ASGI handler, concurrent tasks on one event loop.
+    '''
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.test import AsyncClient
+
+    statuses = []
+    # Every concurrent worker is a client with its own cookies (session), taking the next request number.
+    numbers = iter(range(requests))
+
+    def worker():
+        client = make_client()
+        for i in numbers:
+            statuses.append(client.get(urls[i % len(urls)]).status_code)
+
+    async def aworker():
+        client = AsyncClient()
+        for i in numbers:
+            response = await client.get(urls[i % len(urls)])
+            statuses.append(response.status_code)
+
+    async def run_async():
+        await asyncio.gather(*(aworker() for _ in range(concurrency)))
+
+    with list_views(asynchronous):
+        start = time.perf_counter()
+        if asynchronous:
+            asyncio.run(run_async())
+        else:
+            with ThreadPoolExecutor(concurrency) as executor:
+                for future in [executor.submit(worker) for _ in range(concurrency)]:
+                    future.result()
+        elapsed = time.perf_counter() - start
+    errors = sum(1 for status in statuses if status >= 400)
+    return {'requests_per_second': len(statuses) / elapsed, 'requests': len(statuses), 'errors': errors}
+
+
+def session_workload(views=5000, topics=3000, compact=True, seed=0):
+    '''
+    One reader opening `views` topics picked among `topics` (the popular ones more often),
+    one request each. Return the size of the encoded session at the end and the number of requests
+    that modified the session, i.e. rewrote its row in django_session.
+    `compact` uses ViewedTopics, otherwise the former `viewed_topic_<pk>` key per topic.
+    '''
+    import random
+    from importlib import import_module
+
+    from .counters import mark_topic_viewed
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    randomizer = random.Random(seed)
+    weights = [1 / rank for rank in range(1, topics + 1)]
+    writes = 0
+    for topic_pk in randomizer.choices(range(1, topics + 1), weights, k=views):
+        session.modified = False
+        if compact:
+            mark_topic_viewed(session, topic_pk)
+        else:
+            session_key = 'viewed_topic_{}'.format(topic_pk)
+            if not session.get(session_key, False):
+                session[session_key] = True
+        writes += session.modified
+    return {'views': views, 'writes': writes, 'session_bytes': len(session.encode(session._session))}
+
+
+def markdown_workload(posts=2000):
+    '''
+    Per-post cost (in microseconds) of rendering `posts` distinct messages, in pages of 20:
+    a new Markdown instance per post (the former render_markdown()), the reused per-thread
+    renderer of boards.rendering, and the same pages again served from its LRU cache.
+    '''
+    from markdown import markdown
+
+    from boards.management.commands.generate_forum import MESSAGES
+
+    from . import rendering
+
+    texts = ['{}\n\nPost #{}'.format(MESSAGES[i % len(MESSAGES)], i) for i in range(posts)]
+    pages = [texts[i:i + 20] for i in range(0, posts, 20)]
+
+    def per_post(render_page):
+        start = time.perf_counter()
+        for page in pages:
+            render_page(page)
+        return (time.perf_counter() - start) / posts * 1e6
+
+    rendering._cache.clear()
+    results = {
+        'new_instance_us': per_post(lambda page: [markdown(text, extensions=[rendering.EscapeHtmlExtension()]) for text in page]),
+        'reused_renderer_us': per_post(rendering.render_many),
+        'cached_us': per_post(rendering.render_many),
+    }
+    rendering._cache.clear()
+    return results
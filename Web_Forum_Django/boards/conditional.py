@@ -0,0 +1,109 @@
+import functools
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .models import Board, Post, Topic
+
+'''
+Conditional GET for the board, topic and post lists.
+
+Before the view runs, one small query reads what the page is made of (the denormalized counters
+and dates of the board or topic). The ETag is a hash of it, of the user (the navigation bar and
+the Edit buttons depend on who is logged in) and of a CONDITIONAL_GET_MAX_AGE time window, so the
+parts the validators don't cover (view counts, "2 minutes ago" dates, authors' post counts) are
+never more than that old. A request with a matching If-None-Match gets a 304 without running the
+page queries nor rendering the template.
+
+There is no Last-Modified: the dates of the state don't move back when a post is deleted or a topic
+hidden, an If-Modified-Since would get a 304 for a page that changed. The counters in the ETag do.
+'''
+
+
+def home_state(request):
+    state = Board.objects.filter(is_hidden=False).aggregate(
+        boards=Count('pk'),
+        posts=Sum('posts_count'),
+        topics=Sum('topics_count'),
+        last_post_at=Max('last_post__created_at'),
+    )
+    return list(state.values())
+
+
+def board_topics_state(request, pk):
+    state = Board.objects.filter(pk=pk).values('is_hidden', 'topics_count', 'posts_count', 'last_post_id', 'last_post__created_at').first()
+    # Checked here rather than in the WHERE clause, which would make SQLite sort the single row of .first().
+    if state is None or state.pop('is_hidden'):
+        return None
+    return list(state.values())
+
+
+def topic_posts_state(request, pk, topic_pk):
+    # The last edition of a post of the topic, an index lookup on (topic, updated_at).
+    last_edit = Post.objects.filter(topic=OuterRef('pk'), updated_at__isnull=False).order_by('-updated_at').values('updated_at')[:1]
+    state = (
+        Topic.objects.filter(board__pk=pk, pk=topic_pk, is_hidden=False, board__is_hidden=False)
+        .annotate(last_edit=Subquery(last_edit))
+        .values('last_updated', 'posts_count', 'last_edit')
+        .first()
+    )
+    if state is None:
+        return None
+    return list(state.values())
+
+
+def make_etag(request, state):
+    window = int(time.time() // settings.CONDITIONAL_GET_MAX_AGE)
+    key = repr([request.get_full_path(), state, request.user.pk, window])
+    return quote_etag(hashlib.blake2b(key.encode(), digest_size=12).hexdigest())
+
+
+def conditional_page(state_func, not_modified=None):
+    '''
+    View decorator answering 304 Not Modified when the page described by `state_func` hasn't changed.
+    `state_func(request, *args, **kwargs)` returns the state, or None when the object doesn't exist
+    (the view answers the 404 then). `not_modified(request, *args, **kwargs)` is called before a 304,
+    for what the view does besides rendering the page (e.g. counting the view of a topic).
+    '''
+    def check(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None, None
+        state = state_func(request, *args, **kwargs)
+        if state is None:
+            return None, None
+        etag = make_etag(request, state)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None and not_modified is not None:
+            not_modified(request, *args, **kwargs)
+        return response, etag
+
+    def finish(response, etag):
+        # Not for the errors (e.g. a bad API request) whose body doesn't depend on the state.
+        if etag is not None and response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+            # The browser keeps the page but asks every time if it changed.
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                not_modified, etag = await sync_to_async(check)(request, *args, **kwargs)
+                if not_modified is not None:
+                    return finish(not_modified, etag)
+                return finish(await view(request, *args, **kwargs), etag)
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                not_modified, etag = check(request, *args, **kwargs)
+                if not_modified is not None:
+                    return finish(not_modified, etag)
+                return finish(view(request, *args, **kwargs), etag)
+        return wrapper
+    return decorator
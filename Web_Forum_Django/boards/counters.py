@@ -0,0 +1,262 @@
+import atexit
+import base64
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from Web_Forum_Django.sqlite import retry_on_locked
+
+from .models import Topic
+
+'''
+Topic view counter.
+
+In the 'exact' mode (the default) every counted view is written right away with an atomic
+UPDATE ... SET views = views + 1, instead of saving the whole Topic row.
+
+In the 'buffered' mode the views are collected in memory and written in batches every
+TOPIC_VIEWS_FLUSH_INTERVAL seconds by a background thread (and once more when the worker exits),
+so a popular topic costs one UPDATE per interval instead of one per view.
+
+A view is counted once per session: the topics already counted are remembered in a
+ViewedTopics filter stored under one session key, which is only written when it changes.
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedViewCounter:
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def hit(self, topic_pk, count=1):
+        with self._lock:
+            self._pending[topic_pk] += count
+            if self._thread is None:
+                self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='topic-views-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                # The views are kept by flush(), the next tick writes them: the thread must not die.
+                logger.exception('Could not write the topic views, retrying in %s seconds', self.interval)
+            finally:
+                # This thread has its own database connection, don't keep it open between flushes.
+                connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        '''
+        Write the pending views to the database and return the number of views written.
+        '''
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        # Topics with the same number of new views are updated by the same statement.
+        by_count = defaultdict(list)
+        for topic_pk, count in pending.items():
+            by_count[count].append(topic_pk)
+        def write():
+            with transaction.atomic():
+                for count, topic_pks in by_count.items():
+                    Topic.objects.filter(pk__in=topic_pks).update(views=F('views') + count)
+        try:
+            retry_on_locked(write)
+        except Exception:
+            # Keep the views for the next flush instead of losing them.
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        return sum(pending.values())
+
+
+_buffered_counter = None
+_buffered_counter_lock = threading.Lock()
+
+
+def get_buffered_counter():
+    global _buffered_counter
+    with _buffered_counter_lock:
+        if _buffered_counter is None:
+            _buffered_counter = BufferedViewCounter(settings.TOPIC_VIEWS_FLUSH_INTERVAL)
+        return _buffered_counter
+
+
+def count_topic_view(topic):
+    if settings.TOPIC_VIEWS_MODE == 'buffered':
+        get_buffered_counter().hit(topic.pk)
+    else:
+        retry_on_locked(lambda: Topic.objects.filter(pk=topic.pk).update(views=F('views') + 1))
+
+
+VIEWED_TOPICS_SESSION_KEY = 'viewed_topics'
+# Sessions from before ViewedTopics have one `viewed_topic_<pk>` key per topic.
+LEGACY_SESSION_KEY_PREFIX = 'viewed_topic_'
+
+
+class ViewedTopics:
+    '''
+    The topics viewed in a session, as Bloom filters: their size doesn't grow with the number of topics,
+    and they are stored zlib-compressed so they are small while they are sparse.
+    A false positive only means that a view isn't counted.
+
+    New topics go into the current generation. After VIEWED_TOPICS_TTL / 2 seconds, or once it is full
+    (VIEWED_TOPICS_CAPACITY topics per VIEWED_TOPICS_BITS bits, to keep the false positive rate low),
+    it becomes the previous generation and the older one is dropped. So a topic is counted again after
+    VIEWED_TOPICS_TTL / 2 to VIEWED_TOPICS_TTL seconds.
+
+    A generation starts with VIEWED_TOPICS_BITS bits. When one fills up before its time, the next one
+    is twice as large, up to VIEWED_TOPICS_MAX_BITS: a reader opening thousands of topics would
+    otherwise forget them, and count and write them again, every few hundred topics.
+
+    The generations expire when the filter is loaded, whether a topic is added or only looked up,
+    and the stored data is only replaced when a topic is added: expiring is computed again from the
+    dates on the next load, it doesn't need a session write.
+    '''
+    def __init__(self, data=None, now=None):
+        self.hashes = settings.VIEWED_TOPICS_HASHES
+        self.now = time.time() if now is None else now
+        data = data or {}
+        self.current = self._decode(data.get('current'))
+        self.current_since = data.get('current_since', self.now)
+        self.current_size = data.get('current_size', 0)
+        self.previous = self._decode(data.get('previous'))
+        self.previous_since = data.get('previous_since')
+        self._expire()
+
+    def _expire(self):
+        if self.current is not None and self.now - self.current_since > settings.VIEWED_TOPICS_TTL / 2:
+            self._rotate()
+        if self.previous is not None and self.now - self.previous_since > settings.VIEWED_TOPICS_TTL:
+            self.previous = self.previous_since = None
+
+    def _rotate(self):
+        self.previous, self.previous_since = self.current, self.current_since
+        self.current = None
+        self.current_size = 0
+
+    def _capacity(self, bitmap):
+        return len(bitmap) * 8 * settings.VIEWED_TOPICS_CAPACITY // settings.VIEWED_TOPICS_BITS
+
+    def _decode(self, value):
+        if value is None:
+            return None
+        return bytearray(zlib.decompress(base64.b64decode(value)))
+
+    def _encode(self, bitmap):
+        if bitmap is None:
+            return None
+        return base64.b64encode(zlib.compress(bytes(bitmap))).decode('ascii')
+
+    def _hashes(self, topic_pk):
+        digest = hashlib.blake2b(str(topic_pk).encode(), digest_size=8).digest()
+        return int.from_bytes(digest[:4], 'little'), int.from_bytes(digest[4:], 'little') | 1
+
+    def _positions(self, bitmap, hashes):
+        # Double hashing: the k positions are h1 + i * h2, within the size of this generation.
+        h1, h2 = hashes
+        bits = len(bitmap) * 8
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def _contains(self, bitmap, hashes):
+        return bitmap is not None and all(bitmap[p >> 3] & (1 << (p & 7)) for p in self._positions(bitmap, hashes))
+
+    def __contains__(self, topic_pk):
+        hashes = self._hashes(topic_pk)
+        return self._contains(self.current, hashes) or self._contains(self.previous, hashes)
+
+    def add(self, topic_pk):
+        '''
+        Remember the topic. Return False if it was already there: nothing changed then.
+        '''
+        hashes = self._hashes(topic_pk)
+        if self._contains(self.current, hashes) or self._contains(self.previous, hashes):
+            return False
+        bits = settings.VIEWED_TOPICS_BITS
+        if self.current is not None and self.current_size >= self._capacity(self.current):
+            # Filled up before its time: the next generation is larger.
+            bits = min(len(self.current) * 8 * 2, settings.VIEWED_TOPICS_MAX_BITS)
+            self._rotate()
+        if self.current is None:
+            self.current = bytearray(bits // 8)
+            self.current_since = self.now
+            self.current_size = 0
+        for p in self._positions(self.current, hashes):
+            self.current[p >> 3] |= 1 << (p & 7)
+        self.current_size += 1
+        return True
+
+    def dump(self):
+        return {
+            'current': self._encode(self.current),
+            'current_since': self.current_since,
+            'current_size': self.current_size,
+            'previous': self._encode(self.previous),
+            'previous_since': self.previous_since,
+        }
+
+
+def _add_viewed_topic(data, session_keys, topic_pk):
+    '''
+    Add the topic to the ViewedTopics stored as `data`.
+    Return whether it is the first view, the data to store (None when unchanged) and the legacy keys to delete.
+    '''
+    viewed = ViewedTopics(data)
+    legacy_keys = []
+    if data is None:
+        legacy_keys = [key for key in session_keys if key.startswith(LEGACY_SESSION_KEY_PREFIX)]
+        for key in legacy_keys:
+            viewed.add(key[len(LEGACY_SESSION_KEY_PREFIX):])
+    first_view = viewed.add(topic_pk)
+    changed = first_view or legacy_keys
+    return first_view, viewed.dump() if changed else None, legacy_keys
+
+
+def mark_topic_viewed(session, topic_pk):
+    '''
+    Return True the first time the topic is viewed in the session.
+    The session is only modified (and saved at the end of the request) when the viewed topics change.
+    '''
+    first_view, data, legacy_keys = _add_viewed_topic(session.get(VIEWED_TOPICS_SESSION_KEY), list(session.keys()), topic_pk)
+    for key in legacy_keys:
+        del session[key]
+    if data is not None:
+        session[VIEWED_TOPICS_SESSION_KEY] = data
+    return first_view
+
+
+async def amark_topic_viewed(session, topic_pk):
+    first_view, data, legacy_keys = _add_viewed_topic(
+        await session.aget(VIEWED_TOPICS_SESSION_KEY), list(await session.akeys()), topic_pk
+    )
+    for key in legacy_keys:
+        await session.apop(key)
+    if data is not None:
+        await session.aset(VIEWED_TOPICS_SESSION_KEY, data)
+    return first_view
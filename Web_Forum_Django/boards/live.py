@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.module_loading import import_string
+
+from .api import dumps
+from .models import Post, Topic
+from .rendering import MARKDOWN_RENDERER_VERSION, render_many
+
+'''
+Live replies: boards/<pk>/topics/<topic_pk>/stream/ is a Server-Sent Events stream of the new posts
+of a topic, used by the last page of topic_posts.html instead of reloading it. It is meant for ASGI
+(LIVE_UPDATES is on with the async views): an idle stream is a coroutine waiting on its queue,
+not a thread.
+
+- The Hub of the process hands every published post to the streams of its topic. Each stream has
+  a bounded queue (LIVE_QUEUE_SIZE): a client reading too slowly loses its queued posts and catches
+  up from the database instead, so it never holds more memory.
+- The posts are published by the post_save signal once committed, through the LIVE_BACKEND:
+  LocalBackend only reaches the streams of the same process, PollingBackend also finds the posts
+  created by the other processes (a WSGI server, other ASGI workers) with one query per watched
+  topic every LIVE_POLL_INTERVAL seconds. Another backend (e.g. Redis pub/sub) only needs
+  publish(), watch() and unwatch().
+- A comment line is sent every LIVE_HEARTBEAT_INTERVAL seconds so the proxies keep the connection open.
+- The event ids are the post ids: on reconnection the browser sends the Last-Event-ID header
+  and the stream starts with the posts created after it.
+'''
+
+logger = logging.getLogger(__name__)
+
+# Put in the queue of a subscription that lost events, to wake its stream up.
+LAGGED = None
+
+
+class Subscription:
+    '''
+    The events of a topic for one stream, delivered in the event loop of the stream.
+    '''
+    def __init__(self, topic_pk):
+        self.topic_pk = topic_pk
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.LIVE_QUEUE_SIZE)
+        self.lagged = False
+
+    def deliver(self, event):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Backpressure: drop what the client didn't read, it will be fetched from the database.
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(LAGGED)
+
+    async def get(self, timeout):
+        '''
+        The next event, LAGGED if some were dropped. Raises asyncio.TimeoutError after `timeout` seconds.
+        '''
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Hub:
+    '''
+    Publish/subscribe of the post events in this process, by topic.
+    publish() can be called from any thread.
+    '''
+    def __init__(self, backend_class):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+        self.backend = backend_class(self)
+
+    def subscribe(self, topic_pk):
+        subscription = Subscription(topic_pk)
+        with self._lock:
+            first = not self._subscriptions[topic_pk]
+            self._subscriptions[topic_pk].add(subscription)
+        if first:
+            self.backend.watch(topic_pk)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        topic_pk = subscription.topic_pk
+        with self._lock:
+            subscriptions = self._subscriptions[topic_pk]
+            subscriptions.discard(subscription)
+            last = not subscriptions
+            if last:
+                del self._subscriptions[topic_pk]
+        if last:
+            self.backend.unwatch(topic_pk)
+
+    def subscribers(self, topic_pk):
+        with self._lock:
+            return len(self._subscriptions.get(topic_pk, ()))
+
+    def publish(self, topic_pk, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(topic_pk, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Its event loop is closed, the stream is gone.
+                pass
+
+
+class LocalBackend:
+    '''
+    Only the posts created by this process reach its streams: enough for a single ASGI process.
+    '''
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, topic_pk, event):
+        self.hub.publish(topic_pk, event)
+
+    def watch(self, topic_pk):
+        pass
+
+    def unwatch(self, topic_pk):
+        pass
+
+
+class PollingBackend(LocalBackend):
+    '''
+    The posts created by any process: while a topic has streams in this process, a task looks
+    for its new posts every LIVE_POLL_INTERVAL seconds, whatever the number of streams.
+    The posts created by this process are still delivered right away.
+    '''
+    def __init__(self, hub):
+        super().__init__(hub)
+        self._tasks = {}
+
+    def watch(self, topic_pk):
+        self._tasks[topic_pk] = asyncio.get_running_loop().create_task(self.poll(topic_pk))
+
+    def unwatch(self, topic_pk):
+        task = self._tasks.pop(topic_pk, None)
+        if task is not None:
+            task.cancel()
+
+    async def poll(self, topic_pk):
+        last_id = await last_post_id(topic_pk)
+        while True:
+            await asyncio.sleep(settings.LIVE_POLL_INTERVAL)
+            try:
+                events = await fetch_events(topic_pk, last_id)
+            except Exception:
+                logger.exception('Polling the new posts of topic %s failed', topic_pk)
+                continue
+            for event in events:
+                last_id = event['id']
+                self.hub.publish(topic_pk, event)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = Hub(import_string(settings.LIVE_BACKEND))
+        return _hub
+
+
+@receiver(setting_changed)
+def reset_hub(setting, **kwargs):
+    global _hub
+    if setting == 'LIVE_BACKEND':
+        with _hub_lock:
+            _hub = None
+
+
+def post_event(post):
+    return {
+        'id': post.pk,
+        'author': post.created_by.username,
+        'html': post.message_html,
+        'created_at': post.created_at,
+    }
+
+
+def publish(post):
+    get_hub().backend.publish(post.topic_id, post_event(post))
+
+
+async def last_post_id(topic_pk):
+    post = await Post.objects.filter(topic_id=topic_pk).order_by('-pk').values('pk').afirst()
+    return post['pk'] if post else 0
+
+
+async def fetch_events(topic_pk, after, limit=None):
+    '''
+    The events of the posts of the topic after the post `after`, oldest first.
+    '''
+    rows = Post.objects.filter(topic_id=topic_pk, pk__gt=after).order_by('pk').values(
+        'pk', 'message', 'message_html', 'message_html_version', 'created_at', 'created_by__username',
+    )
+    rows = [row async for row in rows[:limit]]
+    # Like Post.render_outdated(), for the older posts of a resumed stream.
+    outdated = [row for row in rows if row['message_html_version'] != MARKDOWN_RENDERER_VERSION]
+    for row, html in zip(outdated, render_many([row['message'] for row in outdated])):
+        row['message_html'] = html
+    return [
+        {'id': row['pk'], 'author': row['created_by__username'], 'html': row['message_html'], 'created_at': row['created_at']}
+        for row in rows
+    ]
+
+
+def format_event(event):
+    return 'id: {}\nevent: post\ndata: {}\n\n'.format(event['id'], dumps(event).decode())
+
+
+async def stream_events(topic_pk, last_id):
+    hub = get_hub()
+    subscription = hub.subscribe(topic_pk)
+    try:
+        yield 'retry: {}\n\n'.format(settings.LIVE_RETRY_MS)
+        # First the posts missed since last_id: subscribed before fetching them, none can fall in between.
+        catch_up = True
+        while True:
+            if catch_up:
+                subscription.lagged = False
+                events = await fetch_events(topic_pk, last_id, settings.LIVE_BACKLOG_SIZE)
+                # A full batch: there may be more.
+                catch_up = len(events) == settings.LIVE_BACKLOG_SIZE
+            else:
+                try:
+                    event = await subscription.get(settings.LIVE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ': heartbeat\n\n'
+                    continue
+                if event is LAGGED:
+                    catch_up = True
+                    continue
+                events = [event]
+            for event in events:
+                # The same post may come from the database and from the hub.
+                if event['id'] > last_id:
+                    last_id = event['id']
+                    yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def topic_stream(request, pk, topic_pk):
+    # Under WSGI the endless stream would hold a worker thread for as long as the page is open.
+    if not settings.LIVE_UPDATES:
+        raise Http404('Live updates are off.')
+    topic = await aget_object_or_404(Topic, board__pk=pk, pk=topic_pk, is_hidden=False, board__is_hidden=False)
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        # A new stream: only the posts created from now on.
+        last_id = await last_post_id(topic.pk)
+    response = StreamingHttpResponse(stream_events(topic.pk, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx buffer the events.
+    response['X-Accel-Buffering'] = 'no'
+    return response
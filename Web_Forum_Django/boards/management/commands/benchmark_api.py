@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from boards import benchmark
+from boards.models import Topic
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the requests per second of the home, board_topics and topic_posts pages '
+        'with their JSON API versions, for the same rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=10)
+
+    def handle(self, *args, **options):
+        topic = Topic.objects.order_by('-posts_count').first()
+        if topic is None:
+            raise CommandError('The database is empty, fill it with `python manage.py generate_forum` first.')
+        # HTML page, JSON version, URL arguments
+        pages = [
+            ('home', 'api_boards', {}),
+            ('board_topics', 'api_board_topics', {'pk': topic.board_id}),
+            ('topic_posts', 'api_topic_posts', {'pk': topic.board_id, 'topic_pk': topic.pk}),
+        ]
+        self.stdout.write('{} requests, {} concurrent'.format(options['requests'], options['concurrency']))
+        self.stdout.write('{:<14} {:>12} {:>12} {:>8}'.format('page', 'HTML req/s', 'JSON req/s', 'ratio'))
+        with override_settings(DEBUG=False, QUERY_INSPECTOR_ENABLED=False, ALLOWED_HOSTS=['localhost', 'testserver']):
+            for name, api_name, kwargs in pages:
+                html = benchmark.throughput([reverse(name, kwargs=kwargs)], options['requests'], options['concurrency'])
+                api = benchmark.throughput([reverse(api_name, kwargs=kwargs)], options['requests'], options['concurrency'])
+                if html['errors'] or api['errors']:
+                    raise CommandError('{}: {} HTML and {} JSON errors'.format(name, html['errors'], api['errors']))
+                self.stdout.write('{:<14} {:>12.1f} {:>12.1f} {:>7.1f}x'.format(
+                    name, html['requests_per_second'], api['requests_per_second'],
+                    api['requests_per_second'] / html['requests_per_second'],
+                ))
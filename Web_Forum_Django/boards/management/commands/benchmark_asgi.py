@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from boards import benchmark
+from boards.models import Board, Topic
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the requests per second of the board, topic and post lists under WSGI (sync views, one thread '
+        'per request) and under ASGI (async views on an event loop), with many concurrent requests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+
+    def handle(self, *args, **options):
+        topic = Topic.objects.order_by('-posts_count').first()
+        if topic is None:
+            raise CommandError('The database is empty, fill it with `python manage.py generate_forum` first.')
+        urls = [
+            reverse('home'),
+            reverse('board_topics', kwargs={'pk': topic.board_id}),
+            reverse('topic_posts', kwargs={'pk': topic.board_id, 'topic_pk': topic.pk}),
+        ]
+        self.stdout.write('{} requests, {} concurrent'.format(options['requests'], options['concurrency']))
+        with override_settings(DEBUG=False, QUERY_INSPECTOR_ENABLED=False, ALLOWED_HOSTS=['localhost', 'testserver']):
+            for name, asynchronous in (('WSGI', False), ('ASGI', True)):
+                result = benchmark.throughput(urls, options['requests'], options['concurrency'], asynchronous=asynchronous)
+                self.stdout.write('{:<6} {requests_per_second:>10.1f} requests/s  {errors:>5} errors'.format(name, **result))
@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from boards import benchmark
+from boards.models import Board, Post, Topic
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the latency (p50/p95/p99) and the number of queries of the forum views against the current database, '
+        'e.g. one filled by `generate_forum`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--output', help='Save the results to this JSON file.')
+        parser.add_argument('--baseline', help='Compare the results with this JSON file from a previous run.')
+
+    def get_cases(self):
+        '''
+        (name, method, url, data, rollback, user) of every benchmarked request,
+        using the biggest board and the longest topic, where the views are the slowest.
+        '''
+        board = Board.objects.order_by('-posts_count').first()
+        topic = Topic.objects.order_by('-posts_count').first()
+        user = User.objects.filter(posts__isnull=False).first()
+        if board is None or topic is None or user is None:
+            raise CommandError('The database is empty, fill it with `python manage.py generate_forum` first.')
+        topics_url = reverse('board_topics', kwargs={'pk': board.pk})
+        posts_url = reverse('topic_posts', kwargs={'pk': topic.board_id, 'topic_pk': topic.pk})
+        return [
+            ('home', 'get', reverse('home'), None, False, None),
+            ('board_topics', 'get', topics_url, None, False, None),
+            ('board_topics_last_page', 'get', topics_url, {'page': 'last'}, False, None),
+            ('topic_posts', 'get', posts_url, None, False, user),
+            ('topic_posts_last_page', 'get', posts_url, {'page': 'last'}, False, user),
+            ('new_topic', 'post', reverse('new_topic', kwargs={'pk': board.pk}),
+             {'subject': 'Benchmark topic', 'message': 'Benchmark **message**'}, True, user),
+            ('reply_topic', 'post', reverse('reply_topic', kwargs={'pk': topic.board_id, 'topic_pk': topic.pk}),
+             {'message': 'Benchmark **reply**'}, True, user),
+        ]
+
+    def handle(self, *args, **options):
+        # Measure the views as they run in production: without DEBUG (which records every query)
+        # and without the query inspector middleware.
+        with override_settings(DEBUG=False, QUERY_INSPECTOR_ENABLED=False, ALLOWED_HOSTS=['localhost']):
+            self.run(options)
+
+    def run(self, options):
+        results = {
+            'date': timezone.now().isoformat(),
+            'data': {
+                'users': User.objects.count(),
+                'boards': Board.objects.count(),
+                'topics': Topic.objects.count(),
+                'posts': Post.objects.count(),
+                'longest_topic': Topic.objects.aggregate(posts=Max('posts_count'))['posts'],
+            },
+            'cases': {},
+        }
+        self.stdout.write('{users} users, {boards} boards, {topics} topics, {posts} posts'.format(**results['data']))
+        self.stdout.write('{:<24} {:>9} {:>9} {:>9} {:>9} {:>8}'.format('view', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'queries'))
+        for name, method, url, data, rollback, user in self.get_cases():
+            client = benchmark.make_client(user)
+            stats = benchmark.benchmark_request(
+                client, method, url, data, iterations=options['iterations'], warmup=options['warmup'], rollback=rollback
+            )
+            results['cases'][name] = stats
+            self.stdout.write('{:<24} {p50_ms:>9.2f} {p95_ms:>9.2f} {p99_ms:>9.2f} {max_ms:>9.2f} {queries:>8}'.format(name, **stats))
+
+        if options['baseline']:
+            self.stdout.write('\nComparison of the p95 latency with {}:'.format(options['baseline']))
+            for name, before, after, ratio in benchmark.compare(results, benchmark.load_results(options['baseline'])):
+                self.stdout.write('{:<24} {:>9.2f} -> {:>9.2f} ms  (x{:.2f})'.format(name, before, after, ratio))
+        if options['output']:
+            benchmark.save_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS('Results saved to {}.'.format(options['output'])))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from boards import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Measure the cost per post of the Markdown rendering: new instance per post, reused renderer and cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        result = benchmark.markdown_workload(options['posts'])
+        self.stdout.write('{} posts, in pages of 20'.format(options['posts']))
+        self.stdout.write('new Markdown instance per post {new_instance_us:>8.1f} us/post'.format(**result))
+        self.stdout.write('reused per-thread renderer     {reused_renderer_us:>8.1f} us/post'.format(**result))
+        self.stdout.write('LRU cache hit                  {cached_us:>8.1f} us/post'.format(**result))
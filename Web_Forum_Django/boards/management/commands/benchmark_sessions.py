@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from boards import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare the session size and the session writes of the viewed topics tracking after many topic views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', type=int, default=5000)
+        parser.add_argument('--topics', type=int, default=3000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('{views} topic views among {topics} topics'.format(**options))
+        for name, compact in (('one key per topic', False), ('ViewedTopics', True)):
+            result = benchmark.session_workload(options['views'], options['topics'], compact=compact)
+            self.stdout.write('{:<18} {session_bytes:>9} bytes  {writes:>6} session writes'.format(name, **result))
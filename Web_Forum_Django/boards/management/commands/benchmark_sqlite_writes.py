@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from boards import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare the concurrent write throughput of the default SQLite settings and of the production profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help='Number of writes per thread.')
+
+    def handle(self, *args, **options):
+        for name, tuned in (('default', False), ('production', True)):
+            with tempfile.TemporaryDirectory() as directory:
+                result = benchmark.sqlite_write_workload(
+                    os.path.join(directory, 'writes.sqlite3'), options['threads'], options['writes'], tuned=tuned
+                )
+            self.stdout.write('{:<12} {writes_per_second:>10.0f} writes/s  {writes:>7} writes  {errors:>5} lock errors'.format(name, **result))
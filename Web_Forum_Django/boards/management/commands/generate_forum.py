@@ -0,0 +1,139 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.stats import rebuild_posts_counts
+from boards.models import Board, Post, Topic
+from boards.rendering import MARKDOWN_RENDERER_VERSION, render_markdown
+from boards.stats import rebuild_board_stats, rebuild_topic_stats
+
+MESSAGES = [
+    'Lorem ipsum dolor sit amet, consectetur adipiscing elit.',
+    'Has anyone tried **this** with the latest release?\n\n* first point\n* second point',
+    'You can find more details [in the documentation](https://docs.djangoproject.com/).',
+    'Thanks, that solved my problem!',
+    '```\npython manage.py migrate\n```\n\nThen restart the server.',
+    'I am not sure I understand the question, could you share the traceback?',
+]
+
+
+def zipf_weights(count, skew):
+    # A few items get most of the activity, like the popular boards, topics and users of a real forum.
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+@contextmanager
+def explicit_dates():
+    '''
+    Let bulk_create store the generated dates instead of "now" for the auto_now_add fields.
+    '''
+    fields = [Topic._meta.get_field('last_updated'), Post._meta.get_field('created_at')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic forum (users, boards, topics and posts) to measure the views at realistic sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--boards', type=int, default=10)
+        parser.add_argument('--topics', type=int, default=2000)
+        parser.add_argument('--posts', type=int, default=50000, help='Total number of posts, including the first post of every topic.')
+        parser.add_argument('--skew', type=float, default=1.1, help='Exponent of the Zipf distribution of the activity.')
+        parser.add_argument('--days', type=int, default=365, help='The posts are spread over this many days.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='bench', help='Prefix of the generated usernames and board names.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        skew = options['skew']
+        prefix = options['prefix']
+        now = timezone.now()
+        start = now - timedelta(days=options['days'])
+        span = (now - start).total_seconds()
+
+        # Every generated user has the password "password", hashed only once.
+        password = make_password('password')
+        users = User.objects.bulk_create(
+            [User(username='{}_user_{}'.format(prefix, i), email='{}_user_{}@example.com'.format(prefix, i), password=password)
+             for i in range(options['users'])],
+            batch_size=batch_size
+        )
+        user_weights = zipf_weights(len(users), skew)
+        boards = Board.objects.bulk_create(
+            [Board(name='{} board {}'.format(prefix, i)[:30], description='Generated board number {}.'.format(i))
+             for i in range(options['boards'])]
+        )
+        self.stdout.write('Created {} users and {} boards.'.format(len(users), len(boards)))
+
+        # Number of posts of each topic: one each, then the others spread with a skewed distribution.
+        topic_count = options['topics']
+        posts_per_topic = [1] * topic_count
+        for index in rng.choices(range(topic_count), weights=zipf_weights(topic_count, skew), k=max(options['posts'] - topic_count, 0)):
+            posts_per_topic[index] += 1
+        rng.shuffle(posts_per_topic)
+
+        # Rendering is the slow part of creating a post, every distinct message is rendered once.
+        rendered = {message: render_markdown(message) for message in MESSAGES}
+        board_weights = zipf_weights(len(boards), skew)
+        total_posts = 0
+        with explicit_dates():
+            for offset in range(0, topic_count, batch_size):
+                plans = []
+                for count in posts_per_topic[offset:offset + batch_size]:
+                    created = start + timedelta(seconds=rng.random() * span)
+                    last = created + timedelta(seconds=rng.random() * (now - created).total_seconds()) if count > 1 else created
+                    plans.append((count, created, last))
+                with transaction.atomic():
+                    topics = Topic.objects.bulk_create([
+                        Topic(
+                            subject='Generated topic {}'.format(offset + i),
+                            board=rng.choices(boards, weights=board_weights)[0],
+                            starter=rng.choices(users, weights=user_weights)[0],
+                            last_updated=last,
+                            views=rng.randint(0, count * 10),
+                        )
+                        for i, (count, created, last) in enumerate(plans)
+                    ])
+                    posts = []
+                    for topic, (count, created, last) in zip(topics, plans):
+                        dates = sorted(created + (last - created) * rng.random() for i in range(count - 2))
+                        dates = [created] + dates + ([last] if count > 1 else [])
+                        for date in dates:
+                            message = rng.choice(MESSAGES)
+                            posts.append(Post(
+                                topic=topic, message=message, message_html=rendered[message],
+                                message_html_version=MARKDOWN_RENDERER_VERSION, created_at=date,
+                                created_by=topic.starter if date == created else rng.choices(users, weights=user_weights)[0],
+                            ))
+                        if len(posts) >= batch_size:
+                            Post.objects.bulk_create(posts, batch_size=batch_size)
+                            total_posts += len(posts)
+                            posts = []
+                    Post.objects.bulk_create(posts, batch_size=batch_size)
+                    total_posts += len(posts)
+                self.stdout.write('Created {} topics and {} posts...'.format(offset + len(plans), total_posts))
+
+        # bulk_create doesn't send signals: create the profiles, bring the counters and the search index up to date.
+        rebuild_topic_stats(Topic.objects.filter(board__in=boards))
+        rebuild_board_stats(Board.objects.filter(pk__in=[board.pk for board in boards]))
+        rebuild_posts_counts(User.objects.filter(pk__in=[user.pk for user in users]))
+        call_command('rebuild_search_index', batch_size=batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Generated {} users, {} boards, {} topics and {} posts.'.format(len(users), len(boards), topic_count, total_posts)
+        ))
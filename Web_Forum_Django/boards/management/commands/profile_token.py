@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Web_Forum_Django.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a token profiling the requests that send it in the REQUEST_PROFILING_HEADER header (Web_Forum_Django/profiling.py).'
+
+    def handle(self, *args, **options):
+        self.stdout.write('{}: {}'.format(settings.REQUEST_PROFILING_HEADER, make_token()))
+        self.stdout.write('Valid for {} seconds.'.format(settings.REQUEST_PROFILING_TOKEN_MAX_AGE))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from boards.purge import purge_hidden
+
+
+class Command(BaseCommand):
+    help = 'Delete the hidden boards and topics with all their posts, by small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None, help='Number of posts deleted per transaction (default: PURGE_CHUNK_SIZE).')
+
+    def handle(self, *args, **options):
+        def progress(deleted, what):
+            self.stdout.write('Deleted {} post(s)... ({})'.format(deleted, what))
+
+        deleted = purge_hidden(options['chunk_size'], progress)
+        self.stdout.write(self.style.SUCCESS('Deleted {} post(s) of the hidden boards and topics.'.format(deleted)))
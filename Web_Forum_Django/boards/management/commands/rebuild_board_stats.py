@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from boards.models import Board, Topic
+from boards.stats import rebuild_board_stats, rebuild_topic_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized statistics of the boards (posts_count, topics_count, last_post) and of their topics (posts_count).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('boards', nargs='*', type=int, help='Primary keys of the boards to rebuild (default: all).')
+
+    def handle(self, *args, **options):
+        boards = Board.objects.all()
+        topics = Topic.objects.all()
+        if options['boards']:
+            boards = boards.filter(pk__in=options['boards'])
+            topics = topics.filter(board__in=options['boards'])
+        updated_topics = rebuild_topic_stats(topics)
+        updated = rebuild_board_stats(boards)
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt the statistics of {} board(s) and {} topic(s).'.format(updated, updated_topics)
+        ))
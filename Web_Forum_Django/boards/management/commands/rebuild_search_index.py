@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from boards import search
+from boards.models import Post, Topic
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the topics and posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows indexed per transaction.')
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            raise CommandError('The full-text search needs the SQLite database backend.')
+        batch_size = options['batch_size']
+        search.clear_index()
+        topics = self.index(Topic.objects.values_list('pk', 'subject'), search.index_topics, batch_size, 'topic')
+        posts = self.index(Post.objects.values_list('pk', 'message', 'topic_id'), search.index_posts, batch_size, 'post')
+        self.stdout.write(self.style.SUCCESS('Indexed {} topic(s) and {} post(s).'.format(topics, posts)))
+
+    def index(self, rows, index_rows, batch_size, name):
+        # Walk through the rows by primary key: only `batch_size` rows are in memory at a time.
+        rows = rows.order_by('pk')
+        last_pk = 0
+        total = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return total
+            with transaction.atomic():
+                # The index was cleared: nothing to replace.
+                index_rows(batch, new=True)
+            last_pk = batch[-1][0]
+            total += len(batch)
+            self.stdout.write('Indexed {} {}(s)...'.format(total, name))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from boards.models import Post
+from boards.rendering import MARKDOWN_RENDERER_VERSION, render_many
+
+
+class Command(BaseCommand):
+    help = 'Render again the Markdown of the posts rendered by an older version of the renderer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Number of posts rendered per transaction.')
+        parser.add_argument('--all', action='store_true', help='Render every post, even the up to date ones.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = Post.objects.order_by('pk')
+        if not options['all']:
+            posts = posts.exclude(message_html_version=MARKDOWN_RENDERER_VERSION)
+        # Walk through the posts by primary key so every chunk is a cheap indexed range query,
+        # and only the id and the message of `chunk_size` posts are in memory at a time.
+        last_pk = 0
+        total = 0
+        while True:
+            chunk = list(posts.filter(pk__gt=last_pk).only('pk', 'message')[:chunk_size])
+            if not chunk:
+                break
+            for post, html in zip(chunk, render_many([post.message for post in chunk])):
+                post.message_html = html
+                post.message_html_version = MARKDOWN_RENDERER_VERSION
+            with transaction.atomic():
+                Post.objects.bulk_update(chunk, ['message_html', 'message_html_version'])
+            last_pk = chunk[-1].pk
+            total += len(chunk)
+            self.stdout.write('Rendered {} post(s)...'.format(total))
+        self.stdout.write(self.style.SUCCESS('Rendered {} post(s) with renderer version {}.'.format(total, MARKDOWN_RENDERER_VERSION)))
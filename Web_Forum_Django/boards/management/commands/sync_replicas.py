@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from Web_Forum_Django.routers import mark_synced
+from Web_Forum_Django.sqlite import copy_database
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the read replicas (DATABASE_REPLICAS).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replicas to refresh, all of them by default.')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('No replica configured, set DATABASE_REPLICAS.')
+        for alias in aliases:
+            if alias not in settings.DATABASE_REPLICAS:
+                raise CommandError('{} is not a replica.'.format(alias))
+            if connections[alias].vendor != 'sqlite' or connections['default'].vendor != 'sqlite':
+                raise CommandError('Only the SQLite databases can be copied.')
+            copy_database(connections['default'].settings_dict['NAME'], connections[alias].settings_dict['NAME'])
+            # The router uses the replica again once it is fresh.
+            mark_synced(alias)
+            self.stdout.write(self.style.SUCCESS('{} is up to date.'.format(alias)))
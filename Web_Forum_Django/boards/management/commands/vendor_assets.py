@@ -0,0 +1,58 @@
+import os
+import re
+import urllib.request
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Google Fonts only serves WOFF2 to the browsers it knows.
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+CSS_URL = re.compile(r'''url\((['"]?)(https?://[^)'"]+)\1\)''')
+
+
+class Command(BaseCommand):
+    help = (
+        'Download the CDN assets of VENDOR_ASSETS (and the fonts their CSS refers to) into static/, '
+        'so they are hashed, compressed and served with the other static files.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download again the assets already there.')
+
+    def handle(self, *args, **options):
+        directory = settings.STATICFILES_DIRS[0]
+        for path, url in settings.VENDOR_ASSETS.items():
+            target = os.path.join(directory, path)
+            if os.path.exists(target) and not options['force']:
+                self.stdout.write('{} is already there.'.format(path))
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            content = self.download(url)
+            if path.endswith('.css'):
+                content = self.vendor_css_urls(content.decode(), os.path.dirname(target)).encode()
+            with open(target, 'wb') as output:
+                output.write(content)
+            self.stdout.write(self.style.SUCCESS('{} <- {}'.format(path, url)))
+
+    def download(self, url):
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.read()
+        except OSError as error:
+            raise CommandError('Could not download {}: {}'.format(url, error))
+
+    def vendor_css_urls(self, css, directory):
+        '''
+        Download the absolute url(...) of a CSS file (e.g. the font files of Google Fonts)
+        next to it and refer to them relatively.
+        '''
+        def replace(match):
+            url = match.group(2)
+            name = os.path.basename(urlparse(url).path)
+            with open(os.path.join(directory, name), 'wb') as output:
+                output.write(self.download(url))
+            return 'url({})'.format(name)
+        return CSS_URL.sub(replace, css)
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_board_stats(apps, schema_editor):
+    Board = apps.get_model('boards', 'Board')
+    Topic = apps.get_model('boards', 'Topic')
+    Post = apps.get_model('boards', 'Post')
+    posts = Post.objects.filter(topic__board=OuterRef('pk')).order_by()
+    topics = Topic.objects.filter(board=OuterRef('pk')).order_by()
+    Board.objects.update(
+        posts_count=Coalesce(Subquery(
+            posts.values('topic__board').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()), Value(0)),
+        topics_count=Coalesce(Subquery(
+            topics.values('board').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()), Value(0)),
+        last_post=Subquery(posts.order_by('-created_at', '-pk').values('pk')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0002_topic_views'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='last_post',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='boards.post'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='topics_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_board_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:45
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_topic_posts_count(apps, schema_editor):
+    Topic = apps.get_model('boards', 'Topic')
+    Post = apps.get_model('boards', 'Post')
+    posts = Post.objects.filter(topic=OuterRef('pk')).order_by()
+    Topic.objects.update(
+        posts_count=Coalesce(Subquery(
+            posts.values('topic').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0004_post_message_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_topic_posts_count, migrations.RunPython.noop),
+    ]
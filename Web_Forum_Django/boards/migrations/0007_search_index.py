@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 virtual table used by boards/search.py, only available on SQLite.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS boards_search USING fts5("
+        "subject, message, topic_id UNINDEXED, board_id UNINDEXED, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        'INSERT INTO boards_search (rowid, subject, message, topic_id, board_id) '
+        'SELECT p.id, t.subject, p.message, t.id, t.board_id '
+        'FROM boards_post AS p JOIN boards_topic AS t ON t.id = p.topic_id'
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS boards_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0006_forum_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
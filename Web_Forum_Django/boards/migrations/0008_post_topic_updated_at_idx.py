@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0007_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['topic', 'updated_at'], name='post_topic_updated_at_idx'),
+        ),
+    ]
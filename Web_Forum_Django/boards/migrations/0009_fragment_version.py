@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:59
+
+import boards.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0008_post_topic_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fragment_version',
+            field=models.PositiveIntegerField(default=boards.models.new_fragment_version, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='fragment_version',
+            field=models.PositiveIntegerField(default=boards.models.new_fragment_version, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0009_fragment_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='is_hidden',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='is_hidden',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
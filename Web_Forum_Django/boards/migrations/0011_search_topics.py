@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+def index_subjects_once(apps, schema_editor):
+    # The subjects move from every post row of boards_search to one row per topic in boards_search_topics.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS boards_search')
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE boards_search USING fts5("
+        "message, topic_id UNINDEXED, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        'INSERT INTO boards_search (rowid, message, topic_id) '
+        'SELECT id, message, topic_id FROM boards_post'
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS boards_search_topics USING fts5("
+        "subject, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        'INSERT INTO boards_search_topics (rowid, subject) '
+        'SELECT id, subject FROM boards_topic'
+    )
+
+
+def index_subjects_per_post(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS boards_search_topics')
+    schema_editor.execute('DROP TABLE IF EXISTS boards_search')
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE boards_search USING fts5("
+        "subject, message, topic_id UNINDEXED, board_id UNINDEXED, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        'INSERT INTO boards_search (rowid, subject, message, topic_id, board_id) '
+        'SELECT p.id, t.subject, p.message, t.id, t.board_id '
+        'FROM boards_post AS p JOIN boards_topic AS t ON t.id = p.topic_id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0010_hidden'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_subjects_once, index_subjects_per_post),
+    ]
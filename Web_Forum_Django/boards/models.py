@@ -1,15 +1,35 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.utils.text import Truncator
 from django.utils.html import mark_safe
-from markdown import markdown
+from django.urls import reverse
+
+from .rendering import MARKDOWN_RENDERER_VERSION, render_many, render_markdown
 
 import math
+import random
+
+
+def new_fragment_version():
+    # A random version rather than a counter: two saves never give the same version to different contents,
+    # even concurrently, and a row reusing the id of a deleted one doesn't get its cached fragments.
+    return random.getrandbits(31)
+
 
 class Board(models.Model):
     name = models.CharField(max_length=30, unique=True)
     description = models.CharField(max_length=100)
-    
+    # Denormalized statistics used by the home page, so listing the boards doesn't need
+    # a COUNT and an ORDER BY over all the posts of every board.
+    # They are kept up to date by the signal handlers in boards/signals.py
+    # and can be rebuilt from scratch with `python manage.py rebuild_board_stats`.
+    posts_count = models.PositiveIntegerField(default=0)
+    topics_count = models.PositiveIntegerField(default=0)
+    last_post = models.ForeignKey('Post', null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    # A deleted board is hidden at once and removed in the background by small batches (boards/purge.py).
+    is_hidden = models.BooleanField(default=False, editable=False)
+
     def __str__(self):
         return self.name
     
@@ -28,12 +48,42 @@ class Topic(models.Model):
     starter = models.ForeignKey(User, related_name='topics' ,on_delete=models.CASCADE)
     # Here we added a PositiveIntegerField. Since this field is going to store the number of page views, a negative page view wouldn’t make sense.
     views = models.PositiveIntegerField(default=0)
+    # Number of posts of the topic, maintained by the signal handlers in boards/signals.py
+    # so the board page doesn't need a COUNT per topic.
+    posts_count = models.PositiveIntegerField(default=0)
+    # Version of the cached row of the topic in topics.html, changed when the topic is saved
+    # and when a post is added or deleted (boards/signals.py).
+    fragment_version = models.PositiveIntegerField(default=new_fragment_version, editable=False)
+    # A deleted topic is hidden at once and removed in the background (boards/purge.py).
+    # The statistics of its board only count the visible topics.
+    is_hidden = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # board.topics.order_by('-last_updated', '-id'), also used by the keyset pagination
+            models.Index(fields=['board', 'last_updated', 'id'], name='topic_board_last_updated_idx'),
+        ]
 
     def __str__(self):
         return self.subject
-    
+
+    def save(self, *args, **kwargs):
+        # The last update date and the views are shown outside of the cached row:
+        # saving only them (reply_topic) doesn't change its version.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) - {'last_updated', 'views'}:
+            self.fragment_version = new_fragment_version()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'fragment_version'}
+        super().save(*args, **kwargs)
+
+    @property
+    def replies(self):
+        # The first post is the topic itself, the others are replies.
+        return max(self.posts_count - 1, 0)
+
     def get_page_count(self):
-        count = self.posts.count()
+        count = self.posts_count
         pages = count / 20
         return math.ceil(pages)
 
@@ -49,7 +99,7 @@ class Topic(models.Model):
         return range(1, count + 1)
 
     def get_last_ten_posts(self):
-        return self.posts.order_by('-created_at')[:10]
+        return self.posts.select_related('created_by').order_by('-created_at')[:10]
 
 class Post(models.Model):
     message = models.TextField(max_length=4000)
@@ -58,9 +108,76 @@ class Post(models.Model):
     updated_at = models.DateTimeField(null=True)
     created_by = models.ForeignKey(User, related_name='posts', on_delete=models.CASCADE)
     updated_by = models.ForeignKey(User, null=True, related_name='+',on_delete=models.CASCADE)
+    # The message rendered as HTML when the post is saved, so reading a topic never parses Markdown.
+    # message_html_version records which MARKDOWN_RENDERER_VERSION produced it.
+    message_html = models.TextField(blank=True, default='')
+    message_html_version = models.PositiveSmallIntegerField(default=0)
+    # Version of the cached card of the post in topic_posts.html, changed whenever the post is saved.
+    fragment_version = models.PositiveIntegerField(default=new_fragment_version, editable=False)
+
+    class Meta:
+        indexes = [
+            # topic.posts.order_by('created_at', 'id'), also used by the keyset pagination
+            models.Index(fields=['topic', 'created_at', 'id'], name='post_topic_created_at_idx'),
+            # Post.objects.filter(topic__board=...).order_by('-created_at'): the last post of a board
+            models.Index(fields=['created_at'], name='post_created_at_idx'),
+            # created_by.posts.count() and the posts of a user by date
+            models.Index(fields=['created_by', 'created_at'], name='post_created_by_idx'),
+            # The last edited post of a topic, used by the conditional GET of topic_posts
+            models.Index(fields=['topic', 'updated_at'], name='post_topic_updated_at_idx'),
+        ]
+
     def __str__(self):
         # Truncator utility class. It’s a convenient way to truncate long strings into an arbitrary string size (here we are using 30).
         truncated_message = Truncator(self.message)
         return truncated_message.chars(30)
+
+    def save(self, *args, **kwargs):
+        # Render the message whenever it may have changed: on creation (new_topic, reply_topic)
+        # and on edition (PostUpdateView).
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'message' in update_fields:
+            self.render_message()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'message_html', 'message_html_version'}
+        # Any change of the post changes its cached card (topic_posts.html).
+        self.fragment_version = new_fragment_version()
+        if update_fields is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'fragment_version'}
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse('post_permalink', kwargs={'post_pk': self.pk})
+
+    def get_page_number(self, per_page=20):
+        '''
+        The page of topic_posts showing this post, from the number of posts before it in the topic:
+        `(created_at, id) < (?, ?)`, an index-only COUNT on post_topic_created_at_idx.
+        The `created_at <= ?` bound keeps it a range of the index rather than a scan of the topic.
+        '''
+        before = Post.objects.filter(topic_id=self.topic_id, created_at__lte=self.created_at).filter(
+            Q(created_at__lt=self.created_at) | Q(pk__lt=self.pk)
+        )
+        return before.count() // per_page + 1
+
+    def render_message(self):
+        self.message_html = render_markdown(self.message)
+        self.message_html_version = MARKDOWN_RENDERER_VERSION
+
+    @staticmethod
+    def render_outdated(posts):
+        '''
+        Render at once the messages of the posts rendered by an older version of the renderer
+        (in memory only), so get_message_as_markdown() doesn't render them one by one.
+        '''
+        outdated = [post for post in posts if post.message_html_version != MARKDOWN_RENDERER_VERSION]
+        for post, html in zip(outdated, render_many([post.message for post in outdated])):
+            post.message_html = html
+            post.message_html_version = MARKDOWN_RENDERER_VERSION
+
     def get_message_as_markdown(self):
-        return mark_safe(markdown(self.message, safe_mode='escape'))
\ No newline at end of file
+        # Posts rendered by an older version of the renderer are rendered on the fly
+        # until `python manage.py rerender_posts` has caught up with them.
+        if self.message_html_version != MARKDOWN_RENDERER_VERSION:
+            return mark_safe(render_markdown(self.message))
+        return mark_safe(self.message_html)
\ No newline at end of file
@@ -0,0 +1,203 @@
+from types import SimpleNamespace
+
+from django.core import signing
+from django.core.paginator import EmptyPage, InvalidPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.http import Http404
+
+'''
+Keyset (cursor) pagination.
+
+Instead of `OFFSET n` the next page is fetched with a WHERE clause on the ordering columns of the
+last row of the current page, e.g. `(last_updated, id) < (?, ?)`, which is an index range scan
+no matter how deep the page is. The position is carried in an opaque, signed `?cursor=` token.
+
+Numbered `?page=N` links keep working: they are served with the regular offset pagination,
+and every page (offset or keyset) hands out cursors for its previous and next pages.
+
+The `a`-prefixed methods do the same with the async ORM, for the async views.
+'''
+
+CURSOR_SALT = 'boards.pagination.cursor'
+
+
+class KeysetPage(Page):
+    def __init__(self, object_list, number, paginator, has_next, has_previous):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return self.paginator.make_cursor(self.object_list[-1], 'next', self.number + 1)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return self.paginator.make_cursor(self.object_list[0], 'previous', self.number - 1)
+        return None
+
+
+class KeysetPaginator(Paginator):
+    '''
+    `ordering` is the list of fields the rows are sorted by, like `('-last_updated', '-id')`.
+    The last field must be unique so the order is total and stable when rows are inserted.
+    When the total number of rows is already known (e.g. from a denormalized counter)
+    it can be passed as `count` to avoid a COUNT(*).
+    '''
+    def __init__(self, object_list, per_page, ordering, count=None, **kwargs):
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.fields = [object_list.model._meta.get_field(name) for name, descending in self.ordering]
+        if count is not None:
+            self.count = count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        return KeysetPage(object_list, number, self, has_next=number < self.num_pages, has_previous=number > 1)
+
+    def first_page(self):
+        '''
+        The first page without counting the rows: one extra row tells if there is a next one.
+        '''
+        rows = list(self.object_list[:self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], 1, self, has_next=len(rows) > self.per_page, has_previous=False)
+
+    def make_cursor(self, obj, direction, number):
+        if isinstance(obj, dict):
+            # A row of a .values() queryset, value_to_string() reads the values as attributes.
+            obj = SimpleNamespace(**{field.attname: obj[name] for field, (name, descending) in zip(self.fields, self.ordering)})
+        values = [field.value_to_string(obj) for field in self.fields]
+        return signing.dumps([direction, number, values], salt=CURSOR_SALT)
+
+    async def apage(self, number):
+        '''
+        page() with the async ORM. The number of rows isn't needed to fetch a page:
+        one extra row tells if there is a next one.
+        '''
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        bottom = (number - 1) * self.per_page
+        rows = [obj async for obj in self.object_list[bottom:bottom + self.per_page + 1]]
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage('That page contains no results')
+        return KeysetPage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page, has_previous=number > 1)
+
+    async def anum_pages(self):
+        if 'count' not in self.__dict__:
+            self.count = await self.object_list.acount()
+        return self.num_pages
+
+    def page_from_cursor(self, cursor):
+        queryset, number, forward = self._cursor_queryset(cursor)
+        return self._cursor_page(list(queryset), number, forward)
+
+    async def apage_from_cursor(self, cursor):
+        queryset, number, forward = self._cursor_queryset(cursor)
+        return self._cursor_page([obj async for obj in queryset], number, forward)
+
+    def _cursor_queryset(self, cursor):
+        try:
+            direction, number, values = signing.loads(cursor, salt=CURSOR_SALT)
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (signing.BadSignature, ValueError, TypeError):
+            raise InvalidPage('Invalid cursor.')
+        forward = direction == 'next'
+        ordering = [
+            ('-' if descending == forward else '') + name
+            for name, descending in self.ordering
+        ]
+        # Fetch one extra row to know if there is another page after this one.
+        queryset = self.object_list.filter(self._after(values, forward)).order_by(*ordering)[:self.per_page + 1]
+        return queryset, number, forward
+
+    def _cursor_page(self, rows, number, forward):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            return KeysetPage(rows, number, self, has_next=has_more, has_previous=True)
+        rows.reverse()
+        # Without more rows before this page, it is the first one whatever the cursor said.
+        return KeysetPage(rows, number if has_more else 1, self, has_next=True, has_previous=has_more)
+
+    def _after(self, values, forward):
+        '''
+        The rows strictly after `values` in the pagination order (or before them when going backward):
+        (a, b) > (x, y) is written as `a > x OR (a = x AND b > y)`.
+        '''
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{'{}__{}'.format(name, lookup): value})
+            equal[name] = value
+        return condition
+
+
+class KeysetPaginationMixin:
+    '''
+    Cursor pagination for a ListView, enabled by setting `keyset_ordering`.
+    '''
+    paginator_class = KeysetPaginator
+    keyset_ordering = None
+    cursor_kwarg = 'cursor'
+
+    def get_pagination_count(self):
+        return None
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(
+            queryset, per_page, self.keyset_ordering, count=self.get_pagination_count(),
+            orphans=orphans, allow_empty_first_page=allow_empty_first_page, **kwargs
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if not cursor:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = self.get_paginator(queryset, page_size, allow_empty_first_page=self.get_allow_empty())
+        try:
+            page = paginator.page_from_cursor(cursor)
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    async def apaginate_queryset(self, queryset, page_size):
+        '''
+        paginate_queryset() with the async ORM.
+        '''
+        paginator = self.get_paginator(queryset, page_size, allow_empty_first_page=self.get_allow_empty())
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        try:
+            if cursor:
+                page = await paginator.apage_from_cursor(cursor)
+            elif page_number == 'last':
+                page = await paginator.apage(await paginator.anum_pages())
+            else:
+                page = await paginator.apage(page_number)
+        except PageNotAnInteger:
+            raise Http404('Page is not “last”, nor can it be converted to an int.')
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
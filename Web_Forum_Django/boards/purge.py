@@ -0,0 +1,141 @@
+import logging
+
+from django.conf import settings
+from django.db import router
+from django.db.models import Count, F, OuterRef
+
+from accounts.models import Profile
+from Web_Forum_Django.sqlite import serialized_write
+
+from . import search
+from .models import Board, Post, Topic
+from .stats import _count_subquery, _sum_subquery, last_post_subquery
+
+'''
+Deleting a board or a topic without loading all its posts nor locking the database for long.
+
+Board.delete() makes Django's collector load every topic and post of the board and delete them
+in one transaction, with a signal per row. Instead:
+
+- hide_boards() / hide_topics() mark them as hidden with one UPDATE (hide_board() / hide_topic() for
+  one of them): the views filter the hidden boards and topics out, so they are gone for the users right
+  away. Hiding topics subtracts them from the statistics of their boards, in one UPDATE as well;
+- the purge_hidden task (or `python manage.py purge_hidden`) then deletes the rows by batches of
+  PURGE_CHUNK_SIZE posts, each in its own short transaction. The posts are deleted with one
+  DELETE per batch, without the signal handlers: the batch updates the posts count of the authors
+  and the search index itself, once per batch.
+'''
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_purge():
+    from .tasks import purge_hidden
+
+    purge_hidden.enqueue(dedupe_key='purge_hidden')
+
+
+@serialized_write
+def hide_topics(topics):
+    '''
+    Hide the topics of the queryset and take them out of the statistics of their boards, then queue
+    their deletion. A few statements whatever the number of topics. Return the number of topics hidden.
+    '''
+    pks = list(topics.filter(is_hidden=False).values_list('pk', flat=True))
+    if not pks:
+        return 0
+    hidden = Topic.objects.filter(pk__in=pks).update(is_hidden=True)
+    # The topics just hidden, by board: one UPDATE for all their boards.
+    of_board = Topic.objects.filter(pk__in=pks, board=OuterRef('pk'))
+    Board.objects.filter(pk__in=Topic.objects.filter(pk__in=pks).values('board')).update(
+        topics_count=F('topics_count') - _count_subquery(of_board, 'board'),
+        posts_count=F('posts_count') - _sum_subquery(of_board, 'board', 'posts_count'),
+        last_post=last_post_subquery(),
+    )
+    schedule_purge()
+    return hidden
+
+
+def hide_topic(topic):
+    hidden = hide_topics(Topic.objects.filter(pk=topic.pk))
+    if hidden:
+        topic.is_hidden = True
+    return bool(hidden)
+
+
+@serialized_write
+def hide_boards(boards):
+    '''
+    Hide the boards of the queryset, then queue their deletion. Return the number of boards hidden.
+    '''
+    hidden = boards.filter(is_hidden=False).update(is_hidden=True)
+    if hidden:
+        schedule_purge()
+    return hidden
+
+
+def hide_board(board):
+    hidden = hide_boards(Board.objects.filter(pk=board.pk))
+    if hidden:
+        board.is_hidden = True
+    return bool(hidden)
+
+
+@serialized_write
+def delete_posts(posts):
+    '''
+    Delete the posts of the (sliced) queryset `posts` in one transaction. Return the number of posts deleted.
+    '''
+    pks = list(posts.values_list('pk', flat=True))
+    if not pks:
+        return 0
+    authors = Post.objects.filter(pk__in=pks).order_by().values('created_by').annotate(total=Count('pk'))
+    for author in authors:
+        Profile.objects.filter(user_id=author['created_by']).update(posts_count=F('posts_count') - author['total'])
+    search.remove_posts(pks)
+    # Board.last_post never points to a hidden topic, except for a hidden board.
+    Board.objects.filter(last_post__in=pks).update(last_post=None)
+    # A single DELETE, without the collector nor the post_delete handlers.
+    Post.objects.filter(pk__in=pks)._raw_delete(router.db_for_write(Post))
+    return len(pks)
+
+
+@serialized_write
+def delete_empty(rows):
+    # Topics or a board whose posts are all gone: nothing is left for the collector to load.
+    # A hidden topic is already out of the statistics of its board, its post_delete handler leaves them.
+    rows.delete()
+
+
+def purge_hidden(chunk_size=None, progress=None):
+    '''
+    Delete the hidden topics and boards by batches of `chunk_size` posts.
+    `progress(deleted_posts, what)` is called after every batch. Return the number of posts deleted.
+    '''
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    deleted = 0
+    targets = [
+        (Topic, Topic.objects.filter(is_hidden=True).values_list('pk', flat=True), 'topic'),
+        (Board, Board.objects.filter(is_hidden=True).values_list('pk', flat=True), 'topic__board'),
+    ]
+    for model, hidden, lookup in targets:
+        for pk in list(hidden):
+            posts = Post.objects.filter(**{lookup: pk}).order_by('pk')[:chunk_size]
+            while True:
+                count = delete_posts(posts)
+                if not count:
+                    break
+                deleted += count
+                if progress is not None:
+                    progress(deleted, '{} {}'.format(model._meta.verbose_name, pk))
+            if model is Board:
+                # Its topics are empty now, deleted by batches as well.
+                topics = Topic.objects.filter(board_id=pk)
+                while True:
+                    batch = list(topics.values_list('pk', flat=True)[:chunk_size])
+                    if not batch:
+                        break
+                    delete_empty(Topic.objects.filter(pk__in=batch))
+            delete_empty(model.objects.filter(pk=pk))
+            logger.info('Deleted the hidden %s %s', model._meta.verbose_name, pk)
+    return deleted
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from markdown import Markdown
+from markdown.extensions import Extension
+
+'''
+Markdown rendering of the posts.
+
+Building a Markdown instance (with all its preprocessors, inline patterns, tree processors...)
+costs more than converting a short message, so every thread keeps its own instance and
+resets it between two messages instead of building a new one. The rendered HTML is also
+kept in an in-process LRU cache keyed by the hash of the text (MARKDOWN_CACHE_SIZE entries).
+'''
+
+# Bump this number whenever the output of render_markdown() changes
+# (new extensions, different escaping...), then run `python manage.py rerender_posts`
+# so the HTML stored in Post.message_html is rendered again.
+MARKDOWN_RENDERER_VERSION = 1
+
+
+class EscapeHtmlExtension(Extension):
+    '''
+    Escape the raw HTML written in a message instead of passing it through.
+    This is what the old `safe_mode='escape'` argument did before it was removed from Python-Markdown 3.
+    '''
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister('html_block')
+        md.inlinePatterns.deregister('html')
+
+
+class RenderCache:
+    '''
+    Least recently used cache of the rendered HTML, shared by the threads of the process.
+    '''
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_local = threading.local()
+_cache = RenderCache(settings.MARKDOWN_CACHE_SIZE)
+
+
+def get_renderer():
+    '''
+    The Markdown instance of the current thread. A Markdown instance isn't thread-safe
+    (it keeps the state of the conversion in progress) but can be reused once reset.
+    '''
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = _local.renderer = Markdown(extensions=[EscapeHtmlExtension()])
+    return renderer
+
+
+def _cache_key(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def render_markdown(text):
+    return render_many([text])[0]
+
+
+def render_many(texts):
+    '''
+    Render a list of messages (e.g. the posts of a page) with a single renderer:
+    the ones already in the cache, or appearing twice in the list, are rendered only once.
+    '''
+    keys = [_cache_key(text) for text in texts]
+    rendered = {}
+    renderer = None
+    for key, text in zip(keys, texts):
+        if key in rendered:
+            continue
+        html = _cache.get(key)
+        if html is None:
+            if renderer is None:
+                renderer = get_renderer()
+            html = renderer.reset().convert(text)
+            _cache.set(key, html)
+        rendered[key] = html
+    return [rendered[key] for key in keys]
@@ -0,0 +1,253 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape, mark_safe
+
+from .models import Post, Topic
+
+'''
+Full-text search over the topic subjects and the post messages, backed by SQLite FTS5 tables.
+
+- `boards_search` has one row per post, its message, using the post id as rowid;
+- `boards_search_topics` has one row per topic, its subject, using the topic id as rowid:
+  a subject is indexed once, not again with every post of the topic.
+
+The rows are written by the Post and Topic signal handlers in boards/signals.py (a renamed topic is
+indexed again) and can be rebuilt with `python manage.py rebuild_search_index`. The tables are
+created by the migrations 0007 and 0011. On other database backends the search is simply unavailable.
+
+The hidden boards and topics stay in the index until they are purged (boards/purge.py):
+the searches join the topics and boards to leave them out, in the same query.
+'''
+
+POSTS_TABLE = 'boards_search'
+TOPICS_TABLE = 'boards_search_topics'
+
+# bm25() weights of the indexed columns: a match in a subject counts more than in a message.
+SUBJECT_WEIGHT = 10.0
+MESSAGE_WEIGHT = 1.0
+
+# FTS5 returns the highlighted text unescaped, so the matches are delimited with control characters
+# and replaced by <mark> tags once the text has been HTML-escaped.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def _replace_rows(table, columns, rows, new=False):
+    rows = list(rows)
+    if not rows or not search_available():
+        return
+    with connection.cursor() as cursor:
+        if not new:
+            cursor.executemany('DELETE FROM {} WHERE rowid = %s'.format(table), [(row[0],) for row in rows])
+        cursor.executemany(
+            'INSERT INTO {} (rowid, {}) VALUES (%s, {})'.format(table, ', '.join(columns), ', '.join(['%s'] * len(columns))),
+            rows
+        )
+
+
+def _remove_rows(table, pks):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany('DELETE FROM {} WHERE rowid = %s'.format(table), [(pk,) for pk in pks])
+
+
+def index_posts(rows, new=False):
+    '''
+    Add or replace posts in the index. `rows` are (post_id, message, topic_id) tuples,
+    `new` when none of them is indexed yet.
+    '''
+    _replace_rows(POSTS_TABLE, ['message', 'topic_id'], rows, new)
+
+
+def index_post(post, new=False):
+    index_posts([(post.pk, post.message, post.topic_id)], new)
+
+
+def index_topics(rows, new=False):
+    '''
+    Add or replace topics in the index. `rows` are (topic_id, subject) tuples,
+    `new` when none of them is indexed yet.
+    '''
+    _replace_rows(TOPICS_TABLE, ['subject'], rows, new)
+
+
+def index_topic(topic, new=False):
+    index_topics([(topic.pk, topic.subject)], new)
+
+
+def remove_posts(post_pks):
+    _remove_rows(POSTS_TABLE, post_pks)
+
+
+def remove_topics(topic_pks):
+    _remove_rows(TOPICS_TABLE, topic_pks)
+
+
+def clear_index():
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {}'.format(POSTS_TABLE))
+        cursor.execute('DELETE FROM {}'.format(TOPICS_TABLE))
+
+
+def build_match_query(text):
+    '''
+    Turn what the user typed into an FTS5 query: every word must match, the last one as a prefix.
+    The words are quoted so the FTS5 syntax (AND, OR, NEAR, column filters...) can't be injected.
+    '''
+    words = re.findall(r'\w+', text)
+    if not words:
+        return ''
+    terms = ['"{}"'.format(word) for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(text):
+    return escape(text).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def _visible(table, topic_id, board_id=None):
+    '''
+    The FROM and WHERE clauses of a full-text query of `table`, leaving out the hidden topics and boards.
+    `topic_id` is the column of `table` holding the id of the topic.
+    '''
+    sql = (
+        '{table} JOIN boards_topic AS t ON t.id = {table}.{topic_id} JOIN boards_board AS b ON b.id = t.board_id '
+        'WHERE {table} MATCH %s AND t.is_hidden = 0 AND b.is_hidden = 0'
+    ).format(table=table, topic_id=topic_id)
+    params = []
+    if board_id is not None:
+        sql += ' AND t.board_id = %s'
+        params.append(board_id)
+    return sql, params
+
+
+def _matching_ids(table, topic_id, text, limit):
+    match = build_match_query(text)
+    if not match or not search_available():
+        return []
+    sql, params = _visible(table, topic_id)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT {}.rowid FROM {} LIMIT %s'.format(table, sql), [match, *params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def matching_post_ids(text, limit=1000):
+    '''
+    The ids of the posts whose message matches `text`. Used by the admin search.
+    '''
+    return _matching_ids(POSTS_TABLE, 'topic_id', text, limit)
+
+
+def matching_topic_ids(text, limit=1000):
+    '''
+    The ids of the topics whose subject matches `text`. Used by the admin search.
+    '''
+    return _matching_ids(TOPICS_TABLE, 'rowid', text, limit)
+
+
+class SearchResults:
+    '''
+    Lazy search results: the topics whose subject matches and the posts whose message matches,
+    ranked together with bm25. It implements count() and slicing so it can be given to a Paginator:
+    only the rows of the requested page are fetched.
+    '''
+    def __init__(self, text, board_id=None):
+        self.match = build_match_query(text)
+        self.board_id = board_id
+
+    def _branches(self):
+        posts, post_params = _visible(POSTS_TABLE, 'topic_id', self.board_id)
+        topics, topic_params = _visible(TOPICS_TABLE, 'rowid', self.board_id)
+        return (posts, [self.match, *post_params]), (topics, [self.match, *topic_params])
+
+    def count(self):
+        if not self.match or not search_available():
+            return 0
+        (posts, post_params), (topics, topic_params) = self._branches()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT (SELECT COUNT(*) FROM {}) + (SELECT COUNT(*) FROM {})'.format(posts, topics),
+                [*post_params, *topic_params]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match or not search_available():
+            return []
+        offset = index.start or 0
+        (posts, post_params), (topics, topic_params) = self._branches()
+        sql = (
+            "SELECT {posts_table}.rowid, NULL, snippet({posts_table}, 0, %s, %s, %s, 32), "
+            "bm25({posts_table}, %s) AS rank FROM {posts} "
+            "UNION ALL "
+            "SELECT NULL, {topics_table}.rowid, highlight({topics_table}, 0, %s, %s), "
+            "bm25({topics_table}, %s) AS rank FROM {topics} "
+            "ORDER BY rank LIMIT %s OFFSET %s"
+        ).format(posts_table=POSTS_TABLE, posts=posts, topics_table=TOPICS_TABLE, topics=topics)
+        params = [
+            MATCH_START, MATCH_END, '...', MESSAGE_WEIGHT, *post_params,
+            MATCH_START, MATCH_END, SUBJECT_WEIGHT, *topic_params,
+            index.stop - offset, offset,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        # The board, the author and the date of the matching posts and topics, one query for each on the whole page.
+        post_pks = [post_pk for post_pk, topic_pk, text, rank in rows if post_pk is not None]
+        topic_pks = [topic_pk for post_pk, topic_pk, text, rank in rows if topic_pk is not None]
+        posts = {}
+        if post_pks:
+            posts = {post['pk']: post for post in Post.objects.filter(pk__in=post_pks).values(
+                'pk', 'topic_id', 'topic__subject', 'topic__board_id', 'topic__board__name', 'created_by__username', 'created_at'
+            )}
+        topics = {}
+        if topic_pks:
+            topics = {topic['pk']: topic for topic in Topic.objects.filter(pk__in=topic_pks).values(
+                'pk', 'board_id', 'board__name', 'starter__username', 'last_updated'
+            )}
+        results = []
+        for post_pk, topic_pk, text, rank in rows:
+            if post_pk is not None:
+                post = posts.get(post_pk)
+                if post is None:
+                    # Deleted since.
+                    continue
+                results.append({
+                    'post_pk': post_pk,
+                    'topic_pk': post['topic_id'],
+                    'board_pk': post['topic__board_id'],
+                    'board_name': post['topic__board__name'],
+                    'username': post['created_by__username'],
+                    'created_at': post['created_at'],
+                    'subject': post['topic__subject'],
+                    'snippet': mark_safe(highlight(text)),
+                })
+            else:
+                topic = topics.get(topic_pk)
+                if topic is None:
+                    continue
+                results.append({
+                    'post_pk': None,
+                    'topic_pk': topic_pk,
+                    'board_pk': topic['board_id'],
+                    'board_name': topic['board__name'],
+                    'username': topic['starter__username'],
+                    'created_at': topic['last_updated'],
+                    'subject': mark_safe(highlight(text)),
+                    'snippet': '',
+                })
+        return results
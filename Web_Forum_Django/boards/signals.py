@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import live, search
+from .models import Board, Post, Topic, new_fragment_version
+from .stats import last_post_subquery
+
+'''
+Keep the denormalized Board statistics (posts_count, topics_count and last_post)
+and Topic.posts_count up to date.
+Every handler is a single UPDATE using F() expressions, so concurrent writers never
+overwrite each other's counts and no extra object has to be loaded.
+The board statistics leave out the hidden topics: they were subtracted when the topic was hidden
+(boards/purge.py).
+
+The full-text search index (see boards/search.py) is kept in sync with the posts and the topics as well,
+and the new posts are published to the live streams of their topic (boards/live.py).
+'''
+
+
+@receiver(post_save, sender=Topic)
+def topic_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Board.objects.filter(pk=instance.board_id).update(topics_count=F('topics_count') + 1)
+
+
+@receiver(post_delete, sender=Topic)
+def topic_deleted(sender, instance, **kwargs):
+    if not instance.is_hidden:
+        Board.objects.filter(pk=instance.board_id).update(topics_count=F('topics_count') - 1)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # The replies and the page links of the cached row of the topic change: new fragment version.
+        Topic.objects.filter(pk=instance.topic_id).update(posts_count=F('posts_count') + 1, fragment_version=new_fragment_version())
+        # A new post is always the most recent one of its board.
+        Board.objects.filter(topics__pk=instance.topic_id, topics__is_hidden=False).update(
+            posts_count=F('posts_count') + 1,
+            last_post=instance.pk,
+        )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    Topic.objects.filter(pk=instance.topic_id).update(posts_count=F('posts_count') - 1, fragment_version=new_fragment_version())
+    boards = Board.objects.filter(topics__pk=instance.topic_id, topics__is_hidden=False)
+    boards.update(posts_count=F('posts_count') - 1)
+    # Deleting the board's last post sets Board.last_post to NULL (on_delete=SET_NULL),
+    # in that case we look for the new most recent post.
+    boards.filter(last_post__isnull=True).update(last_post=last_post_subquery())
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    # Index new posts (new_topic, reply_topic) and index edited ones (PostUpdateView) again.
+    if not raw:
+        search.index_post(instance, new=created)
+
+
+@receiver(post_save, sender=Post)
+def post_published(sender, instance, created, raw=False, **kwargs):
+    # Push the new post to the live streams of its topic (boards/live.py) once it is committed.
+    if created and not raw:
+        transaction.on_commit(lambda: live.publish(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Topic)
+def topic_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Index new topics and renamed ones again, not the ones saved for their last update date (reply_topic).
+    if not raw and (update_fields is None or 'subject' in update_fields):
+        search.index_topic(instance, new=created)
+
+
+@receiver(post_delete, sender=Topic)
+def topic_unindexed(sender, instance, **kwargs):
+    search.remove_topics([instance.pk])
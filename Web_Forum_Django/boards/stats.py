@@ -0,0 +1,50 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Board, Post, Topic
+
+
+def _count_subquery(queryset, group_by):
+    # A correlated COUNT(*) that can be used inside an UPDATE statement.
+    # Coalesce turns "no rows" (NULL) into 0 for boards without topics or posts.
+    counts = queryset.order_by().values(group_by).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _sum_subquery(queryset, group_by, field):
+    # The same with a SUM() of `field`.
+    sums = queryset.order_by().values(group_by).annotate(total=Sum(field)).values('total')
+    return Coalesce(Subquery(sums, output_field=IntegerField()), Value(0))
+
+
+def last_post_subquery(board_ref='pk'):
+    # The most recent post of the visible topics of a board, by creation date.
+    posts = Post.objects.filter(topic__board=OuterRef(board_ref), topic__is_hidden=False).order_by('-created_at', '-pk')
+    return Subquery(posts.values('pk')[:1])
+
+
+def rebuild_board_stats(boards=None):
+    '''
+    Recompute the denormalized statistics of the given boards (all of them by default),
+    leaving out the hidden topics (boards/purge.py).
+    Everything is done in the database with a single UPDATE, so no Board, Topic or Post
+    object is ever loaded into memory.
+    '''
+    if boards is None:
+        boards = Board.objects.all()
+    return boards.update(
+        posts_count=_count_subquery(Post.objects.filter(topic__board=OuterRef('pk'), topic__is_hidden=False), 'topic__board'),
+        topics_count=_count_subquery(Topic.objects.filter(board=OuterRef('pk'), is_hidden=False), 'board'),
+        last_post=last_post_subquery(),
+    )
+
+
+def rebuild_topic_stats(topics=None):
+    '''
+    Recompute Topic.posts_count of the given topics (all of them by default) with a single UPDATE.
+    '''
+    if topics is None:
+        topics = Topic.objects.all()
+    return topics.update(
+        posts_count=_count_subquery(Post.objects.filter(topic=OuterRef('pk')), 'topic'),
+    )
@@ -0,0 +1,32 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from tasks.queue import task
+
+'''
+Maintenance jobs run by the task worker (tasks/queue.py), see TASKS_SCHEDULE in settings.py.
+'''
+
+
+@task
+def rerender_posts(chunk_size=500):
+    # The posts rendered by an older version of the Markdown renderer.
+    call_command('rerender_posts', chunk_size=chunk_size, stdout=StringIO())
+
+
+@task
+def rebuild_board_stats(*boards):
+    call_command('rebuild_board_stats', *[str(pk) for pk in boards], stdout=StringIO())
+
+
+@task
+def purge_hidden(chunk_size=None):
+    # The boards and topics deleted from the admin, see boards/purge.py
+    call_command('purge_hidden', chunk_size=chunk_size, stdout=StringIO())
+
+
+@task(max_attempts=1)
+def sync_replicas():
+    # Scheduled every REPLICA_SYNC_INTERVAL seconds when there are replicas, a failed copy waits for the next run.
+    call_command('sync_replicas', stdout=StringIO())
@@ -0,0 +1,37 @@
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    '''
+    The <link> or <script> tags of a STATIC_BUNDLES entry: one tag for the bundle built by
+    collectstatic when STATIC_BUNDLES_ENABLED, otherwise one tag per file.
+    '''
+    names = [name] if settings.STATIC_BUNDLES_ENABLED else settings.STATIC_BUNDLES[name]
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((static(n),) for n in names))
+    return format_html_join('\n', '<script src="{}"></script>', ((static(n),) for n in names))
+
+
+@lru_cache(maxsize=None)
+def is_vendored(path):
+    return finders.find(path) is not None
+
+
+@register.simple_tag
+def vendor_static(path):
+    '''
+    The URL of an asset from VENDOR_ASSETS: the local copy downloaded by `python manage.py vendor_assets`,
+    or the CDN until it has been downloaded.
+    '''
+    if is_vendored(path):
+        return static(path)
+    return settings.VENDOR_ASSETS[path]
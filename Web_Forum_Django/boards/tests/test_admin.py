@@ -0,0 +1,111 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from tasks.models import Task
+
+from ..models import Board, Post, Topic
+from ..rendering import MARKDOWN_RENDERER_VERSION
+
+
+class AdminTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@doe.com', password='123')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.other_board = Board.objects.create(name='Python', description='Python board.')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.posts = [
+            Post.objects.create(message='Lorem ipsum {}'.format(i), topic=self.topic, created_by=self.user)
+            for i in range(3)
+        ]
+        other_topic = Topic.objects.create(subject='Packaging', board=self.other_board, starter=self.admin)
+        Post.objects.create(message='Wheels and eggs', topic=other_topic, created_by=self.admin)
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        return self.client.get(reverse('admin:boards_{}_changelist'.format(model)), params)
+
+
+class EstimatedCountTests(AdminTestCase):
+    def test_count_from_the_board_counters(self):
+        # Wrong on purpose: the number shown is the counters', not a COUNT(*).
+        Board.objects.filter(pk=self.board.pk).update(posts_count=1000)
+        response = self.changelist('post')
+        self.assertEquals(response.context['cl'].result_count, 1001)
+
+    def test_count_of_the_filtered_board(self):
+        response = self.changelist('topic', board__id__exact=self.other_board.pk)
+        self.assertEquals(response.context['cl'].result_count, 1)
+        response = self.changelist('post', topic__board__id__exact=self.board.pk)
+        self.assertEquals(response.context['cl'].result_count, 3)
+
+    def test_query_count_does_not_depend_on_the_number_of_posts(self):
+        # The session, the user, the boards of the filter, the estimated count and the posts with their topic and author.
+        with self.assertNumQueries(5):
+            self.changelist('post')
+        for i in range(10):
+            user = User.objects.create_user(username='user{}'.format(i), password='123')
+            Post.objects.create(message='Lorem ipsum', topic=self.topic, created_by=user)
+        with self.assertNumQueries(5):
+            self.changelist('post')
+
+
+class SearchTests(AdminTestCase):
+    def test_search_messages(self):
+        response = self.changelist('post', q='wheels')
+        self.assertEquals(list(response.context['cl'].result_list), list(Post.objects.filter(message__startswith='Wheels')))
+
+    def test_search_authors(self):
+        response = self.changelist('post', q='john')
+        self.assertEquals(response.context['cl'].result_count, 3)
+
+    def test_search_subjects(self):
+        response = self.changelist('topic', q='hello')
+        self.assertEquals(list(response.context['cl'].result_list), [self.topic])
+
+
+class ActionsTests(AdminTestCase):
+    def post_action(self, model, action, objects):
+        return self.client.post(reverse('admin:boards_{}_changelist'.format(model)), {
+            'action': action,
+            '_selected_action': [obj.pk for obj in objects],
+        })
+
+    def test_rebuild_board_stats(self):
+        Board.objects.update(posts_count=42, topics_count=42)
+        Topic.objects.update(posts_count=42)
+        self.post_action('board', 'rebuild_stats', [self.board])
+        self.board.refresh_from_db()
+        self.topic.refresh_from_db()
+        self.assertEquals(self.board.posts_count, 3)
+        self.assertEquals(self.board.topics_count, 1)
+        self.assertEquals(self.topic.posts_count, 3)
+        self.assertEquals(Board.objects.get(pk=self.other_board.pk).posts_count, 42)
+
+    def test_rebuild_topic_posts_count(self):
+        Board.objects.update(posts_count=42, topics_count=42)
+        Topic.objects.update(posts_count=42)
+        self.post_action('topic', 'rebuild_posts_count', [self.topic])
+        self.board.refresh_from_db()
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.posts_count, 3)
+        # Its board too, not the others.
+        self.assertEquals(self.board.posts_count, 3)
+        self.assertEquals(self.board.topics_count, 1)
+        self.assertEquals(Board.objects.get(pk=self.other_board.pk).posts_count, 42)
+
+    def test_rerender(self):
+        self.post_action('post', 'rerender', self.posts[:2])
+        self.assertEquals(Post.objects.filter(message_html_version=0).count(), 2)
+        self.assertEquals(Task.objects.get().name, 'boards.tasks.rerender_posts')
+        self.post_action('post', 'rerender', self.posts[2:])
+        # Still one pending task for all of them.
+        self.assertEquals(Task.objects.count(), 1)
+        self.assertEquals(Post.objects.exclude(message_html_version=MARKDOWN_RENDERER_VERSION).count(), 3)
+
+    def test_no_bulk_delete_of_boards_and_topics(self):
+        response = self.changelist('topic')
+        self.assertNotIn('delete_selected', dict(response.context['action_form'].fields['action'].choices))
+        response = self.changelist('post')
+        self.assertIn('delete_selected', dict(response.context['action_form'].fields['action'].choices))
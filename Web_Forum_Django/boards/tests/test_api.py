@@ -0,0 +1,144 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
+
+from .. import api
+from ..models import Board, Post, Topic
+
+
+class ApiTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topics = []
+        for i in range(5):
+            topic = Topic.objects.create(subject='Topic {}'.format(i), board=self.board, starter=self.user)
+            Post.objects.create(message='**Post** {}'.format(i), topic=topic, created_by=self.user)
+            self.topics.append(topic)
+        self.topic = self.topics[0]
+        for i in range(4):
+            Post.objects.create(message='Reply {}'.format(i), topic=self.topic, created_by=self.user)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEquals(response['Content-Type'], 'application/json')
+        return response, json.loads(response.content)
+
+
+class BoardListApiTests(ApiTestCase):
+    def test_boards(self):
+        response, data = self.get_json(reverse('api_boards'))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(data['results']), 1)
+        board = data['results'][0]
+        self.assertEquals(board['name'], 'Django')
+        self.assertEquals(board['topics_count'], 5)
+        self.assertEquals(board['posts_count'], 9)
+        self.assertEquals(board['last_post_by'], 'john')
+
+    def test_query_budget(self):
+        with self.assertQueryBudget('api_boards'):
+            self.client.get(reverse('api_boards'))
+
+
+class TopicListApiTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api_board_topics', kwargs={'pk': self.board.pk})
+
+    def test_field_selection(self):
+        response, data = self.get_json(self.url, fields='id,replies,starter')
+        self.assertEquals(set(data['results'][0]), {'id', 'replies', 'starter'})
+        replies = {topic['id']: topic['replies'] for topic in data['results']}
+        self.assertEquals(replies[self.topic.pk], 4)
+        self.assertEquals(data['results'][0]['starter'], 'john')
+
+    def test_unknown_field(self):
+        response, data = self.get_json(self.url, fields='id,password')
+        self.assertEquals(response.status_code, 400)
+        self.assertIn('password', data['detail'])
+
+    def test_cursor_pagination(self):
+        seen = []
+        response, data = self.get_json(self.url, limit=2, fields='id')
+        self.assertIsNone(data['previous'])
+        while True:
+            seen += [topic['id'] for topic in data['results']]
+            if data['next'] is None:
+                break
+            response, data = self.get_json(data['next'])
+        # Most recently updated first, like the board page.
+        self.assertEquals(seen, [topic.pk for topic in sorted(self.topics, key=lambda topic: (topic.last_updated, topic.pk), reverse=True)])
+        response, previous = self.get_json(data['previous'])
+        self.assertEquals([topic['id'] for topic in previous['results']], seen[2:4])
+
+    def test_bad_requests(self):
+        for params in ({'cursor': 'invalid'}, {'limit': 0}, {'limit': 'all'}, {'limit': 1000}):
+            response, data = self.get_json(self.url, **params)
+            self.assertEquals(response.status_code, 400)
+            self.assertFalse(response.has_header('ETag'))
+
+    def test_not_found(self):
+        response, data = self.get_json(reverse('api_board_topics', kwargs={'pk': 99}))
+        self.assertEquals(response.status_code, 404)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 304)
+        Post.objects.create(message='New reply', topic=self.topic, created_by=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+
+    def test_query_budget(self):
+        with self.assertQueryBudget('api_board_topics'):
+            self.client.get(self.url)
+
+
+class PostListApiTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api_topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def test_posts(self):
+        response, data = self.get_json(self.url)
+        self.assertEquals(len(data['results']), 5)
+        first = data['results'][0]
+        self.assertEquals(first['message'], '**Post** 0')
+        self.assertEquals(first['message_html'], '<p><strong>Post</strong> 0</p>')
+        self.assertEquals(first['created_by'], 'john')
+
+    def test_outdated_html_is_rendered(self):
+        Post.objects.filter(topic=self.topic).update(message_html='', message_html_version=0)
+        response, data = self.get_json(self.url, fields='message_html')
+        self.assertEquals(data['results'][0], {'message_html': '<p><strong>Post</strong> 0</p>'})
+
+    def test_does_not_count_views(self):
+        self.client.get(self.url)
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.views, 0)
+
+    def test_topic_of_another_board(self):
+        other = Board.objects.create(name='Python', description='Python board.')
+        response, data = self.get_json(reverse('api_topic_posts', kwargs={'pk': other.pk, 'topic_pk': self.topic.pk}))
+        self.assertEquals(response.status_code, 404)
+
+    def test_query_budget(self):
+        with self.assertQueryBudget('api_topic_posts'):
+            self.client.get(self.url)
+
+
+class DumpsTests(TestCase):
+    def test_json_fallback(self):
+        # Without orjson, the json module writes the same datetimes.
+        data = {'created_at': timezone.now(), 'updated_at': None, 'id': 1}
+        expected = json.loads(api.dumps(data))
+        orjson, api.orjson = api.orjson, None
+        try:
+            self.assertEquals(json.loads(api.dumps(data)), expected)
+        finally:
+            api.orjson = orjson
@@ -0,0 +1,104 @@
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+from Web_Forum_Django.query_inspector import QueryInspectorMiddleware
+
+from ..benchmark import list_views
+from ..models import Board, Post, Topic
+from ..views import AsyncBoardListView, AsyncPostListView, AsyncTopicListView
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        # Route the list URLs to the async views, like under ASGI.
+        context = list_views(asynchronous=True)
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.posts = [
+            Post.objects.create(message='Post {}'.format(i), topic=self.topic, created_by=self.user)
+            for i in range(25)
+        ]
+        self.topics_url = reverse('board_topics', kwargs={'pk': self.board.pk})
+        self.posts_url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+
+class AsyncBoardListViewTests(AsyncViewsTestCase):
+    def test_view_class(self):
+        self.assertEquals(resolve(reverse('home')).func.view_class, AsyncBoardListView)
+
+    async def test_boards(self):
+        response = await self.async_client.get(reverse('home'))
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, self.topics_url)
+
+
+class AsyncTopicListViewTests(AsyncViewsTestCase):
+    def test_view_class(self):
+        self.assertEquals(resolve(self.topics_url).func.view_class, AsyncTopicListView)
+
+    async def test_topics(self):
+        response = await self.async_client.get(self.topics_url)
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, self.posts_url)
+        self.assertEquals(response.context['paginator'].count, 1)
+
+    async def test_not_found(self):
+        response = await self.async_client.get(reverse('board_topics', kwargs={'pk': 99}))
+        self.assertEquals(response.status_code, 404)
+
+
+class AsyncPostListViewTests(AsyncViewsTestCase):
+    def test_view_class(self):
+        self.assertEquals(resolve(self.posts_url).func.view_class, AsyncPostListView)
+
+    def get_pks(self, response):
+        return [post.pk for post in response.context['posts']]
+
+    async def test_pages(self):
+        response = await self.async_client.get(self.posts_url)
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[:20]])
+        page = response.context['page_obj']
+        self.assertTrue(page.has_next())
+        response = await self.async_client.get(self.posts_url, {'cursor': page.next_cursor})
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[20:]])
+        response = await self.async_client.get(self.posts_url, {'page': 'last'})
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[20:]])
+
+    async def test_invalid_page(self):
+        response = await self.async_client.get(self.posts_url, {'page': 3})
+        self.assertEquals(response.status_code, 404)
+
+    async def test_not_found(self):
+        url = reverse('topic_posts', kwargs={'pk': 99, 'topic_pk': self.topic.pk})
+        response = await self.async_client.get(url)
+        self.assertEquals(response.status_code, 404)
+
+    async def test_views_counted_once_per_session(self):
+        await self.async_client.get(self.posts_url)
+        await self.async_client.get(self.posts_url)
+        await self.topic.arefresh_from_db()
+        self.assertEquals(self.topic.views, 1)
+
+
+@override_settings(QUERY_INSPECTOR_ENABLED=True)
+class AsyncQueryInspectorTests(AsyncViewsTestCase):
+    def test_sync_and_async(self):
+        async def async_view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(QueryInspectorMiddleware(async_view)))
+        self.assertFalse(iscoroutinefunction(QueryInspectorMiddleware(lambda request: HttpResponse())))
+
+    async def test_queries_are_counted(self):
+        response = await self.async_client.get(self.posts_url)
+        # The topic, the page of posts and the session at least, run by the async ORM.
+        self.assertGreaterEqual(int(response['X-Query-Count']), 3)
+
+    def test_queries_are_counted_by_the_sync_views(self):
+        # The same async view, run by the sync handler.
+        response = self.client.get(self.posts_url)
+        self.assertGreaterEqual(int(response['X-Query-Count']), 3)
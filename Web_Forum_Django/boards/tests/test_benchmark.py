@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..benchmark import percentile
+from ..models import Board, Post, Topic
+
+
+class GenerateForumCommandTests(TestCase):
+    def setUp(self):
+        call_command('generate_forum', users=5, boards=3, topics=20, posts=150, batch_size=50, stdout=StringIO())
+
+    def test_generated_rows(self):
+        self.assertEquals(User.objects.count(), 5)
+        self.assertEquals(Board.objects.count(), 3)
+        self.assertEquals(Topic.objects.count(), 20)
+        self.assertEquals(Post.objects.count(), 150)
+
+    def test_counters_are_consistent(self):
+        for board in Board.objects.all():
+            self.assertEquals(board.topics_count, board.topics.count())
+            self.assertEquals(board.posts_count, Post.objects.filter(topic__board=board).count())
+        for topic in Topic.objects.all():
+            self.assertEquals(topic.posts_count, topic.posts.count())
+            self.assertEquals(topic.last_updated, topic.posts.order_by('-created_at').first().created_at)
+
+    def test_profiles_are_created_with_their_posts_count(self):
+        for user in User.objects.select_related('profile'):
+            self.assertEquals(user.profile.posts_count, Post.objects.filter(created_by=user).count())
+        self.assertEquals(sum(User.objects.values_list('profile__posts_count', flat=True)), 150)
+
+    def test_benchmark_forum_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            call_command('benchmark_forum', iterations=2, warmup=0, output=path, stdout=StringIO())
+            call_command('benchmark_forum', iterations=2, warmup=0, baseline=path, stdout=StringIO())
+            with open(path) as output:
+                results = json.load(output)
+        self.assertEquals(results['data']['posts'], 150)
+        self.assertIn('p99_ms', results['cases']['topic_posts'])
+        # The write views are rolled back.
+        self.assertEquals(Post.objects.count(), 150)
+
+
+class PercentileTests(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEquals(percentile(values, 50), 50)
+        self.assertEquals(percentile(values, 99), 99)
+        self.assertEquals(percentile([3], 95), 3)
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Board, Post, Topic
+
+
+class BoardStatsTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.first_post = Post.objects.create(message='Lorem ipsum dolor sit amet', topic=self.topic, created_by=self.user)
+        self.last_post = Post.objects.create(message='Second post', topic=self.topic, created_by=self.user)
+
+
+class BoardStatsMaintenanceTests(BoardStatsTestCase):
+    def test_counters_after_creation(self):
+        self.board.refresh_from_db()
+        self.assertEquals(self.board.topics_count, 1)
+        self.assertEquals(self.board.posts_count, 2)
+        self.assertEquals(self.board.last_post, self.last_post)
+
+    def test_delete_last_post(self):
+        self.last_post.delete()
+        self.board.refresh_from_db()
+        self.assertEquals(self.board.posts_count, 1)
+        self.assertEquals(self.board.last_post, self.first_post)
+
+    def test_delete_topic(self):
+        self.topic.delete()
+        self.board.refresh_from_db()
+        self.assertEquals(self.board.topics_count, 0)
+        self.assertEquals(self.board.posts_count, 0)
+        self.assertIsNone(self.board.last_post)
+
+
+class RebuildBoardStatsCommandTests(BoardStatsTestCase):
+    def test_rebuild(self):
+        Board.objects.update(posts_count=42, topics_count=42, last_post=None)
+        call_command('rebuild_board_stats', stdout=StringIO())
+        self.board.refresh_from_db()
+        self.assertEquals(self.board.topics_count, 1)
+        self.assertEquals(self.board.posts_count, 2)
+        self.assertEquals(self.board.last_post, self.last_post)
+
+
+class HomeQueriesTests(BoardStatsTestCase):
+    def test_query_count_does_not_depend_on_the_number_of_boards(self):
+        url = reverse('home')
+        # The conditional GET validators, then the boards.
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        for i in range(10):
+            board = Board.objects.create(name='Board {}'.format(i), description='Another board.')
+            topic = Topic.objects.create(subject='Topic {}'.format(i), board=board, starter=self.user)
+            Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
+class TopicPostsCountTests(BoardStatsTestCase):
+    def test_counter_after_creation_and_deletion(self):
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.posts_count, 2)
+        self.assertEquals(self.topic.replies, 1)
+        self.first_post.delete()
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.posts_count, 1)
+
+    def test_rebuild(self):
+        Topic.objects.update(posts_count=42)
+        call_command('rebuild_board_stats', stdout=StringIO())
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.posts_count, 2)
+
+    def test_page_helpers_do_not_query(self):
+        self.topic.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertEquals(self.topic.get_page_count(), 1)
+            self.assertEquals(list(self.topic.get_page_range()), [1])
+            self.assertFalse(self.topic.has_many_pages())
+
+
+class BoardTopicsQueriesTests(BoardStatsTestCase):
+    def test_query_count_does_not_depend_on_the_number_of_topics(self):
+        url = reverse('board_topics', kwargs={'pk': self.board.pk})
+        # The conditional GET validators, the board and the topics.
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        for i in range(10):
+            topic = Topic.objects.create(subject='Topic {}'.format(i), board=self.board, starter=self.user)
+            Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+        with self.assertNumQueries(3):
+            self.client.get(url)
@@ -0,0 +1,131 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..benchmark import list_views
+from ..models import Board, Post, Topic
+from ..purge import hide_topic
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.post = Post.objects.create(message='Lorem ipsum dolor sit amet', topic=self.topic, created_by=self.user)
+        self.urls = [
+            reverse('home'),
+            reverse('board_topics', kwargs={'pk': self.board.pk}),
+            reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk}),
+        ]
+
+    def revalidate(self, url, **headers):
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        return response, context
+
+
+class ConditionalGetTests(ConditionalGetTestCase):
+    def test_validators(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertTrue(response.has_header('ETag'))
+            self.assertFalse(response.has_header('Last-Modified'))
+            self.assertIn('private', response['Cache-Control'])
+            self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_not_modified(self):
+        for url in self.urls:
+            response, context = self.revalidate(url)
+            self.assertEquals(response.status_code, 304)
+            self.assertEquals(response.templates, [])
+            # The session, when there is one, and the validators: none of the page queries.
+            self.assertLessEqual(len(context), 2)
+
+    def test_if_modified_since_is_ignored(self):
+        for url in self.urls:
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+            self.assertEquals(response.status_code, 200)
+
+    def test_modified_by_a_deletion(self):
+        # The dates of the last post and of the topic stay the same, the counters don't.
+        reply = Post.objects.create(message='Reply', topic=self.topic, created_by=self.user)
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        Post.objects.filter(pk=self.post.pk).delete()
+        for url, etag in zip(self.urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEquals(response.status_code, 200)
+        self.assertContains(response, reply.message)
+
+    def test_modified_by_a_hidden_topic(self):
+        other = Topic.objects.create(subject='Other topic', board=self.board, starter=self.user)
+        Post.objects.create(message='Other post', topic=other, created_by=self.user)
+        etags = [self.client.get(url)['ETag'] for url in self.urls[:2]]
+        hide_topic(other)
+        for url, etag in zip(self.urls[:2], etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEquals(response.status_code, 200)
+        self.assertNotContains(response, 'Other topic')
+
+    def test_modified_by_a_reply(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        Post.objects.create(message='Reply', topic=self.topic, created_by=self.user)
+        Topic.objects.filter(pk=self.topic.pk).update(last_updated=timezone.now())
+        for url, etag in zip(self.urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEquals(response.status_code, 200)
+
+    def test_modified_by_an_edit(self):
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        Post.objects.filter(pk=self.post.pk).update(message='Edited', updated_at=timezone.now())
+        self.assertEquals(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_the_user(self):
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        self.client.login(username='john', password='123')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        # The Edit button is only in the page of the author.
+        self.assertContains(response, 'Edit')
+
+    def test_not_modified_view_is_counted(self):
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        # Another session, with the page in its cache.
+        other = Client()
+        self.assertEquals(other.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEquals(other.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.views, 2)
+
+    def test_not_found(self):
+        url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': 99})
+        self.assertEquals(self.client.get(url).status_code, 404)
+
+
+class AsyncConditionalGetTests(ConditionalGetTestCase):
+    def setUp(self):
+        super().setUp()
+        context = list_views(asynchronous=True)
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+    async def test_not_modified(self):
+        for url in self.urls:
+            etag = (await self.async_client.get(url))['ETag']
+            response = await self.async_client.get(url, headers={'If-None-Match': etag})
+            self.assertEquals(response.status_code, 304)
+
+    async def test_not_modified_view_is_counted(self):
+        url = self.urls[2]
+        etag = (await self.async_client.get(url))['ETag']
+        response = await AsyncClient().get(url, headers={'If-None-Match': etag})
+        self.assertEquals(response.status_code, 304)
+        await self.topic.arefresh_from_db()
+        self.assertEquals(self.topic.views, 2)
@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Board, Post, Topic
+
+
+class FragmentCacheTestCase(TestCase):
+    def setUp(self):
+        caches['fragments'].clear()
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.other = User.objects.create_user(username='jane', email='jane@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.post = Post.objects.create(message='Lorem ipsum dolor sit amet', topic=self.topic, created_by=self.user)
+        self.topics_url = reverse('board_topics', kwargs={'pk': self.board.pk})
+        self.posts_url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+
+class FragmentVersionTests(FragmentCacheTestCase):
+    def test_saving_a_post_changes_its_version(self):
+        version = self.post.fragment_version
+        self.post.message = 'Edited'
+        self.post.save(update_fields=['message'])
+        self.post.refresh_from_db()
+        self.assertNotEquals(self.post.fragment_version, version)
+
+    def test_a_reply_changes_the_version_of_the_topic(self):
+        version = Topic.objects.get(pk=self.topic.pk).fragment_version
+        Post.objects.create(message='Reply', topic=self.topic, created_by=self.other)
+        self.assertNotEquals(Topic.objects.get(pk=self.topic.pk).fragment_version, version)
+
+    def test_saving_the_last_update_keeps_the_version_of_the_topic(self):
+        self.topic.refresh_from_db()
+        version = self.topic.fragment_version
+        self.topic.save(update_fields=['last_updated'])
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.fragment_version, version)
+
+
+class TopicRowCacheTests(FragmentCacheTestCase):
+    def test_rows_are_cached(self):
+        self.client.get(self.topics_url)
+        # Change the subject behind the back of the version: the cached row is still served.
+        Topic.objects.filter(pk=self.topic.pk).update(subject='Changed')
+        self.assertContains(self.client.get(self.topics_url), 'Hello, world')
+
+    def test_reply_refreshes_the_row(self):
+        self.client.get(self.topics_url)
+        self.client.login(username='jane', password='123')
+        self.client.post(reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk}), {'message': 'Reply'})
+        response = self.client.get(self.topics_url)
+        self.assertContains(response, '<td class="align-middle">1</td>', html=True)
+
+    def test_views_are_not_cached(self):
+        self.client.get(self.topics_url)
+        Topic.objects.filter(pk=self.topic.pk).update(views=42)
+        self.assertContains(self.client.get(self.topics_url), '<td class="align-middle">42</td>', html=True)
+
+
+class PostCardCacheTests(FragmentCacheTestCase):
+    def test_edit_refreshes_the_card(self):
+        self.client.get(self.posts_url)
+        self.client.login(username='john', password='123')
+        edit_url = reverse('edit_post', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk, 'post_pk': self.post.pk})
+        self.client.post(edit_url, {'message': 'edited message'})
+        response = self.client.get(self.posts_url)
+        self.assertContains(response, 'edited message')
+        self.assertNotContains(response, 'Lorem ipsum')
+
+    def test_edit_link_is_not_shared(self):
+        edit_url = reverse('edit_post', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk, 'post_pk': self.post.pk})
+        self.client.login(username='jane', password='123')
+        self.assertNotContains(self.client.get(self.posts_url), edit_url)
+        self.client.login(username='john', password='123')
+        self.assertContains(self.client.get(self.posts_url), edit_url)
+        self.client.login(username='jane', password='123')
+        self.assertNotContains(self.client.get(self.posts_url), edit_url)
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import live
+from ..models import Board, Post, Topic
+
+
+@override_settings(LIVE_UPDATES=True, LIVE_BACKEND='boards.live.LocalBackend', LIVE_HEARTBEAT_INTERVAL=5)
+class LiveTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.posts = [
+            Post.objects.create(message='Post {}'.format(i), topic=self.topic, created_by=self.user)
+            for i in range(3)
+        ]
+        self.url = reverse('topic_stream', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def reply(self, message):
+        # Run the on_commit callbacks, publishing the post, like after the commit of reply_topic.
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(message=message, topic=self.topic, created_by=self.user)
+
+    async def read_events(self, chunks, count):
+        events = []
+        while len(events) < count:
+            chunk = await asyncio.wait_for(anext(chunks), 5)
+            # bytes from a response, str from live.stream_events()
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode()
+            if chunk.startswith('id: '):
+                events.append(json.loads(chunk.split('data: ')[1]))
+        return events
+
+
+class SubscriptionTests(LiveTestCase):
+    @override_settings(LIVE_QUEUE_SIZE=2)
+    async def test_backpressure(self):
+        subscription = live.Subscription(self.topic.pk)
+        for i in range(5):
+            subscription.deliver({'id': i})
+        self.assertTrue(subscription.lagged)
+        # The queued events are dropped, the stream is told to catch up.
+        self.assertIs(await subscription.get(1), live.LAGGED)
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_publish_from_another_thread(self):
+        hub = live.get_hub()
+        subscription = hub.subscribe(self.topic.pk)
+        try:
+            thread = threading.Thread(target=hub.publish, args=(self.topic.pk, {'id': 42}))
+            thread.start()
+            thread.join()
+            self.assertEquals(await subscription.get(1), {'id': 42})
+        finally:
+            hub.unsubscribe(subscription)
+        self.assertEquals(hub.subscribers(self.topic.pk), 0)
+
+
+class TopicStreamTests(LiveTestCase):
+    async def test_new_replies(self):
+        response = await self.async_client.get(self.url)
+        self.assertEquals(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEquals(await anext(chunks), b'retry: 3000\n\n')
+        # Nothing before the stream was opened, the new post once committed.
+        post = await sync_to_async(self.reply)('**New** reply')
+        [event] = await self.read_events(chunks, 1)
+        await chunks.aclose()
+        self.assertEquals(event['id'], post.pk)
+        self.assertEquals(event['author'], 'john')
+        self.assertEquals(event['html'], '<p><strong>New</strong> reply</p>')
+
+    async def test_closing_the_stream_unsubscribes(self):
+        events = live.stream_events(self.topic.pk, self.posts[-1].pk)
+        await anext(events)
+        self.assertEquals(live.get_hub().subscribers(self.topic.pk), 1)
+        await events.aclose()
+        self.assertEquals(live.get_hub().subscribers(self.topic.pk), 0)
+
+    async def test_resume_from_last_event_id(self):
+        response = await self.async_client.get(self.url, headers={'Last-Event-ID': str(self.posts[0].pk)})
+        chunks = aiter(response.streaming_content)
+        events = await self.read_events(chunks, 2)
+        await chunks.aclose()
+        self.assertEquals([event['id'] for event in events], [post.pk for post in self.posts[1:]])
+
+    @override_settings(LIVE_BACKLOG_SIZE=1)
+    async def test_resume_in_batches(self):
+        response = await self.async_client.get(self.url, {'last_event_id': 0})
+        chunks = aiter(response.streaming_content)
+        events = await self.read_events(chunks, 3)
+        await chunks.aclose()
+        self.assertEquals([event['id'] for event in events], [post.pk for post in self.posts])
+
+    @override_settings(LIVE_HEARTBEAT_INTERVAL=0.01)
+    async def test_heartbeat(self):
+        response = await self.async_client.get(self.url)
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        self.assertEquals(await anext(chunks), b': heartbeat\n\n')
+        await chunks.aclose()
+
+    async def test_not_found(self):
+        response = await self.async_client.get(reverse('topic_stream', kwargs={'pk': self.board.pk, 'topic_pk': 99}))
+        self.assertEquals(response.status_code, 404)
+
+
+@override_settings(LIVE_BACKEND='boards.live.PollingBackend', LIVE_POLL_INTERVAL=0.01)
+class PollingBackendTests(LiveTestCase):
+    async def test_posts_of_other_processes(self):
+        chunks = live.stream_events(self.topic.pk, self.posts[-1].pk)
+        await anext(chunks)
+        # Created without publishing it, like by another process.
+        post = await Post.objects.acreate(message='From elsewhere', topic=self.topic, created_by=self.user)
+        [event] = await self.read_events(chunks, 1)
+        await chunks.aclose()
+        self.assertEquals(event['id'], post.pk)
+        # The topic isn't polled anymore.
+        self.assertEquals(live.get_hub().backend._tasks, {})
+
+
+class StreamUrlTests(LiveTestCase):
+    def test_last_page_only(self):
+        url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.assertContains(self.client.get(url), self.url)
+        for i in range(20):
+            Post.objects.create(message='Reply {}'.format(i), topic=self.topic, created_by=self.user)
+        self.assertNotContains(self.client.get(url), self.url)
+        with self.settings(LIVE_UPDATES=False):
+            self.assertNotContains(self.client.get(url + '?page=2'), self.url)
+
+    @override_settings(LIVE_UPDATES=False)
+    async def test_no_stream_without_live_updates(self):
+        response = await self.async_client.get(self.url)
+        self.assertEquals(response.status_code, 404)
+
+    @override_settings(LIVE_UPDATES=False)
+    def test_no_stream_under_wsgi(self):
+        self.assertEquals(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Board, Post, Topic
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.posts = [
+            Post.objects.create(message='Post {}'.format(i), topic=self.topic, created_by=self.user)
+            for i in range(45)
+        ]
+        self.url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def get_pks(self, response):
+        return [post.pk for post in response.context['posts']]
+
+
+class PostListKeysetPaginationTests(KeysetPaginationTestCase):
+    def test_first_page_links_to_next_cursor(self):
+        response = self.client.get(self.url)
+        page = response.context['page_obj']
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[:20]])
+        self.assertIsNotNone(page.next_cursor)
+        self.assertContains(response, '?cursor={}'.format(page.next_cursor))
+
+    def test_next_and_previous_cursors(self):
+        first_page = self.client.get(self.url).context['page_obj']
+        response = self.client.get(self.url, {'cursor': first_page.next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEquals(second_page.number, 2)
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[20:40]])
+        response = self.client.get(self.url, {'cursor': second_page.previous_cursor})
+        self.assertEquals(response.context['page_obj'].number, 1)
+        self.assertFalse(response.context['page_obj'].has_previous())
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[:20]])
+
+    def test_last_page_has_no_next(self):
+        second_page = self.client.get(self.url, {'page': 2}).context['page_obj']
+        response = self.client.get(self.url, {'cursor': second_page.next_cursor})
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[40:]])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_numbered_pages_still_work(self):
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEquals(self.get_pks(response), [post.pk for post in self.posts[20:40]])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEquals(response.status_code, 404)
+
+
+class TopicListKeysetPaginationTests(KeysetPaginationTestCase):
+    def test_stable_when_topics_are_added(self):
+        for i in range(25):
+            Topic.objects.create(subject='Topic {}'.format(i), board=self.board, starter=self.user)
+        url = reverse('board_topics', kwargs={'pk': self.board.pk})
+        first_page = self.client.get(url).context['page_obj']
+        last_seen = first_page.object_list[-1]
+        Topic.objects.create(subject='A brand new topic', board=self.board, starter=self.user)
+        response = self.client.get(url, {'cursor': first_page.next_cursor})
+        topics = list(response.context['topics'])
+        self.assertEquals(len(topics), 6)
+        self.assertNotIn(last_seen, topics)
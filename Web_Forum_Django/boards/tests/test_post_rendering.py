@@ -0,0 +1,82 @@
+import threading
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from ..models import Board, Post, Topic
+from ..rendering import MARKDOWN_RENDERER_VERSION, RenderCache, get_renderer, render_many, render_markdown
+
+
+class PostRenderingTests(TestCase):
+    def setUp(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=user)
+        self.post = Post.objects.create(message='**Lorem** <script>alert(1)</script>', topic=topic, created_by=user)
+
+    def test_message_rendered_on_creation(self):
+        self.assertIn('<strong>Lorem</strong>', self.post.message_html)
+        self.assertEquals(self.post.message_html_version, MARKDOWN_RENDERER_VERSION)
+
+    def test_raw_html_is_escaped(self):
+        self.assertNotIn('<script>', self.post.message_html)
+        self.assertIn('&lt;script&gt;', self.post.message_html)
+
+    def test_outdated_post_rendered_on_the_fly(self):
+        Post.objects.update(message_html='stale', message_html_version=0)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn('<strong>Lorem</strong>', post.get_message_as_markdown())
+
+    def test_render_outdated(self):
+        Post.objects.update(message_html='stale', message_html_version=0)
+        posts = list(Post.objects.all())
+        Post.render_outdated(posts)
+        self.assertIn('<strong>Lorem</strong>', posts[0].message_html)
+        self.assertEquals(posts[0].message_html_version, MARKDOWN_RENDERER_VERSION)
+
+    def test_rerender_posts_command(self):
+        Post.objects.update(message_html='stale', message_html_version=0)
+        call_command('rerender_posts', chunk_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertIn('<strong>Lorem</strong>', self.post.message_html)
+        self.assertEquals(self.post.message_html_version, MARKDOWN_RENDERER_VERSION)
+
+
+class RendererTests(SimpleTestCase):
+    def test_renderer_is_reset_between_messages(self):
+        # The reference defined in the first message must not leak into the second one.
+        first, second = render_many(['[link][ref]\n\n[ref]: https://example.com/', '[link][ref] <b>bold</b>'])
+        self.assertIn('href="https://example.com/"', first)
+        self.assertNotIn('href', second)
+        self.assertIn('&lt;b&gt;', second)
+
+    def test_same_output_as_a_new_renderer(self):
+        from markdown import markdown
+
+        from ..rendering import EscapeHtmlExtension
+        text = '# Title\n\n* one\n* two\n\n<div>raw</div>\n\n`code`'
+        self.assertEquals(render_markdown(text), markdown(text, extensions=[EscapeHtmlExtension()]))
+
+    def test_duplicates_rendered_once(self):
+        texts = ['**once** {}'.format(id(self))] * 3
+        self.assertEquals(render_many(texts), [render_markdown(texts[0])] * 3)
+
+    def test_one_renderer_per_thread(self):
+        renderers = []
+        thread = threading.Thread(target=lambda: renderers.append(get_renderer()))
+        thread.start()
+        thread.join()
+        self.assertIs(get_renderer(), get_renderer())
+        self.assertIsNot(renderers[0], get_renderer())
+
+    def test_lru_cache(self):
+        cache = RenderCache(size=2)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+        self.assertEquals(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEquals(len(cache), 2)
@@ -0,0 +1,92 @@
+import os
+import pstats
+import shutil
+import tempfile
+from io import StringIO
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from Web_Forum_Django.profiling import RequestProfilerMiddleware, make_token
+
+from ..models import Board, Post, Topic
+
+
+class RequestProfilerTests(TestCase):
+    def setUp(self):
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir)
+        settings = override_settings(REQUEST_PROFILING_ENABLED=True, REQUEST_PROFILING_DIR=self.profiles_dir, REQUEST_PROFILING_INTERVAL=0.001)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=self.user)
+        for i in range(30):
+            Post.objects.create(message='**Lorem ipsum** {}'.format(i), topic=topic, created_by=self.user)
+        self.url = reverse('topic_posts', kwargs={'pk': board.pk, 'topic_pk': topic.pk})
+
+    def profiles(self):
+        return sorted(os.listdir(self.profiles_dir))
+
+    def test_not_profiled(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Profile', response)
+        self.assertEquals(self.profiles(), [])
+
+    def test_signed_header(self):
+        response = self.client.get(self.url, headers={'X-Profile-Token': make_token()})
+        name = response['X-Profile']
+        self.assertTrue(name.startswith('topic_posts-'))
+        self.assertEquals(self.profiles(), [name + '.collapsed', name + '.pstats', name + '.txt'])
+        stats = pstats.Stats(os.path.join(self.profiles_dir, name + '.pstats'))
+        self.assertGreater(stats.total_calls, 0)
+        with open(os.path.join(self.profiles_dir, name + '.txt')) as f:
+            report = f.read()
+        self.assertIn('GET {} (topic_posts)'.format(self.url), report)
+        self.assertIn('queries', report)
+
+    def test_bad_token(self):
+        response = self.client.get(self.url, headers={'X-Profile-Token': make_token() + 'x'})
+        self.assertNotIn('X-Profile', response)
+
+    def test_staff_query_flag(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {'profile': '1'})
+        self.assertNotIn('X-Profile', response)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get(self.url, {'profile': '1'})
+        self.assertIn('X-Profile', response)
+
+    @override_settings(REQUEST_PROFILER='sampling')
+    def test_sampling_only(self):
+        response = self.client.get(self.url, headers={'X-Profile-Token': make_token()})
+        name = response['X-Profile']
+        self.assertEquals(self.profiles(), [name + '.collapsed', name + '.txt'])
+        with open(os.path.join(self.profiles_dir, name + '.collapsed')) as f:
+            for line in f:
+                stack, count = line.rsplit(' ', 1)
+                self.assertGreater(int(count), 0)
+
+    def test_profile_token_command(self):
+        output = StringIO()
+        call_command('profile_token', stdout=output)
+        token = output.getvalue().split()[1]
+        response = self.client.get(self.url, headers={'X-Profile-Token': token})
+        self.assertIn('X-Profile', response)
+
+    def test_sync_and_async(self):
+        async def async_view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(RequestProfilerMiddleware(async_view)))
+        self.assertFalse(iscoroutinefunction(RequestProfilerMiddleware(lambda request: HttpResponse())))
+
+    async def test_async_requests_are_not_profiled(self):
+        response = await self.async_client.get(self.url, headers={'X-Profile-Token': make_token()})
+        self.assertEquals(response.status_code, 200)
+        self.assertNotIn('X-Profile', response)
+        self.assertEquals(self.profiles(), [])
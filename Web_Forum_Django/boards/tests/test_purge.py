@@ -0,0 +1,153 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Profile
+from tasks.models import Task
+from tasks.queue import run_due_tasks
+
+from ..models import Board, Post, Topic
+from ..purge import hide_board, hide_topic
+from ..search import SearchResults
+from ..stats import rebuild_board_stats
+
+
+class PurgeTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        for i in range(5):
+            Post.objects.create(message='Lorem ipsum {}'.format(i), topic=self.topic, created_by=self.user)
+        self.other_topic = Topic.objects.create(subject='Other topic', board=self.board, starter=self.user)
+        self.other_post = Post.objects.create(message='Another message', topic=self.other_topic, created_by=self.user)
+        # The last post of the board is in the hidden topic.
+        self.last_post = Post.objects.create(message='Lorem ipsum again', topic=self.topic, created_by=self.user)
+
+    def assertBoardStats(self, topics_count, posts_count, last_post):
+        self.board.refresh_from_db()
+        self.assertEquals(self.board.topics_count, topics_count)
+        self.assertEquals(self.board.posts_count, posts_count)
+        self.assertEquals(self.board.last_post, last_post)
+
+    def purge(self):
+        call_command('purge_hidden', chunk_size=2, stdout=StringIO())
+
+
+class HideTopicTests(PurgeTestCase):
+    def setUp(self):
+        super().setUp()
+        hide_topic(self.topic)
+
+    def test_board_stats(self):
+        self.assertBoardStats(1, 1, self.other_post)
+        rebuild_board_stats()
+        self.assertBoardStats(1, 1, self.other_post)
+
+    def test_hidden_from_the_views(self):
+        topic_url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.assertEquals(self.client.get(topic_url).status_code, 404)
+        self.assertEquals(self.client.get(self.last_post.get_absolute_url()).status_code, 404)
+        response = self.client.get(reverse('board_topics', kwargs={'pk': self.board.pk}))
+        self.assertEquals(list(response.context['topics']), [self.other_topic])
+        self.assertEquals(SearchResults('lorem')[0:10], [])
+
+    def test_purge_queued_once(self):
+        self.assertFalse(hide_topic(self.topic))
+        hide_topic(self.other_topic)
+        self.assertEquals(Task.objects.filter(name='boards.tasks.purge_hidden').count(), 1)
+
+    def test_purge(self):
+        self.purge()
+        self.assertFalse(Topic.objects.filter(pk=self.topic.pk).exists())
+        self.assertEquals(Post.objects.count(), 1)
+        self.assertEquals(Profile.objects.get(user=self.user).posts_count, 1)
+        self.assertEquals(SearchResults('lorem').count(), 0)
+        self.assertBoardStats(1, 1, self.other_post)
+
+    def test_purge_task(self):
+        run_due_tasks()
+        self.assertEquals(Task.objects.get().status, Task.DONE)
+        self.assertEquals(Post.objects.count(), 1)
+
+    def test_delete_hidden_topic(self):
+        '''
+        Deleted by Django instead, the statistics don't count it twice.
+        '''
+        self.topic.delete()
+        self.assertBoardStats(1, 1, self.other_post)
+
+
+class HideBoardTests(PurgeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_board = Board.objects.create(name='Python', description='Python board.')
+        hide_board(self.board)
+
+    def test_hidden_from_the_views(self):
+        response = self.client.get(reverse('home'))
+        self.assertEquals(list(response.context['boards']), [self.other_board])
+        self.assertEquals(self.client.get(reverse('board_topics', kwargs={'pk': self.board.pk})).status_code, 404)
+        self.assertEquals(self.client.get(reverse('api_board_topics', kwargs={'pk': self.board.pk})).status_code, 404)
+
+    def test_purge(self):
+        output = StringIO()
+        call_command('purge_hidden', chunk_size=2, stdout=output)
+        self.assertIn('Deleted 7 post(s)', output.getvalue())
+        self.assertEquals(list(Board.objects.all()), [self.other_board])
+        self.assertFalse(Topic.objects.exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertEquals(Profile.objects.get(user=self.user).posts_count, 0)
+
+
+class AdminHideTests(PurgeTestCase):
+    def test_hide_selected_topics(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@doe.com', password='123')
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:boards_topic_changelist'), {
+            'action': 'hide_selected',
+            '_selected_action': [self.topic.pk],
+        })
+        self.assertTrue(Topic.objects.get(pk=self.topic.pk).is_hidden)
+        self.assertBoardStats(1, 1, self.other_post)
+
+    def test_hide_selected_topics_of_several_boards(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@doe.com', password='123')
+        self.client.force_login(admin)
+        other_board = Board.objects.create(name='Python', description='Python board.')
+        topics = [Topic.objects.create(subject='Topic {}'.format(i), board=other_board, starter=self.user) for i in range(3)]
+        for topic in topics:
+            Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+
+        def hide(selected):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse('admin:boards_topic_changelist'), {
+                    'action': 'hide_selected',
+                    '_selected_action': [topic.pk for topic in selected],
+                })
+            return len(queries)
+
+        one = hide([topics[0]])
+        Task.objects.all().delete()
+        # The same queries for three topics of two boards.
+        self.assertEquals(hide([self.topic] + topics[1:]), one)
+        self.assertBoardStats(1, 1, self.other_post)
+        other_board.refresh_from_db()
+        self.assertEquals((other_board.topics_count, other_board.posts_count, other_board.last_post), (0, 0, None))
+        self.assertEquals(Task.objects.filter(name='boards.tasks.purge_hidden').count(), 1)
+
+    def test_hide_selected_boards(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@doe.com', password='123')
+        self.client.force_login(admin)
+        other_board = Board.objects.create(name='Python', description='Python board.')
+        self.client.post(reverse('admin:boards_board_changelist'), {
+            'action': 'hide_selected',
+            '_selected_action': [self.board.pk, other_board.pk],
+        })
+        self.assertEquals(Board.objects.filter(is_hidden=True).count(), 2)
+        self.assertEquals(Task.objects.filter(name='boards.tasks.purge_hidden').count(), 1)
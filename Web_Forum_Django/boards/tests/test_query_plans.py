@@ -0,0 +1,110 @@
+import re
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Board, Post, Topic
+
+'''
+Run EXPLAIN QUERY PLAN on every SELECT executed by the forum views and fail if SQLite
+falls back to a full table scan or sorts the rows in a temporary B-tree,
+which means a query doesn't match any of the indexes declared on the models.
+'''
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?!.*USING (COVERING )?INDEX)')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is specific to SQLite')
+class QueryPlanTestCase(TestCase):
+    # Tables that a view is expected to read entirely, e.g. the home page lists all the boards.
+    allowed_scans = set()
+
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        for i in range(25):
+            self.post = Post.objects.create(message='Post {}'.format(i), topic=self.topic, created_by=self.user)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertQueryPlansUseIndexes(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for detail in self.explain(sql):
+                scan = FULL_SCAN.search(detail)
+                if scan and scan.group(1) not in self.allowed_scans:
+                    self.fail('Full table scan ({}) in:\n{}'.format(detail, sql))
+                if TEMP_SORT.search(detail):
+                    self.fail('Temporary B-tree sort ({}) in:\n{}'.format(detail, sql))
+        return response
+
+
+class HomeQueryPlanTests(QueryPlanTestCase):
+    allowed_scans = {'boards_board'}
+
+    def test_home(self):
+        self.assertQueryPlansUseIndexes('get', reverse('home'))
+
+
+class BoardTopicsQueryPlanTests(QueryPlanTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(25):
+            Topic.objects.create(subject='Topic {}'.format(i), board=self.board, starter=self.user)
+        self.url = reverse('board_topics', kwargs={'pk': self.board.pk})
+
+    def test_board_topics(self):
+        self.assertQueryPlansUseIndexes('get', self.url)
+
+    def test_board_topics_numbered_page(self):
+        self.assertQueryPlansUseIndexes('get', self.url, {'page': 2})
+
+    def test_board_topics_cursor(self):
+        response = self.client.get(self.url)
+        self.assertQueryPlansUseIndexes('get', self.url, {'cursor': response.context['page_obj'].next_cursor})
+
+
+class TopicPostsQueryPlanTests(QueryPlanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='john', password='123')
+        self.url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def test_topic_posts(self):
+        self.assertQueryPlansUseIndexes('get', self.url)
+
+    def test_topic_posts_cursor(self):
+        response = self.client.get(self.url)
+        self.assertQueryPlansUseIndexes('get', self.url, {'cursor': response.context['page_obj'].next_cursor})
+
+
+class WriteViewsQueryPlanTests(QueryPlanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='john', password='123')
+
+    def test_new_topic(self):
+        url = reverse('new_topic', kwargs={'pk': self.board.pk})
+        self.assertQueryPlansUseIndexes('post', url, {'subject': 'Test title', 'message': 'Lorem ipsum'})
+
+    def test_reply_topic(self):
+        url = reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.assertQueryPlansUseIndexes('post', url, {'message': 'hello, world!'})
+
+    def test_edit_post(self):
+        url = reverse('edit_post', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk, 'post_pk': self.post.pk})
+        self.assertQueryPlansUseIndexes('post', url, {'message': 'edited message'})
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from tasks.models import Task
+from Web_Forum_Django.routers import (
+    PrimaryReplicaRouter, ReplicaPinningMiddleware, is_pinned, mark_synced, pin_to_primary, unpin,
+)
+
+from ..models import Board
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.addCleanup(unpin)
+        # Synced a second ago.
+        patcher = mock.patch('Web_Forum_Django.routers.replica_lag', return_value=1)
+        self.replica_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEquals(self.router.db_for_read(Board), 'replica1')
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEquals(self.router.db_for_write(Board), 'default')
+
+    def test_pinned_reads_go_to_the_primary(self):
+        pin_to_primary()
+        self.assertEquals(self.router.db_for_read(Board), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'boards'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'boards'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertEquals(self.router.db_for_read(Board), 'default')
+
+    def test_sessions_users_and_tasks_are_read_from_the_primary(self):
+        self.assertEquals(self.router.db_for_read(Session), 'default')
+        self.assertEquals(self.router.db_for_read(User), 'default')
+        self.assertEquals(self.router.db_for_read(Task), 'default')
+
+    def test_lagging_replica_is_left_out(self):
+        self.replica_lag.return_value = settings.REPLICA_MAX_LAG + 1
+        self.assertEquals(self.router.db_for_read(Board), 'default')
+
+    def test_never_synced_replica_is_left_out(self):
+        self.replica_lag.return_value = None
+        self.assertEquals(self.router.db_for_read(Board), 'default')
+
+    def test_pin_outlasts_the_lag(self):
+        self.assertGreater(settings.REPLICA_PIN_SECONDS, settings.REPLICA_MAX_LAG)
+
+
+class StaleReplicaTests(TestCase):
+    '''
+    A real replica, synced before the test data was created.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.directory.name, 'replica.sqlite3')
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = sqlite3.connect(path)
+        try:
+            primary.connection.backup(replica)
+        finally:
+            replica.close()
+        # Added once the test databases are set up, which would replace it with an empty one.
+        connections.settings['stale_replica'] = dict(primary.settings_dict, NAME=path)
+        cls.databases = cls.databases | {'stale_replica'}
+        mark_synced('stale_replica')
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.databases
+        connections['stale_replica'].close()
+        del connections['stale_replica']
+        del connections.settings['stale_replica']
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    @override_settings(DATABASE_REPLICAS=['stale_replica'])
+    def test_session_created_after_the_sync_authenticates(self):
+        User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.client.login(username='john', password='123')
+        Board.objects.create(name='Django', description='Django board.')
+        self.assertFalse(Session.objects.using('stale_replica').exists())
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'john')
+        # The boards were read from the replica, which doesn't have the new one yet.
+        self.assertNotContains(response, 'Django board.')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.pinned = None
+
+    def get_response(self, request):
+        self.pinned = is_pinned()
+        return HttpResponse()
+
+    def test_get_reads_from_the_replica(self):
+        response = ReplicaPinningMiddleware(self.get_response)(self.factory.get('/'))
+        self.assertFalse(self.pinned)
+        self.assertNotIn('pin_primary', response.cookies)
+
+    def test_post_pins_the_next_requests(self):
+        response = ReplicaPinningMiddleware(self.get_response)(self.factory.post('/'))
+        self.assertTrue(self.pinned)
+        self.assertEquals(response.cookies['pin_primary']['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertFalse(is_pinned())
+
+    def test_get_after_a_write_reads_from_the_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES['pin_primary'] = '1'
+        ReplicaPinningMiddleware(self.get_response)(request)
+        self.assertTrue(self.pinned)
+
+
+class SyncReplicasCommandTests(SimpleTestCase):
+    def test_no_replica(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replicas')
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+from Web_Forum_Django.sqlite import configure_connection, copy_database, retry_on_locked
+
+from ..benchmark import sqlite_write_workload
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'db.sqlite3')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_pragmas(self):
+        conn = configure_connection(sqlite3.connect(self.path))
+        self.assertEquals(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEquals(conn.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+        self.assertEquals(conn.execute('PRAGMA synchronous').fetchone()[0], 1)
+        conn.close()
+
+    def test_production_options(self):
+        database = dict(connections.settings['default'], NAME=self.path, OPTIONS=settings.SQLITE_PRODUCTION_OPTIONS)
+        connections['production'] = DatabaseWrapper(database, alias='production')
+        self.addCleanup(delattr, connections._connections, 'production')
+        self.addCleanup(connections['production'].close)
+        with connections['production'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEquals(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEquals(cursor.fetchone()[0], 5000)
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with transaction.atomic(using='production'):
+            # BEGIN IMMEDIATE: the write lock is taken before anything is written.
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+
+    def test_copy_database(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE board (name TEXT)')
+        conn.execute("INSERT INTO board VALUES ('Django')")
+        conn.commit()
+        replica = os.path.join(self.directory.name, 'replica.sqlite3')
+        copy_database(self.path, replica)
+        conn.close()
+        conn = sqlite3.connect(replica)
+        self.assertEquals(conn.execute('SELECT name FROM board').fetchall(), [('Django',)])
+        conn.close()
+
+    def test_retry_on_locked(self):
+        func = mock.Mock(side_effect=[OperationalError('database is locked'), 'done'])
+        self.assertEquals(retry_on_locked(func, backoff=0), 'done')
+        self.assertEquals(func.call_count, 2)
+
+    def test_other_errors_are_not_retried(self):
+        func = mock.Mock(side_effect=OperationalError('no such table: boards_post'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(func, backoff=0)
+        self.assertEquals(func.call_count, 1)
+
+    def test_concurrent_writes_without_lock_errors(self):
+        # The same workload under Django's defaults, then under the production profile.
+        default = sqlite_write_workload(self.path, threads=6, writes=50, tuned=False)
+        tuned = sqlite_write_workload(os.path.join(self.directory.name, 'tuned.sqlite3'), threads=6, writes=50, tuned=True)
+        # The read transactions upgraded to write ones fail, the busy timeout doesn't help them.
+        self.assertGreater(default['errors'], 0)
+        self.assertLess(default['writes'], 300)
+        self.assertEquals(tuned['errors'], 0)
+        self.assertEquals(tuned['writes'], 300)
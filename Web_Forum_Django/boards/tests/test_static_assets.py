@@ -0,0 +1,102 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from Web_Forum_Django.assets import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticMiddleware
+
+from ..templatetags.assets import is_vendored
+
+class StaticPipelineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(
+            STATIC_ROOT=cls.static_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'Web_Forum_Django.assets.CompressedManifestStaticFilesStorage'},
+            },
+            STATIC_BUNDLES_ENABLED=True,
+        ))
+        # The images and source maps missing from static/ are reported without stopping collectstatic.
+        with cls().assertLogs('Web_Forum_Django.assets', 'WARNING'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.static_root)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = PrecompressedStaticMiddleware(lambda request: HttpResponse('not static'))
+
+    def render(self, source):
+        return Template('{% load assets %}' + source).render(Context())
+
+    def hashed_url(self, name):
+        return self.render('{% load static %}{% static "' + name + '" %}')
+
+    def test_bundle_tag(self):
+        html = self.render("{% bundle 'js/forum.js' %}")
+        self.assertEquals(html.count('<script'), 1)
+        self.assertRegex(html, r'/static/js/forum\.[0-9a-f]{12}\.js')
+
+    def test_bundle_content(self):
+        url = self.hashed_url('css/forum.css')
+        with open(os.path.join(self.static_root, url[len(settings.STATIC_URL):]), 'rb') as bundle:
+            content = bundle.read()
+        with open(os.path.join(settings.BASE_DIR, 'static', 'css', 'app.css'), 'rb') as app:
+            self.assertIn(app.read().strip(), content)
+
+    def test_precompressed_and_immutable(self):
+        url = self.hashed_url('css/app.css')
+        response = self.middleware(self.factory.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        self.assertEquals(response['Content-Encoding'], 'gzip')
+        self.assertEquals(response['Content-Type'], 'text/css')
+        self.assertEquals(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEquals(response['Vary'], 'Accept-Encoding')
+        self.assertIn(b'navbar-brand', gzip.decompress(b''.join(response.streaming_content)))
+
+    def test_uncompressed(self):
+        url = self.hashed_url('css/app.css')
+        response = self.middleware(self.factory.get(url))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'navbar-brand', b''.join(response.streaming_content))
+
+    def test_unhashed_name(self):
+        response = self.middleware(self.factory.get('/static/css/app.css'))
+        self.assertEquals(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_not_modified(self):
+        url = self.hashed_url('css/app.css')
+        etag = self.middleware(self.factory.get(url))['ETag']
+        response = self.middleware(self.factory.get(url, HTTP_IF_NONE_MATCH=etag))
+        self.assertEquals(response.status_code, 304)
+
+    def test_other_requests(self):
+        response = self.middleware(self.factory.get('/boards/1/'))
+        self.assertEquals(response.content, b'not static')
+
+
+class AssetTagsTests(SimpleTestCase):
+    def render(self, source):
+        return Template('{% load assets %}' + source).render(Context())
+
+    def test_bundle_files(self):
+        html = self.render("{% bundle 'css/forum.css' %}")
+        self.assertIn('/static/css/bootstrap.min.css', html)
+        self.assertIn('/static/css/app.css', html)
+
+    def test_vendor_static_falls_back_to_the_cdn(self):
+        is_vendored.cache_clear()
+        with override_settings(VENDOR_ASSETS={'vendor/missing.js': 'https://cdn.example.com/missing.js'}):
+            self.assertEquals(self.render("{% vendor_static 'vendor/missing.js' %}"), 'https://cdn.example.com/missing.js')
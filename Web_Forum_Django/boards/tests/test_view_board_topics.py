@@ -1,6 +1,9 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 from django.urls import resolve, reverse
-from ..models import Board
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
+
+from ..models import Board, Post, Topic
 from ..views import TopicListView
 
 
@@ -28,4 +31,17 @@ class BoardTopicsTests(TestCase):
         new_topic_url = reverse('new_topic', kwargs={'pk': 1})
         response = self.client.get(board_topics_url)
         self.assertContains(response, 'href="{0}"'.format(homepage_url))
-        self.assertContains(response, 'href="{0}"'.format(new_topic_url))
\ No newline at end of file
+        self.assertContains(response, 'href="{0}"'.format(new_topic_url))
+
+
+class BoardTopicsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        for i in range(5):
+            user = User.objects.create(username='user{}'.format(i))
+            topic = Topic.objects.create(subject='Topic {}'.format(i), board=self.board, starter=user)
+            Post.objects.create(message='Lorem ipsum', topic=topic, created_by=user)
+
+    def test_query_budget(self):
+        with self.assertQueryBudget('board_topics'):
+            self.client.get(reverse('board_topics', kwargs={'pk': self.board.pk}))
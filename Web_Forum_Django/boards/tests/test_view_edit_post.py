@@ -3,9 +3,10 @@ from django.forms import ModelForm
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.urls import resolve, reverse
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
 
 from ..models import Board, Post, Topic
-from ..views import PostUpdateView
+from ..views import PostListView, PostUpdateView
 
 '''
 class we defined to be reused across the other test cases. It's just the basic setup, creating users, topic, boards, and so on.
@@ -102,6 +103,10 @@ class SuccessfulPostUpdateViewTests(PostUpdateViewTestCase):
         self.post.refresh_from_db()
         self.assertEquals(self.post.message, 'edited message')
 
+    def test_post_rendered_again(self):
+        self.post.refresh_from_db()
+        self.assertEquals(self.post.message_html, '<p>edited message</p>')
+
 
 class InvalidPostUpdateViewTests(PostUpdateViewTestCase):
     def setUp(self):
@@ -120,4 +125,34 @@ class InvalidPostUpdateViewTests(PostUpdateViewTestCase):
 
     def test_form_errors(self):
         form = self.response.context.get('form')
-        self.assertTrue(form.errors)
\ No newline at end of file
+        self.assertTrue(form.errors)
+
+
+class PostUpdateViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    '''
+    The post being edited is in a topic with a full page of posts from several authors.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        board = Board.objects.create(name='Django', description='Django board.')
+        users = [
+            User.objects.create_user(username='user{}'.format(i), email='user{}@doe.com'.format(i), password='123')
+            for i in range(4)
+        ]
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=users[0])
+        posts = [
+            Post.objects.create(message='Post {}'.format(i), topic=topic, created_by=users[i % len(users)])
+            for i in range(PostListView.paginate_by + 5)
+        ]
+        cls.url = reverse('edit_post', kwargs={'pk': board.pk, 'topic_pk': topic.pk, 'post_pk': posts[0].pk})
+
+    def setUp(self):
+        self.client.login(username='user0', password='123')
+
+    def test_query_budget_get(self):
+        with self.assertQueryBudget('edit_post'):
+            self.client.get(self.url)
+
+    def test_query_budget_post(self):
+        with self.assertQueryBudget('edit_post'):
+            self.client.post(self.url, {'message': 'edited message'})
@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.urls import resolve, reverse
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
 
 from ..models import Board
 from ..views import BoardListView
@@ -20,4 +21,14 @@ class HomeTests(TestCase):
 
     def test_home_view_contains_link_to_topics_page(self):
         board_topics_url = reverse('board_topics', kwargs={'pk': self.board.pk})
-        self.assertContains(self.response, 'href="{0}"'.format(board_topics_url))
\ No newline at end of file
+        self.assertContains(self.response, 'href="{0}"'.format(board_topics_url))
+
+
+class HomeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        for i in range(5):
+            Board.objects.create(name='Board {}'.format(i), description='Board.')
+
+    def test_query_budget(self):
+        with self.assertQueryBudget('home'):
+            self.client.get(reverse('home'))
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.urls import resolve, reverse
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
 
 from ..forms import NewTopicForm
 from ..models import Board, Post, Topic
@@ -91,4 +92,16 @@ class LoginRequiredNewTopicTests(TestCase):
 
     def test_redirection(self):
         login_url = reverse('login')
-        self.assertRedirects(self.response, '{login_url}?next={url}'.format(login_url=login_url, url=self.url))
\ No newline at end of file
+        self.assertRedirects(self.response, '{login_url}?next={url}'.format(login_url=login_url, url=self.url))
+
+
+class NewTopicQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        Board.objects.create(name='Django', description='Django board.')
+        User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.client.login(username='john', password='123')
+
+    def test_query_budget(self):
+        url = reverse('new_topic', kwargs={'pk': 1})
+        with self.assertQueryBudget('new_topic'):
+            self.client.post(url, {'subject': 'Test title', 'message': 'Lorem ipsum dolor sit amet'})
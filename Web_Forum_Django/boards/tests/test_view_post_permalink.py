@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import resolve, reverse
+from django.utils import timezone
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
+
+from ..models import Board, Post, Topic
+from ..views import PostListView, post_permalink
+
+
+class PostPermalinkTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.posts = [
+            Post.objects.create(message='Post {}'.format(i), topic=self.topic, created_by=self.user)
+            for i in range(45)
+        ]
+        self.topic_url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def assertPermalinkRedirects(self, post, page):
+        response = self.client.get(post.get_absolute_url())
+        self.assertRedirects(response, '{}?page={}#{}'.format(self.topic_url, page, post.pk), fetch_redirect_response=False)
+
+
+class PostPermalinkTests(PostPermalinkTestCase):
+    def test_url_resolves_post_permalink_view(self):
+        view = resolve('/posts/{}/'.format(self.posts[0].pk))
+        self.assertEquals(view.func, post_permalink)
+
+    def test_redirects_to_the_page_of_the_post(self):
+        self.assertPermalinkRedirects(self.posts[0], 1)
+        self.assertPermalinkRedirects(self.posts[19], 1)
+        self.assertPermalinkRedirects(self.posts[20], 2)
+        self.assertPermalinkRedirects(self.posts[44], 3)
+
+    def test_same_creation_date(self):
+        '''
+        The posts created at the same time are ordered by id, like in topic_posts.
+        '''
+        Post.objects.filter(topic=self.topic).update(created_at=timezone.now() - timedelta(days=1))
+        self.assertPermalinkRedirects(self.posts[19], 1)
+        self.assertPermalinkRedirects(self.posts[20], 2)
+
+    def test_not_found(self):
+        response = self.client.get(reverse('post_permalink', kwargs={'post_pk': 99}))
+        self.assertEquals(response.status_code, 404)
+
+    def test_page_shows_the_post(self):
+        response = self.client.get(self.posts[20].get_absolute_url(), follow=True)
+        self.assertContains(response, 'id="{}"'.format(self.posts[20].pk))
+
+    def test_topic_posts_links_the_permalinks(self):
+        response = self.client.get(self.topic_url)
+        self.assertContains(response, 'href="{}"'.format(self.posts[0].get_absolute_url()))
+
+
+class PostPermalinkQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        board = Board.objects.create(name='Django', description='Django board.')
+        users = [
+            User.objects.create_user(username='user{}'.format(i), email='user{}@doe.com'.format(i), password='123')
+            for i in range(4)
+        ]
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=users[0])
+        cls.posts = [
+            Post.objects.create(message='Post {}'.format(i), topic=topic, created_by=users[i % len(users)])
+            for i in range(2 * PostListView.paginate_by + 5)
+        ]
+
+    def test_query_budget(self):
+        with self.assertQueryBudget('post_permalink'):
+            self.client.get(self.posts[-1].get_absolute_url())
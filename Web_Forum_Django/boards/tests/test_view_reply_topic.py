@@ -1,10 +1,11 @@
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.urls import resolve, reverse
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
 
 from ..forms import PostForm
 from ..models import Board, Post, Topic
-from ..views import reply_topic
+from ..views import PostListView, reply_topic
 '''
 The essence here is the custom test case class ReplyTopicTestCase. 
 Then all the four classes will extend this test case.
@@ -107,4 +108,32 @@ class InvalidReplyTopicTests(ReplyTopicTestCase):
 
     def test_form_errors(self):
         form = self.response.context.get('form')
-        self.assertTrue(form.errors)
\ No newline at end of file
+        self.assertTrue(form.errors)
+
+
+class ReplyTopicQueryBudgetTests(QueryBudgetMixin, TestCase):
+    '''
+    The reply page lists the last posts: a full page of them, from several authors.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        board = Board.objects.create(name='Django', description='Django board.')
+        users = [
+            User.objects.create_user(username='user{}'.format(i), email='user{}@doe.com'.format(i), password='123')
+            for i in range(4)
+        ]
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=users[0])
+        for i in range(PostListView.paginate_by + 5):
+            Post.objects.create(message='Post {}'.format(i), topic=topic, created_by=users[i % len(users)])
+        cls.url = reverse('reply_topic', kwargs={'pk': board.pk, 'topic_pk': topic.pk})
+
+    def setUp(self):
+        self.client.login(username='user0', password='123')
+
+    def test_query_budget_get(self):
+        with self.assertQueryBudget('reply_topic'):
+            self.client.get(self.url)
+
+    def test_query_budget_post(self):
+        with self.assertQueryBudget('reply_topic'):
+            self.client.post(self.url, {'message': 'hello, world!'})
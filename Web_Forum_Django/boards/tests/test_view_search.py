@@ -0,0 +1,119 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import resolve, reverse
+
+from ..models import Board, Post, Topic
+from ..purge import hide_topic
+from ..search import SearchResults, build_match_query
+from ..views import PostListView, search
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.other_board = Board.objects.create(name='Python', description='Python board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Deploying with gunicorn', board=self.board, starter=self.user)
+        self.post = Post.objects.create(message='How do I configure the workers?', topic=self.topic, created_by=self.user)
+        other_topic = Topic.objects.create(subject='Virtual environments', board=self.other_board, starter=self.user)
+        Post.objects.create(message='Which workers tool do you use? <b>venv</b>', topic=other_topic, created_by=self.user)
+        self.url = reverse('search')
+
+
+class SearchTests(SearchTestCase):
+    def test_status_code(self):
+        response = self.client.get(self.url)
+        self.assertEquals(response.status_code, 200)
+
+    def test_view_function(self):
+        view = resolve('/search/')
+        self.assertEquals(view.func, search)
+
+    def test_results_are_highlighted(self):
+        response = self.client.get(self.url, {'q': 'gunicorn'})
+        results = list(response.context['results'])
+        self.assertEquals(len(results), 1)
+        self.assertEquals(results[0]['topic_pk'], self.topic.pk)
+        self.assertContains(response, 'Deploying with <mark>gunicorn</mark>')
+
+    def test_subject_matches_once_per_topic(self):
+        for i in range(5):
+            Post.objects.create(message='Reply {}'.format(i), topic=self.topic, created_by=self.user)
+        results = SearchResults('gunicorn')
+        self.assertEquals(results.count(), 1)
+        self.assertEquals([result['topic_pk'] for result in results[0:20]], [self.topic.pk])
+
+    def test_post_results(self):
+        response = self.client.get(self.url, {'q': 'configure'})
+        [result] = response.context['results']
+        self.assertEquals(result['post_pk'], self.post.pk)
+        self.assertEquals(result['subject'], 'Deploying with gunicorn')
+
+    def test_post_result_opens_the_page_of_the_post(self):
+        for i in range(PostListView.paginate_by):
+            Post.objects.create(message='Reply {}'.format(i), topic=self.topic, created_by=self.user)
+        post = Post.objects.create(message='Use the uvicorn worker class', topic=self.topic, created_by=self.user)
+        response = self.client.get(self.url, {'q': 'uvicorn'})
+        permalink = reverse('post_permalink', kwargs={'post_pk': post.pk})
+        self.assertContains(response, 'href="{}"'.format(permalink))
+        response = self.client.get(permalink, follow=True)
+        self.assertIn(post, response.context['posts'])
+        # A topic result opens the topic.
+        response = self.client.get(self.url, {'q': 'gunicorn'})
+        self.assertContains(response, 'href="{}"'.format(reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})))
+
+    def test_renamed_topic_is_indexed_again(self):
+        self.topic.subject = 'Deploying with uwsgi'
+        self.topic.save()
+        self.assertEquals(SearchResults('gunicorn').count(), 0)
+        self.assertEquals(SearchResults('uwsgi').count(), 1)
+
+    def test_hidden_topics_are_left_out_of_the_count(self):
+        hide_topic(self.topic)
+        results = SearchResults('workers')
+        self.assertEquals(results.count(), 1)
+        self.assertEquals(len(results[0:20]), 1)
+        self.assertEquals(SearchResults('gunicorn').count(), 0)
+
+    def test_board_filter(self):
+        response = self.client.get(self.url, {'q': 'workers', 'board': self.board.pk})
+        self.assertEquals([result['post_pk'] for result in response.context['results']], [self.post.pk])
+
+    def test_message_is_escaped(self):
+        response = self.client.get(self.url, {'q': 'venv'})
+        self.assertContains(response, '&lt;b&gt;<mark>venv</mark>&lt;/b&gt;')
+
+    def test_edited_post_is_indexed_again(self):
+        self.post.message = 'Now it is about nginx'
+        self.post.save()
+        response = self.client.get(self.url, {'q': 'nginx'})
+        self.assertEquals(len(response.context['results']), 1)
+
+    def test_deleted_post_is_removed(self):
+        self.post.delete()
+        response = self.client.get(self.url, {'q': 'configure'})
+        self.assertEquals(len(response.context['results']), 0)
+
+    def test_deleted_topic_is_removed(self):
+        self.topic.delete()
+        self.assertEquals(SearchResults('gunicorn').count(), 0)
+
+    def test_query_syntax_is_not_injected(self):
+        self.assertEquals(build_match_query('NEAR(a b) OR "c'), '"NEAR" "a" "b" "OR" "c"*')
+        response = self.client.get(self.url, {'q': 'subject: AND ('})
+        self.assertEquals(response.status_code, 200)
+
+
+class RebuildSearchIndexCommandTests(SearchTestCase):
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM boards_search')
+            cursor.execute('DELETE FROM boards_search_topics')
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        response = self.client.get(self.url, {'q': 'workers'})
+        self.assertEquals(len(response.context['results']), 2)
+        self.assertEquals(SearchResults('gunicorn').count(), 1)
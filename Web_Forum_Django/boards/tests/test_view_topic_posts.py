@@ -1,10 +1,18 @@
+import time
+from unittest import mock
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import caches
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
 from django.urls import resolve, reverse
+from Web_Forum_Django.query_inspector import QueryBudgetMixin
 
 from ..models import Board, Post, Topic
 from ..views import topic_posts
 from ..views import PostListView
+from ..counters import BufferedViewCounter, ViewedTopics, mark_topic_viewed
 class TopicPostsTests(TestCase):
     def setUp(self):
         board = Board.objects.create(name='Django', description='Django board.')
@@ -19,4 +27,182 @@ class TopicPostsTests(TestCase):
 
     def test_view_function(self):
         view = resolve('/boards/1/topics/1/')
-        self.assertEquals(view.func.view_class, PostListView)
\ No newline at end of file
+        self.assertEquals(view.func.view_class, PostListView)
+
+class TopicViewsCounterTests(TestCase):
+    def setUp(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=board, starter=user)
+        Post.objects.create(message='Lorem ipsum dolor sit amet', topic=self.topic, created_by=user)
+        self.url = reverse('topic_posts', kwargs={'pk': board.pk, 'topic_pk': self.topic.pk})
+
+    def test_views_counted_once_per_session(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.views, 1)
+
+    def test_buffered_counter(self):
+        counter = BufferedViewCounter(interval=60)
+        counter.hit(self.topic.pk)
+        counter.hit(self.topic.pk)
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.views, 0)
+        self.assertEquals(counter.flush(), 2)
+        self.topic.refresh_from_db()
+        self.assertEquals(self.topic.views, 2)
+        self.assertEquals(counter.pending(), {})
+
+
+class BufferedViewCounterThreadTests(TransactionTestCase):
+    def test_flusher_survives_a_failed_flush(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=user)
+        failures = []
+
+        def locked_once(func):
+            if not failures:
+                failures.append(func)
+                raise OperationalError('database is locked')
+            return func()
+
+        counter = BufferedViewCounter(interval=0.01)
+        with mock.patch('boards.counters.retry_on_locked', side_effect=locked_once), \
+                self.assertLogs('boards.counters', 'ERROR'):
+            counter.hit(topic.pk)
+            deadline = time.monotonic() + 5
+            while counter.pending() or not failures:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+            counter.stop()
+            counter._thread.join()
+        topic.refresh_from_db()
+        self.assertEquals(topic.views, 1)
+
+
+class ViewedTopicsTests(SimpleTestCase):
+    def test_add(self):
+        viewed = ViewedTopics()
+        self.assertTrue(viewed.add(1))
+        self.assertFalse(viewed.add(1))
+        self.assertIn(1, ViewedTopics(viewed.dump()))
+        self.assertNotIn(2, ViewedTopics(viewed.dump()))
+
+    @override_settings(VIEWED_TOPICS_MAX_BITS=8192)
+    def test_size_is_bounded(self):
+        viewed = ViewedTopics()
+        for topic_pk in range(5000):
+            viewed.add(topic_pk)
+        self.assertLess(len(str(viewed.dump())), 3000)
+
+    def test_growth_is_bounded(self):
+        viewed = ViewedTopics()
+        for topic_pk in range(50000):
+            viewed.add(topic_pk)
+        self.assertEquals(len(viewed.current), 65536 // 8)
+        self.assertLess(len(str(viewed.dump())), 2 * 65536 // 6 + 500)
+
+    @override_settings(VIEWED_TOPICS_CAPACITY=2, VIEWED_TOPICS_MAX_BITS=16384)
+    def test_full_generation_grows(self):
+        viewed = ViewedTopics()
+        for topic_pk in range(1, 4):
+            viewed.add(topic_pk)
+        self.assertEquals(len(viewed.previous), 8192 // 8)
+        self.assertEquals(len(viewed.current), 16384 // 8)
+        self.assertIn(1, viewed)
+        # Twice the capacity before the next rotation.
+        for topic_pk in range(4, 7):
+            viewed.add(topic_pk)
+        self.assertIn(1, viewed)
+        self.assertIn(6, ViewedTopics(viewed.dump()))
+
+    @override_settings(VIEWED_TOPICS_CAPACITY=2, VIEWED_TOPICS_MAX_BITS=8192)
+    def test_capacity(self):
+        viewed = ViewedTopics()
+        viewed.add(1)
+        viewed.add(2)
+        viewed.add(3)
+        # 1 and 2 moved to the previous generation.
+        self.assertIn(1, viewed)
+        viewed.add(4)
+        viewed.add(5)
+        self.assertNotIn(1, viewed)
+
+    @override_settings(VIEWED_TOPICS_TTL=100)
+    def test_expiry(self):
+        viewed = ViewedTopics(now=0)
+        viewed.add(1)
+        self.assertIn(1, ViewedTopics(viewed.dump(), now=60))
+        viewed = ViewedTopics(viewed.dump(), now=60)
+        viewed.add(2)
+        self.assertIn(1, ViewedTopics(viewed.dump(), now=90))
+        self.assertNotIn(1, ViewedTopics(viewed.dump(), now=101))
+
+    @override_settings(VIEWED_TOPICS_TTL=100)
+    def test_expiry_without_new_topics(self):
+        viewed = ViewedTopics(now=0)
+        viewed.add(1)
+        # Only looked up since: the current generation expires all the same.
+        self.assertIn(1, ViewedTopics(viewed.dump(), now=100))
+        self.assertNotIn(1, ViewedTopics(viewed.dump(), now=101))
+
+    @override_settings(VIEWED_TOPICS_TTL=100)
+    def test_session_not_modified_by_expiry(self):
+        session = SessionStore()
+        with mock.patch('boards.counters.time.time', return_value=0):
+            mark_topic_viewed(session, 1)
+        session.modified = False
+        with mock.patch('boards.counters.time.time', return_value=60):
+            # Moved to the previous generation when loaded, nothing to write.
+            self.assertFalse(mark_topic_viewed(session, 1))
+        self.assertFalse(session.modified)
+        with mock.patch('boards.counters.time.time', return_value=101):
+            self.assertTrue(mark_topic_viewed(session, 1))
+        self.assertTrue(session.modified)
+
+    def test_session_modified_on_first_view_only(self):
+        session = SessionStore()
+        self.assertTrue(mark_topic_viewed(session, 1))
+        self.assertTrue(session.modified)
+        session.modified = False
+        self.assertFalse(mark_topic_viewed(session, 1))
+        self.assertFalse(session.modified)
+
+    def test_legacy_session_keys(self):
+        session = SessionStore()
+        session['viewed_topic_1'] = True
+        self.assertFalse(mark_topic_viewed(session, 1))
+        self.assertNotIn('viewed_topic_1', session)
+        self.assertTrue(mark_topic_viewed(session, 2))
+
+
+class TopicPostsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    '''
+    A full page of posts from several authors, so a query per post or per author goes over the budget.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        board = Board.objects.create(name='Django', description='Django board.')
+        users = [
+            User.objects.create_user(username='user{}'.format(i), email='user{}@doe.com'.format(i), password='123')
+            for i in range(4)
+        ]
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=users[0])
+        for i in range(PostListView.paginate_by + 5):
+            Post.objects.create(message='Post {}'.format(i), topic=topic, created_by=users[i % len(users)])
+        cls.url = reverse('topic_posts', kwargs={'pk': board.pk, 'topic_pk': topic.pk})
+
+    def setUp(self):
+        caches['fragments'].clear()
+        self.client.login(username='user0', password='123')
+
+    def test_query_budget(self):
+        with self.assertQueryBudget('topic_posts'):
+            response = self.client.get(self.url)
+        self.assertEquals(len(response.context['posts']), PostListView.paginate_by)
+
+    def test_query_budget_last_page(self):
+        with self.assertQueryBudget('topic_posts'):
+            self.client.get(self.url, {'page': 2})
@@ -1,7 +1,14 @@
-from audioop import reverse
-from django.shortcuts import render,redirect, get_object_or_404
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import render,redirect, get_object_or_404, aget_object_or_404
 from .models import Board, Topic, Post
 from .forms import NewTopicForm, PostForm
+from .conditional import board_topics_state, conditional_page, home_state, topic_posts_state
+from .counters import amark_topic_viewed, count_topic_view, mark_topic_viewed
+from .pagination import KeysetPaginationMixin
+from .search import SearchResults
+from Web_Forum_Django.sqlite import write_view
 from django.http import Http404
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
@@ -10,15 +17,25 @@ from django.views.generic import UpdateView
 from django.utils import timezone
 from django.views.generic import UpdateView, ListView
 from django.utils.decorators import method_decorator
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 # same like home() function but with using a GCBV for models listing
+# A refresh of an unchanged page is answered with a 304 (boards/conditional.py)
+@method_decorator(conditional_page(home_state), name='get')
 class BoardListView(ListView):
     model = Board
     # The context_object_name attribute on a generic view specifies the context variable to use instead of using the object_list it will be the same object_list
     #  but with context_object_name that we will pick - it makes the code more readble.
     context_object_name = 'boards'
     template_name = 'home.html'
+
+    def get_queryset(self):
+        # The statistics are stored on the board itself, only the author of the last post has to be joined
+        # so the page costs the same small number of queries no matter how many boards exist.
+        # The hidden boards are being deleted in the background (boards/purge.py).
+        return Board.objects.filter(is_hidden=False).select_related('last_post__created_by')
 # here The template will be rendered against a context containing a variable called object_list that contains all the board objects
 # def home(request):
 #     boards = Board.objects.all() # The result is a QuerySet - We can treat this QuerySet like a list
@@ -29,11 +46,14 @@ Why object_list? This is the name of the variable that ListView returns to us.
 You see the object_list above? It is not a very friendly name? To make it more user-friendly, 
 we can provide instead an explicit name using context_object_name.
 '''
-class TopicListView(ListView):
+@method_decorator(conditional_page(board_topics_state), name='get')
+class TopicListView(KeysetPaginationMixin, ListView):
     model = Topic
     context_object_name = 'topics'
     template_name = 'topics.html'
     paginate_by = 20
+    # Previous/Next links use cursors on (last_updated, id) instead of OFFSET, see boards/pagination.py
+    keyset_ordering = ('-last_updated', '-id')
 
     '''
     Generally, get_context_data will merge the context data of all parent classes with those of the current class.
@@ -59,10 +79,15 @@ class TopicListView(ListView):
     By overriding this method you can extend or completely replace this logic.
     '''
     def get_queryset(self):
-        self.board = get_object_or_404(Board, pk=self.kwargs.get('pk'))
-        queryset = self.board.topics.order_by('-last_updated').annotate(replies=Count('posts') - 1)
+        self.board = get_object_or_404(Board, pk=self.kwargs.get('pk'), is_hidden=False)
+        # The number of replies comes from Topic.posts_count, so this is a plain indexed query without GROUP BY.
+        queryset = self.board.topics.filter(is_hidden=False).select_related('starter').order_by('-last_updated', '-id')
         return queryset
 
+    def get_pagination_count(self):
+        # The number of topics is already stored on the board, no need for a COUNT(*).
+        return self.board.topics_count
+
 # def board_topics(request, pk):
 #     board = get_object_or_404(Board, pk=pk)
 #     queryset = board.topics.order_by('-last_updated').annotate(replies=Count('posts') - 1)
@@ -85,33 +110,109 @@ class TopicListView(ListView):
 #     board = get_object_or_404(Board, pk=pk) # PK stands for Primary Key. It's a shortcut for accessing a model's primary key.
 #     topics = board.topics.order_by('-last_updated').annotate(replies=Count('posts') - 1) 
 #     return render(request, 'topics.html', {'board': board, 'topics': topics})
-class PostListView(ListView):
+def count_cached_view(request, pk, topic_pk):
+    # The browser of a new session can have the page cached, the view is counted all the same.
+    topic = Topic(pk=int(topic_pk))
+    if mark_topic_viewed(request.session, topic.pk):
+        count_topic_view(topic)
+
+
+@method_decorator(conditional_page(topic_posts_state, not_modified=count_cached_view), name='get')
+class PostListView(KeysetPaginationMixin, ListView):
     model = Post
     context_object_name = 'posts'
     template_name = 'topic_posts.html'
     paginate_by = 20
+    keyset_ordering = ('created_at', 'id')
     #  kwargs as being a dictionary that maps each keyword to the value that we pass alongside it
     def get_context_data(self, **kwargs):
-        session_key = 'viewed_topic_{}'.format(self.topic.pk)
-        if not self.request.session.get(session_key, False):
-            self.topic.views += 1
-            self.topic.save()
-            self.request.session[session_key] = True     
+        self.count_view()
         # its a way to update the topic ForeignKey of the Post model 
         kwargs['topic'] = self.topic
-        return super().get_context_data(**kwargs)
+        context = super().get_context_data(**kwargs)
+        # The posts rendered by an older version of the renderer are rendered together, not one by one in the template.
+        Post.render_outdated(context['posts'])
+        # The new replies are appended to the last page as they are posted (boards/live.py).
+        if settings.LIVE_UPDATES and not context['page_obj'].has_next():
+            context['stream_url'] = reverse('topic_stream', kwargs={'pk': self.topic.board_id, 'topic_pk': self.topic.pk})
+        return context
+
+    def count_view(self):
+        # Counted once per session, the session is only saved when it is a new topic for it.
+        if mark_topic_viewed(self.request.session, self.topic.pk):
+            count_topic_view(self.topic)
 
     def get_queryset(self):
-        self.topic = get_object_or_404(Topic, board__pk=self.kwargs.get('pk'), pk=self.kwargs.get('topic_pk'))
-        queryset = self.topic.posts.order_by('created_at')
+        # The board is shown in the breadcrumb and the author of every post next to it.
+        self.topic = get_object_or_404(Topic.objects.select_related('board'), board__pk=self.kwargs.get('pk'), pk=self.kwargs.get('topic_pk'),
+                                       is_hidden=False, board__is_hidden=False)
+        # The author's profile comes with it, for its posts_count: no query per post.
+        queryset = self.topic.posts.select_related('created_by__profile').order_by('created_at', 'id')
         return queryset
 
+    def get_pagination_count(self):
+        return self.topic.posts_count
+
+
+# Async versions of the list views, used under ASGI (ASYNC_VIEWS setting, see urls.py).
+# They render the same templates but fetch the rows with the async ORM (aget, async for...),
+# so an ASGI server serves them on its event loop instead of handing every request to a thread.
+class AsyncListMixin:
+    '''
+    ListView.get() with the async ORM: `afetch()` returns the rows and the page (or None without pagination),
+    then get_context_data() builds the context from them without any query.
+    '''
+    async def get(self, request, *args, **kwargs):
+        self.object_list, self.pagination = await self.afetch()
+        context = self.get_context_data()
+        return self.render_to_response(context)
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.pagination
+
+
+@method_decorator(conditional_page(home_state), name='get')
+class AsyncBoardListView(AsyncListMixin, BoardListView):
+    async def afetch(self):
+        return [board async for board in self.get_queryset()], None
+
+
+@method_decorator(conditional_page(board_topics_state), name='get')
+class AsyncTopicListView(AsyncListMixin, TopicListView):
+    async def afetch(self):
+        # The board first: its counter is the number of topics of the paginator, no COUNT(*).
+        # (The async ORM runs the queries one after the other in the same thread anyway,
+        # asyncio.gather() wouldn't overlap them.)
+        self.board = await aget_object_or_404(Board, pk=self.kwargs.get('pk'), is_hidden=False)
+        topics = Topic.objects.filter(board_id=self.board.pk, is_hidden=False).select_related('starter')
+        pagination = await self.apaginate_queryset(topics, self.paginate_by)
+        return pagination[2], pagination
+
+
+@method_decorator(conditional_page(topic_posts_state, not_modified=count_cached_view), name='get')
+class AsyncPostListView(AsyncListMixin, PostListView):
+    async def afetch(self):
+        # The topic first, for its posts_count, like AsyncTopicListView.
+        self.topic = await aget_object_or_404(
+            Topic.objects.select_related('board'), board__pk=self.kwargs.get('pk'), pk=self.kwargs.get('topic_pk'),
+            is_hidden=False, board__is_hidden=False,
+        )
+        posts = Post.objects.filter(topic_id=self.topic.pk).select_related('created_by__profile')
+        pagination = await self.apaginate_queryset(posts, self.paginate_by)
+        if await amark_topic_viewed(self.request.session, self.topic.pk):
+            await sync_to_async(count_topic_view)(self.topic)
+        return pagination[2], pagination
+
+    def count_view(self):
+        # Already counted by afetch(), with the async session API.
+        pass
+
 
 
 @login_required #Django has a built-in view decorator to avoid non-loged in users
+@write_view # the form submission is written in one transaction, retried if the database is locked
 def new_topic(request, pk):
-    board = get_object_or_404(Board, pk=pk)
-    user = User.objects.first()  # TODO: get the currently logged in user
+    board = get_object_or_404(Board, pk=pk, is_hidden=False)
     #  **** the core of the form processing
     # First we check if the request is a POST or a GET
     if request.method == 'POST':
@@ -140,16 +241,31 @@ def new_topic(request, pk):
     return render(request, 'new_topic.html', {'board': board, 'form': form})
 
 def topic_posts(request, pk, topic_pk):
-    topic = get_object_or_404(Topic, board__pk=pk, pk=topic_pk)
-    topic.views += 1
-    topic.save()
+    topic = get_object_or_404(Topic, board__pk=pk, pk=topic_pk, is_hidden=False, board__is_hidden=False)
+    count_topic_view(topic)
     return render(request, 'topic_posts.html', {'topic': topic})
 
+def topic_post_url(post, board_pk, topic_pk):
+    topic_url = reverse('topic_posts', kwargs={'pk': board_pk, 'topic_pk': topic_pk})
+    return '{url}?page={page}#{id}'.format(
+        url=topic_url,
+        id=post.pk,
+        page=post.get_page_number(PostListView.paginate_by)
+    )
+
+# The permalink of a post (Post.get_absolute_url): redirects to the page of the topic showing it.
+# Two queries whatever the length of the topic: the post, and the count of the posts before it in the index.
+def post_permalink(request, post_pk):
+    post = get_object_or_404(Post.objects.select_related('topic').only('created_at', 'topic', 'topic__board'), pk=post_pk,
+                             topic__is_hidden=False, topic__board__is_hidden=False)
+    return redirect(topic_post_url(post, post.topic.board_id, post.topic_id))
+
 # A new view protected by @login_required and with a simple form processing logic:
 @login_required
+@write_view
 # pk and topic_pk are query arguments from the URL
 def reply_topic(request, pk, topic_pk):
-    topic = get_object_or_404(Topic, board__pk=pk, pk=topic_pk)
+    topic = get_object_or_404(Topic.objects.select_related('board'), board__pk=pk, pk=topic_pk, is_hidden=False, board__is_hidden=False)
     if request.method == 'POST':
         form = PostForm(request.POST)
         if form.is_valid():
@@ -159,21 +275,41 @@ def reply_topic(request, pk, topic_pk):
             post.save()
 
             topic.last_updated = timezone.now()
-            topic.save()
+            # Only save last_updated: posts_count was just incremented in the database by the post creation.
+            topic.save(update_fields=['last_updated'])
 
-            topic_url = reverse('topic_posts', kwargs={'pk': pk, 'topic_pk': topic_pk})
-            topic_post_url = '{url}?page={page}#{id}'.format(
-                url=topic_url,
-                id=post.pk,
-                page=topic.get_page_count()
-            )
-
-            return redirect(topic_post_url)
+            # The page of the new post, like its permalink (post_permalink) would find it.
+            return redirect(topic_post_url(post, pk, topic_pk))
     else:
         form = PostForm()
     return render(request, 'reply_topic.html', {'topic': topic, 'form': form})
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    board = None
+    board_pk = request.GET.get('board', '')
+    if board_pk.isdigit():
+        board = get_object_or_404(Board, pk=board_pk, is_hidden=False)
+    # The results are ranked by the full-text index, see boards/search.py
+    results = SearchResults(query, board_id=board.pk if board else None)
+    paginator = Paginator(results, 20)
+    page = paginator.get_page(request.GET.get('page'))
+    params = {'q': query}
+    if board:
+        params['board'] = board.pk
+    return render(request, 'search.html', {
+        'query': query,
+        'board': board,
+        'boards': Board.objects.filter(is_hidden=False).order_by('name'),
+        'results': page,
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'pagination_query': urlencode(params) + '&',
+    })
+
 @method_decorator(login_required, name='dispatch')
+@method_decorator(write_view, name='post')
 class PostUpdateView(UpdateView):
     model = Post
     fields = ('message', )
@@ -183,8 +319,8 @@ class PostUpdateView(UpdateView):
     # The application should only authorize the owner of the post to edit it.
     # The easiest way to solve this problem is by overriding the get_queryset method of the UpdateView.
     def get_queryset(self):
-        queryset = super().get_queryset()
-        return queryset.filter(created_by=self.request.user)
+        queryset = super().get_queryset().select_related('topic__board')
+        return queryset.filter(created_by=self.request.user, topic__is_hidden=False, topic__board__is_hidden=False)
     # override the form_valid() method so as to set some extra fields such as the updated_by and updated_at.
     def form_valid(self, form):
         post = form.save(commit=False)
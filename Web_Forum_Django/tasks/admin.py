@@ -0,0 +1,25 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'run_at', 'attempts', 'max_attempts', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('name',)
+    ordering = ('-pk',)
+    # The arguments aren't shown, they may be personal data (an email address, a message).
+    exclude = ('args', 'kwargs')
+    readonly_fields = ('locked_by', 'locked_at', 'finished_at', 'last_error')
+    actions = ('retry',)
+
+    @admin.action(description='Run the selected failed tasks again')
+    def retry(self, request, queryset):
+        # Not the ones whose dedupe_key is used by a pending task again.
+        pending = Task.objects.filter(status__in=[Task.QUEUED, Task.RUNNING], dedupe_key__isnull=False).values('dedupe_key')
+        updated = queryset.filter(status=Task.FAILED).exclude(dedupe_key__in=pending).update(
+            status=Task.QUEUED, run_at=timezone.now(), attempts=0, last_error='', finished_at=None,
+        )
+        self.message_user(request, 'Queued {} task(s) again.'.format(updated), messages.SUCCESS)
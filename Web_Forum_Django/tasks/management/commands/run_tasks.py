@@ -0,0 +1,28 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.queue import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run the queued background tasks (see tasks/queue.py) until stopped with Ctrl-C or SIGTERM.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.TASKS_WORKERS,
+                            help='Number of tasks run at the same time (0: one by one in this thread).')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='Run the tasks in threads, or in processes for the CPU-bound ones.')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds between two looks for due tasks (default: TASKS_POLL_INTERVAL).')
+        parser.add_argument('--once', action='store_true', help='Exit when no task is due anymore.')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['workers'], pool=options['pool'], poll_interval=options['poll_interval'])
+        # Finish the running tasks before exiting.
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: worker.stop())
+        self.stdout.write('Worker {} running the tasks with {} {}(s)'.format(worker.name, options['workers'], options['pool']))
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS('Worker {} stopped.'.format(worker.name)))
@@ -0,0 +1,311 @@
+import functools
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from Web_Forum_Django.sqlite import retry_on_locked
+
+'''
+Background tasks, stored in the database (the Task model): no broker, no other service.
+
+    @task(max_attempts=5)
+    def send_email(subject, body, from_email, recipients):
+        ...
+
+    send_email.enqueue('Hello', 'Hi!', None, ['john@doe.com'])
+
+The arguments are stored as JSON. A task enqueued inside a transaction (e.g. by a view) only exists
+once it is committed, and disappears with a rollback. `python manage.py run_tasks` runs the due tasks
+in a pool of threads or processes:
+
+- a failed task is retried up to `max_attempts` times, after TASKS_RETRY_DELAY seconds, then twice
+  as long every time;
+- `dedupe_key`: while a task with the same key is queued or running, enqueue() returns it instead
+  of queueing another one;
+- `run_at` / `delay` schedule a task for later, and the TASKS_SCHEDULE jobs are queued again
+  every `every` seconds;
+- the tasks left running by a worker that died are queued again after TASKS_LOCK_TIMEOUT seconds,
+  the done ones are deleted after TASKS_DONE_RETENTION seconds and the failed ones after
+  TASKS_FAILED_RETENTION seconds.
+
+The tasks are defined in the `tasks` module of the apps (boards/tasks.py, accounts/tasks.py),
+imported when Django starts.
+'''
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(func=None, *, max_attempts=None, retry_delay=None):
+    '''
+    Decorator registering `func` as a task, with its `enqueue(*args, **kwargs)` method.
+    '''
+    def register(func):
+        func.task_name = '{}.{}'.format(func.__module__, func.__qualname__)
+        func.max_attempts = max_attempts
+        func.retry_delay = retry_delay
+        func.enqueue = functools.partial(enqueue, func)
+        _registry[func.task_name] = func
+        return func
+    if func is None:
+        return register
+    return register(func)
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError('Unknown task: {}'.format(name))
+
+
+def enqueue(func, *args, run_at=None, delay=None, dedupe_key=None, **kwargs):
+    '''
+    Queue a call of the task `func` (the function or its registered name), to run now,
+    `delay` seconds later or at `run_at`. Return the Task.
+    '''
+    from .models import Task
+
+    if isinstance(func, str):
+        func = get_task(func)
+    if getattr(func, 'task_name', None) not in _registry:
+        raise ValueError('{!r} is not a registered task, decorate it with @task.'.format(func))
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    new_task = Task(
+        name=func.task_name,
+        args=list(args),
+        kwargs=kwargs,
+        run_at=run_at,
+        max_attempts=func.max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        dedupe_key=dedupe_key,
+    )
+    if dedupe_key is None:
+        new_task.save()
+        return new_task
+    try:
+        with transaction.atomic():
+            new_task.save()
+    except IntegrityError:
+        # The same task is already queued or running.
+        return Task.objects.filter(dedupe_key=dedupe_key, status__in=[Task.QUEUED, Task.RUNNING]).first()
+    return new_task
+
+
+def worker_name():
+    return '{}:{}:{}'.format(socket.gethostname(), os.getpid(), threading.get_ident())
+
+
+def claim(worker, limit):
+    '''
+    Mark up to `limit` due tasks as running by `worker` and return their ids.
+    A task claimed by another worker in the meantime is skipped.
+    '''
+    from .models import Task
+
+    now = timezone.now()
+    due = Task.objects.filter(status=Task.QUEUED, run_at__lte=now).order_by('run_at', 'pk')
+    claimed = []
+    for pk in due.values_list('pk', flat=True)[:limit]:
+        updated = retry_on_locked(lambda: Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        ))
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def execute(pk):
+    '''
+    Run the claimed task `pk` and record the outcome: done, queued again for a retry, or failed.
+    '''
+    from .models import Task
+
+    task = Task.objects.get(pk=pk)
+    retry_delay = settings.TASKS_RETRY_DELAY
+    try:
+        func = get_task(task.name)
+        retry_delay = func.retry_delay if func.retry_delay is not None else retry_delay
+        func(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if task.attempts < task.max_attempts:
+            logger.warning('Task %s failed (attempt %d of %d), retrying', task, task.attempts, task.max_attempts)
+            changes = {
+                'status': Task.QUEUED,
+                'run_at': now + timedelta(seconds=retry_delay * 2 ** (task.attempts - 1)),
+                'locked_by': '',
+                'locked_at': None,
+            }
+        else:
+            logger.error('Task %s failed after %d attempts:\n%s', task, task.attempts, error)
+            changes = {'status': Task.FAILED, 'finished_at': now}
+        retry_on_locked(lambda: Task.objects.filter(pk=pk).update(last_error=error, **changes))
+        return changes['status']
+    retry_on_locked(lambda: Task.objects.filter(pk=pk).update(status=Task.DONE, finished_at=timezone.now()))
+    return Task.DONE
+
+
+def _execute_and_close(pk):
+    # In a pool thread or process: don't keep a database connection open between the tasks.
+    try:
+        return execute(pk)
+    finally:
+        connection.close()
+
+
+def _setup_process():
+    import django
+    django.setup()
+
+
+def requeue_stale():
+    '''
+    Queue again the tasks running for more than TASKS_LOCK_TIMEOUT seconds: their worker died.
+    '''
+    from .models import Task
+
+    now = timezone.now()
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, finished_at=now, last_error='The worker running the task stopped.',
+    )
+    requeued = stale.update(status=Task.QUEUED, locked_by='', locked_at=None)
+    return requeued + failed
+
+
+def prune_finished():
+    '''
+    Delete the tasks done for more than TASKS_DONE_RETENTION seconds, and the failed ones after
+    TASKS_FAILED_RETENTION seconds: long enough to look at them and retry them from the admin.
+    '''
+    from .models import Task
+
+    now = timezone.now()
+    done = Q(status=Task.DONE, finished_at__lt=now - timedelta(seconds=settings.TASKS_DONE_RETENTION))
+    failed = Q(status=Task.FAILED, finished_at__lt=now - timedelta(seconds=settings.TASKS_FAILED_RETENTION))
+    deleted, _ = Task.objects.filter(done | failed).delete()
+    return deleted
+
+
+def schedule_jobs(now=None):
+    '''
+    Queue the next run of every TASKS_SCHEDULE job that isn't queued yet, at the next multiple
+    of its `every` seconds. Their dedupe_key keeps a single pending run per job, whatever the number of workers.
+    '''
+    from .models import Task
+
+    now = now or timezone.now()
+    scheduled = []
+    for name, job in settings.TASKS_SCHEDULE.items():
+        dedupe_key = 'schedule:{}'.format(name)
+        if Task.objects.filter(dedupe_key=dedupe_key, status__in=[Task.QUEUED, Task.RUNNING]).exists():
+            continue
+        every = job['every']
+        run_at = datetime.fromtimestamp((now.timestamp() // every + 1) * every, tz=dt_timezone.utc)
+        scheduled.append(enqueue(job['task'], *job.get('args', ()), run_at=run_at, dedupe_key=dedupe_key, **job.get('kwargs', {})))
+    return scheduled
+
+
+def schedule_interval():
+    # A job queued every 5 seconds (e.g. sync_replicas) can't wait for the next maintenance.
+    return min([settings.TASKS_MAINTENANCE_INTERVAL] + [job['every'] for job in settings.TASKS_SCHEDULE.values()])
+
+
+def run_due_tasks(worker=None):
+    '''
+    Run the due tasks one after the other in this thread, until there is none left.
+    Return the number of tasks run.
+    '''
+    worker = worker or worker_name()
+    count = 0
+    while True:
+        claimed = claim(worker, 1)
+        if not claimed:
+            return count
+        execute(claimed[0])
+        count += 1
+
+
+class Worker:
+    '''
+    The loop of `python manage.py run_tasks`: claims the due tasks as long as one of its `workers`
+    threads (or processes) is free to run them.
+    '''
+    def __init__(self, workers, pool='thread', poll_interval=None):
+        self.workers = workers
+        self.pool = pool
+        self.poll_interval = poll_interval if poll_interval is not None else settings.TASKS_POLL_INTERVAL
+        self.name = worker_name()
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def make_pool(self):
+        if self.pool == 'process':
+            # Spawned, not forked: a forked process must not use the SQLite connection of its parent.
+            connection.close()
+            return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_setup_process)
+        return ThreadPoolExecutor(self.workers, thread_name_prefix='task-worker')
+
+    def run(self, once=False):
+        '''
+        Run the tasks until stop() is called, or with `once` until no task is due.
+        '''
+        if self.workers == 0:
+            return self._run_inline(once)
+        running = set()
+        last_maintenance = None
+        with self.make_pool() as pool:
+            while not self._stopped.is_set():
+                last_maintenance = self._maintenance(last_maintenance)
+                free = self.workers - len(running)
+                claimed = claim(self.name, free) if free else []
+                for pk in claimed:
+                    running.add(pool.submit(_execute_and_close, pk))
+                if once and not claimed and not running:
+                    break
+                if running:
+                    done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.exception() is not None:
+                            logger.error('Task worker error', exc_info=future.exception())
+                elif not claimed:
+                    self._stopped.wait(self.poll_interval)
+
+    def _run_inline(self, once):
+        last_maintenance = None
+        while not self._stopped.is_set():
+            last_maintenance = self._maintenance(last_maintenance)
+            if run_due_tasks(self.name):
+                continue
+            if once:
+                break
+            self._stopped.wait(self.poll_interval)
+
+    def _maintenance(self, last_run):
+        # last_run: when the lost and old tasks were last handled, and when the jobs were last scheduled.
+        now = time.monotonic()
+        cleaned, scheduled = last_run or (None, None)
+        if cleaned is None or now - cleaned >= settings.TASKS_MAINTENANCE_INTERVAL:
+            requeue_stale()
+            prune_finished()
+            cleaned = now
+        if scheduled is None or now - scheduled >= schedule_interval():
+            schedule_jobs()
+            scheduled = now
+        return cleaned, scheduled
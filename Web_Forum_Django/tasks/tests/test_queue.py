@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ..models import Task
+from ..queue import enqueue, prune_finished, requeue_stale, run_due_tasks, schedule_interval, schedule_jobs, task
+
+calls = []
+
+
+@task
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@task(max_attempts=2, retry_delay=10)
+def fail():
+    raise RuntimeError('Boom')
+
+
+class QueueTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+
+
+class EnqueueTests(QueueTestCase):
+    def test_run(self):
+        record.enqueue(1, 'two', three=3)
+        self.assertEquals(calls, [])
+        self.assertEquals(run_due_tasks(), 1)
+        self.assertEquals(calls, [((1, 'two'), {'three': 3})])
+        queued = Task.objects.get()
+        self.assertEquals(queued.status, Task.DONE)
+        self.assertEquals(queued.attempts, 1)
+
+    def test_enqueue_by_name(self):
+        enqueue('tasks.tests.test_queue.record', 42)
+        run_due_tasks()
+        self.assertEquals(calls, [((42,), {})])
+
+    def test_unregistered_function(self):
+        with self.assertRaises(ValueError):
+            enqueue(print, 'hello')
+
+    def test_delay(self):
+        record.enqueue(delay=60)
+        self.assertEquals(run_due_tasks(), 0)
+        Task.objects.update(run_at=timezone.now())
+        self.assertEquals(run_due_tasks(), 1)
+
+    def test_dedupe(self):
+        first = record.enqueue(dedupe_key='record')
+        self.assertEquals(record.enqueue(dedupe_key='record'), first)
+        self.assertEquals(Task.objects.count(), 1)
+        run_due_tasks()
+        # Once done, the same key can be queued again.
+        self.assertNotEquals(record.enqueue(dedupe_key='record'), first)
+        self.assertEquals(Task.objects.count(), 2)
+
+
+class RetryTests(QueueTestCase):
+    def test_retry_then_fail(self):
+        fail.enqueue()
+        run_due_tasks()
+        queued = Task.objects.get()
+        self.assertEquals(queued.status, Task.QUEUED)
+        self.assertEquals(queued.attempts, 1)
+        self.assertIn('RuntimeError: Boom', queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=5))
+        # The retry isn't due yet.
+        self.assertEquals(run_due_tasks(), 0)
+        Task.objects.update(run_at=timezone.now())
+        run_due_tasks()
+        queued.refresh_from_db()
+        self.assertEquals(queued.status, Task.FAILED)
+        self.assertEquals(queued.attempts, 2)
+
+    def test_unknown_task(self):
+        Task.objects.create(name='tasks.removed', run_at=timezone.now(), max_attempts=1)
+        run_due_tasks()
+        self.assertIn('Unknown task', Task.objects.get().last_error)
+
+
+class MaintenanceTests(QueueTestCase):
+    def test_requeue_stale(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        lost = record.enqueue()
+        Task.objects.filter(pk=lost.pk).update(status=Task.RUNNING, locked_at=long_ago, attempts=1)
+        exhausted = fail.enqueue()
+        Task.objects.filter(pk=exhausted.pk).update(status=Task.RUNNING, locked_at=long_ago, attempts=2)
+        self.assertEquals(requeue_stale(), 2)
+        self.assertEquals(Task.objects.get(pk=lost.pk).status, Task.QUEUED)
+        self.assertEquals(Task.objects.get(pk=exhausted.pk).status, Task.FAILED)
+
+    def test_prune_finished(self):
+        record.enqueue()
+        run_due_tasks()
+        self.assertEquals(prune_finished(), 0)
+        Task.objects.update(finished_at=timezone.now() - timedelta(days=2))
+        self.assertEquals(prune_finished(), 1)
+
+    @override_settings(TASKS_FAILED_RETENTION=7 * 24 * 60 * 60)
+    def test_prune_failed(self):
+        task = fail.enqueue()
+        Task.objects.filter(pk=task.pk).update(status=Task.FAILED, finished_at=timezone.now() - timedelta(days=2))
+        self.assertEquals(prune_finished(), 0)
+        Task.objects.filter(pk=task.pk).update(finished_at=timezone.now() - timedelta(days=8))
+        self.assertEquals(prune_finished(), 1)
+
+    @override_settings(TASKS_SCHEDULE={'record': {'task': 'tasks.tests.test_queue.record', 'every': 3600, 'args': ['hourly']}})
+    def test_schedule_jobs(self):
+        now = timezone.now()
+        [job] = schedule_jobs(now)
+        self.assertEquals(schedule_jobs(now), [])
+        self.assertEquals(job.run_at.timestamp() % 3600, 0)
+        self.assertTrue(now < job.run_at <= now + timedelta(hours=1))
+        self.assertEquals(job.args, ['hourly'])
+
+    @override_settings(TASKS_MAINTENANCE_INTERVAL=60, TASKS_SCHEDULE={'record': {'task': 'tasks.tests.test_queue.record', 'every': 5}})
+    def test_frequent_jobs_are_scheduled_as_often(self):
+        self.assertEquals(schedule_interval(), 5)
+
+
+class RunTasksCommandTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_thread_pool(self):
+        for i in range(5):
+            record.enqueue(i)
+        call_command('run_tasks', once=True, workers=2, stdout=StringIO())
+        self.assertEquals(sorted(args for args, kwargs in calls), [(i,) for i in range(5)])
+        self.assertEquals(Task.objects.filter(status=Task.DONE).count(), 5)
+
+    def test_inline(self):
+        record.enqueue('inline')
+        call_command('run_tasks', once=True, workers=0, stdout=StringIO())
+        self.assertEquals(calls, [(('inline',), {})])